@@ -0,0 +1,190 @@
+# bench_storage.py
+"""
+Concurrency benchmark: read latency while a bulk ingest is writing.
+
+Writer processes insert articles in batch transactions that read before
+they write, like ingest jobs updating their progress, while reader threads
+page through /news/-style queries on the read-only pool.  Reader latency percentiles are reported
+idle and during the ingest, per storage profile, on a scratch database:
+
+    python bench_storage.py                     # production vs compat
+    python bench_storage.py --profile production --articles 20000 --readers 4 --writers 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Process
+from typing import Dict, List
+
+SAMPLE_TEXT = (
+    "The finance minister told parliament on Tuesday that the government would "
+    "raise spending on hospitals and schools, while the opposition party said "
+    "the budget did little for farmers hit by the drought. "
+)
+
+
+def _article(i: int) -> Dict:
+    return {
+        "title": f"Benchmark article {i}",
+        "summary": SAMPLE_TEXT[:200],
+        "content": SAMPLE_TEXT * 8,
+        "category": ("politics", "business", "health", "sports")[i % 4],
+        "source_file": "bench.pdf",
+    }
+
+
+def _writer(total: int, batch_size: int, result_path: str):
+    import crud
+    from database import SessionLocal, dispose_engines
+
+    dispose_engines()  # forked from the reader process
+    db = SessionLocal()
+    errors = []
+    started = time.perf_counter()
+    try:
+        for start in range(0, total, batch_size):
+            try:
+                crud.get_generation(db)
+                crud.create_articles_bulk(db, [_article(i) for i in range(start, min(total, start + batch_size))])
+            except Exception as e:
+                db.rollback()
+                errors.append(str(e).splitlines()[0])
+    finally:
+        db.close()
+    with open(result_path, "w") as f:
+        json.dump({"seconds": time.perf_counter() - started, "errors": errors}, f)
+
+
+def _percentiles(samples: List[float]) -> Dict:
+    if not samples:
+        return {}
+    s = sorted(samples)
+    pick = lambda p: s[min(len(s) - 1, int(p * len(s)))]
+    return {
+        "n": len(s),
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+        "max_ms": round(s[-1] * 1000, 2),
+    }
+
+
+def _read_loop(stop: threading.Event, latencies: List[float], errors: List[str]):
+    import crud
+    from database import ReadSessionLocal
+
+    while not stop.is_set():
+        db = ReadSessionLocal()
+        started = time.perf_counter()
+        try:
+            crud.get_articles(db, limit=50)
+            crud.get_articles_by_category(db, "politics", limit=20)
+            latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(str(e).splitlines()[0])
+        finally:
+            db.close()
+
+
+def _measure_reads(readers: int, seconds: float = None, until: List[Process] = ()):
+    stop = threading.Event()
+    latencies, errors = [], []
+    threads = [threading.Thread(target=_read_loop, args=(stop, latencies, errors)) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    if until:
+        for process in until:
+            process.join()
+    else:
+        time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return {**_percentiles(latencies), "errors": len(errors), "first_error": errors[0] if errors else None}
+
+
+def run_profile(args) -> Dict:
+    """Runs inside a subprocess whose environment selects the database and profile."""
+    import crud
+    from database import SessionLocal, init_db, STORAGE_PROFILE
+
+    init_db()
+    db = SessionLocal()
+    for start in range(0, args.seed, 500):
+        crud.create_articles_bulk(db, [_article(i) for i in range(start, min(args.seed, start + 500))])
+    db.close()
+
+    idle = _measure_reads(args.readers, seconds=2.0)
+
+    tmp = os.path.dirname(os.environ["BENCH_DB"])
+    per_writer = args.articles // args.writers
+    writers = [
+        Process(target=_writer, args=(per_writer, args.batch_size, os.path.join(tmp, f"writer{n}.json")))
+        for n in range(args.writers)
+    ]
+    started = time.perf_counter()
+    for process in writers:
+        process.start()
+    during = _measure_reads(args.readers, until=writers)
+    write_seconds = time.perf_counter() - started
+    write_errors = []
+    for n in range(args.writers):
+        with open(os.path.join(tmp, f"writer{n}.json")) as f:
+            write_errors += json.load(f)["errors"]
+
+    return {
+        "profile": STORAGE_PROFILE,
+        "seeded_articles": args.seed,
+        "ingested_articles": per_writer * args.writers,
+        "writers": args.writers,
+        "ingest_seconds": round(write_seconds, 2),
+        "ingest_articles_per_sec": round(per_writer * args.writers / write_seconds),
+        "failed_write_batches": len(write_errors),
+        "first_write_error": write_errors[0] if write_errors else None,
+        "reads_idle": idle,
+        "reads_during_ingest": during,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", action="append", help="storage profile(s); default: production and compat")
+    parser.add_argument("--seed", type=int, default=2000, help="articles in the database before the ingest")
+    parser.add_argument("--articles", type=int, default=10000, help="articles the writer inserts")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--readers", type=int, default=2, help="reader threads")
+    parser.add_argument("--writers", type=int, default=2, help="writer processes")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_profile(args)))
+        return
+
+    results = []
+    for profile in args.profile or ["production", "compat"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{db_path}",
+                "STORAGE_PROFILE": profile,
+                "BENCH_DB": db_path,
+            }
+            cmd = [sys.executable, os.path.abspath(__file__), "--child",
+                   "--seed", str(args.seed), "--articles", str(args.articles),
+                   "--batch-size", str(args.batch_size), "--readers", str(args.readers),
+                   "--writers", str(args.writers)]
+            out = subprocess.run(cmd, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 capture_output=True, text=True, check=True)
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+# benchmark.py
+"""
+Reproducible benchmarks on synthetic data.
+
+    python benchmark.py run [--quick] [--runs 5] [--output results.json]
+                            [--baseline baseline.json] [--threshold 0.25]
+                            [--save-baseline baseline.json]
+    python benchmark.py compare results.json baseline.json [--threshold 0.25]
+    python benchmark.py seed --articles 5000
+    python benchmark.py startup [--repeat 5] [--output startup.json]
+    python benchmark.py backends [PDF ...] [--pages 12] [--repeat 3] [--output backends.json]
+
+`run` generates a synthetic newspaper PDF (synthetic_pdf.py) and measures:
+- parser throughput: PDF extraction, split_into_articles and process_article;
+- layout segmentation accuracy: the share of the generated articles (those
+  that fit on their page) whose title and body come out intact;
+- bulk insert throughput into a scratch database;
+- latency percentiles of /news/, /search/ and /stats/ through the FastAPI
+  app, with the response cache cleared before each request.
+
+Results are JSON. With --runs N the suite runs N times, each in a fresh
+interpreter and scratch database, and every metric reports the median and
+its spread (half the range, as a fraction of the median). With --baseline,
+any metric that is worse than the baseline by more than --threshold (a
+fraction) plus the spread of both sides is reported, and the command exits
+with status 1. Results measured at other sizes (pages, articles, requests;
+--quick changes all three) are not compared at all: exit status 2.
+benchmark_baseline.json is a median of 5 runs; re-record it with
+--runs 5 --save-baseline, on the benchmark machine, whenever the code or the
+machine changes, since single-run timings on a shared machine vary by tens
+of percent.
+
+`startup` starts the app once per APP_ROLE in a fresh interpreter and
+reports the time until it answers its first request and the resident memory
+at that point, and whether the PDF stack got loaded.
+
+`backends` extracts the plain text of the same PDFs (the synthetic one,
+or those given) with every PDF_TEXT_BACKEND and reports each backend's
+pages/s, the pages/s of the pdfplumber layout analysis ingestion uses, and
+how much of pdfplumber's output (as a bag of words, since the backends
+order columns differently) each other backend reproduces.
+
+`seed` adds synthetic articles to DATABASE_URL, which is news.db unless the
+environment says otherwise.
+
+See bench_storage.py for read latency during concurrent ingestion.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+SEED = 1234
+
+# Search terms drawn from the synthetic vocabulary
+SEARCH_TERMS = ["minister", "election", "hospital", "football", "market", "vaccine", "film", "startup"]
+
+
+def _metric(value: float, unit: str, better: str) -> Dict:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def _median_time(fn: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    s = sorted(samples)
+    pick = lambda p: s[min(len(s) - 1, int(p * len(s)))] * 1000
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def synthetic_articles(n: int, seed: int = SEED) -> List[Dict]:
+    """n article dicts as ingestion would produce them, with synthetic text."""
+    from synthetic_pdf import make_article
+
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        a = make_article(rng, body_lines=rng.randint(15, 60), column_width=130)
+        rows.append({
+            "title": a["title"],
+            "summary": a["body"][:200],
+            "content": a["body"],
+            "category": a["category"],
+            "source_file": "synthetic.pdf",
+            "published_date": None,
+        })
+    return rows
+
+
+def seed_articles(db, n: int, batch_size: int = 500, seed: int = SEED) -> int:
+    """Insert n synthetic articles. Returns how many were saved."""
+    import crud
+
+    saved = 0
+    rows = synthetic_articles(n, seed)
+    for start in range(0, n, batch_size):
+        result = crud.create_articles_bulk(db, rows[start:start + batch_size])
+        saved += sum(1 for article_id in result["ids"] if article_id is not None)
+    return saved
+
+
+def bench_parser(pdf_path: str, pages: int, repeat: int, manifest: List[Dict]) -> Dict:
+    from enhanced_pdf_parser import extract_articles_from_pdf, extract_page_texts, split_into_articles, process_article
+
+    metrics = {}
+    seconds = _median_time(lambda: extract_articles_from_pdf(pdf_path, workers=1), repeat)
+    metrics["pdf_extract_pages_per_sec"] = _metric(pages / seconds, "pages/s", "higher")
+
+    found = {(a["title"], a["content"]) for a in extract_articles_from_pdf(pdf_path, workers=1, mode="layout")}
+    complete = [m for m in manifest if m["complete"]]
+    intact = sum(1 for m in complete if (m["title"], f"{m['byline']} {m['body']}") in found)
+    metrics["layout_articles_intact_pct"] = _metric(100.0 * intact / len(complete), "%", "higher")
+
+    text = "\n".join(extract_page_texts(pdf_path, workers=1))
+    chunks = split_into_articles(text)
+    seconds = _median_time(lambda: split_into_articles(text), repeat * 5)
+    metrics["split_mb_per_sec"] = _metric(len(text) / seconds / 1e6, "MB/s", "higher")
+
+    seconds = _median_time(lambda: [process_article(c, "bench.pdf", i) for i, c in enumerate(chunks)], repeat)
+    metrics["process_articles_per_sec"] = _metric(len(chunks) / seconds, "articles/s", "higher")
+    return metrics
+
+
+def bench_insert(n: int) -> Dict:
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        saved = seed_articles(db, n)
+        seconds = time.perf_counter() - started
+    finally:
+        db.close()
+    return {"insert_articles_per_sec": _metric(saved / seconds, "articles/s", "higher")}
+
+
+def bench_api(requests: int) -> Dict:
+    from fastapi.testclient import TestClient
+    import main, response_cache
+
+    endpoints = {
+        "news": lambda i: "/news/?limit=50",
+        "search": lambda i: f"/search/?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}&limit=20",
+        "stats": lambda i: "/stats/",
+    }
+    metrics = {}
+    with TestClient(main.app) as client:
+        for name, url in endpoints.items():
+            samples = []
+            for i in range(requests):
+                response_cache.clear()
+                started = time.perf_counter()
+                r = client.get(url(i))
+                samples.append(time.perf_counter() - started)
+                r.raise_for_status()
+            for p, ms in _percentiles(samples).items():
+                metrics[f"api_{name}_{p}_ms"] = _metric(ms, "ms", "lower")
+    return metrics
+
+
+# Run by `startup` in a fresh interpreter per role
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    client.get("/")
+    seconds = time.perf_counter() - started
+    rss_kb = None
+    try:
+        with open("/proc/self/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    except OSError:
+        import resource
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            rss_kb //= 1024
+print(json.dumps({"seconds": seconds, "rss_kb": rss_kb, "pdf_stack": "pdfplumber" in sys.modules}))
+"""
+
+
+def bench_startup(repeat: int) -> Dict:
+    """Startup time and baseline RSS of each APP_ROLE (median of `repeat` starts)."""
+    metrics = {}
+    here = os.path.dirname(os.path.abspath(__file__))
+    for role in ("reader", "ingester", "all"):
+        env = {**os.environ, "APP_ROLE": role, "LOG_LEVEL": "WARNING"}
+        samples = []
+        for _ in range(repeat + 1):  # the first start creates the database
+            out = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=here, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+        samples = samples[1:]
+        metrics[f"startup_{role}_seconds"] = _metric(statistics.median(s["seconds"] for s in samples), "s", "lower")
+        metrics[f"startup_{role}_rss_mb"] = _metric(
+            statistics.median(s["rss_kb"] for s in samples) / 1024, "MB", "lower")
+        print(f"{role:9} {metrics[f'startup_{role}_seconds']['value']:6.2f}s "
+              f"{metrics[f'startup_{role}_rss_mb']['value']:7.1f} MB  PDF stack loaded: {samples[0]['pdf_stack']}",
+              file=sys.stderr)
+    return metrics
+
+
+def bench_backends(pdf_paths: List[str], repeat: int) -> Dict:
+    """Text extraction speed and output of each PDF_TEXT_BACKEND on the same PDFs."""
+    from collections import Counter
+    from enhanced_pdf_parser import PDF_BACKENDS, extract_page_texts, iter_page_layouts
+
+    metrics = {}
+    for path in pdf_paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        words = {}
+        for backend in PDF_BACKENDS:
+            texts = extract_page_texts(path, workers=1, backend=backend)
+            seconds = _median_time(lambda: extract_page_texts(path, workers=1, backend=backend), repeat)
+            metrics[f"{name}_{backend}_pages_per_sec"] = _metric(len(texts) / seconds, "pages/s", "higher")
+            words[backend] = Counter(" ".join(texts).split())
+        pages = len(list(iter_page_layouts(path, workers=1)))
+        seconds = _median_time(lambda: list(iter_page_layouts(path, workers=1)), repeat)
+        metrics[f"{name}_layout_pages_per_sec"] = _metric(pages / seconds, "pages/s", "higher")
+
+        reference = words["pdfplumber"]
+        for backend in PDF_BACKENDS:
+            if backend == "pdfplumber":
+                continue
+            union = sum((words[backend] | reference).values())
+            overlap = sum((words[backend] & reference).values()) / union if union else 1.0
+            metrics[f"{name}_{backend}_word_overlap_pct"] = _metric(100.0 * overlap, "%", "higher")
+
+        print(f"{name}: {pages} pages", file=sys.stderr)
+        for key, metric in metrics.items():
+            if key.startswith(f"{name}_"):
+                print(f"  {key[len(name) + 1:]:28} {metric['value']:>10.1f} {metric['unit']}", file=sys.stderr)
+    return metrics
+
+
+def run(args) -> Dict:
+    tmp = tempfile.mkdtemp(prefix="news-bench-")
+    if not args.database_url:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.setdefault("BLOB_DIR", os.path.join(tmp, "blobs"))
+
+    from database import init_db
+    from synthetic_pdf import write_newspaper_pdf
+
+    init_db()
+    pages = 4 if args.quick else args.pages
+    articles = 1000 if args.quick else args.articles
+    requests = 30 if args.quick else args.requests
+    repeat = 1 if args.quick else 3
+
+    pdf_path = os.path.join(tmp, "edition.pdf")
+    manifest = write_newspaper_pdf(pdf_path, pages=pages, articles_per_page=6, columns=4, seed=SEED)
+
+    metrics = {}
+    metrics.update(bench_parser(pdf_path, pages, repeat, manifest))
+    metrics.update(bench_insert(articles))
+    metrics.update(bench_api(requests))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pages": pages,
+            "articles": articles,
+            "requests": requests,
+        },
+        "metrics": metrics,
+    }
+
+
+# Meta fields that must match for two results to be comparable
+SIZE_KEYS = ("pages", "articles", "requests")
+
+
+def run_repeated(args) -> Dict:
+    """Run the suite args.runs times, each in a fresh interpreter, and keep the median of every metric."""
+    runs = []
+    for _ in range(args.runs):
+        fd, output = tempfile.mkstemp(prefix="news-bench-", suffix=".json")
+        os.close(fd)
+        cmd = [sys.executable, os.path.abspath(__file__), "run", "--pages", str(args.pages),
+               "--articles", str(args.articles), "--requests", str(args.requests), "--output", output]
+        if args.quick:
+            cmd.append("--quick")
+        try:
+            subprocess.run(cmd, check=True)
+            with open(output) as f:
+                runs.append(json.load(f))
+        finally:
+            os.remove(output)
+
+    metrics = {}
+    for name, first in runs[0]["metrics"].items():
+        values = [r["metrics"][name]["value"] for r in runs]
+        median = statistics.median(values)
+        spread = (max(values) - min(values)) / 2 / median if median else 0.0
+        metrics[name] = {**_metric(median, first["unit"], first["better"]), "spread": round(spread, 3)}
+    return {"meta": {**runs[-1]["meta"], "runs": len(runs)}, "metrics": metrics}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Print each metric next to its baseline. Returns the names of the regressed metrics.
+    A metric regresses when it is worse by more than threshold plus the spread of both sides.
+    Raises ValueError when the two were measured at different sizes.
+    """
+    mismatched = [k for k in SIZE_KEYS if results["meta"].get(k) != baseline.get("meta", {}).get(k)]
+    if mismatched:
+        raise ValueError("Results and baseline were measured at different sizes: " + ", ".join(
+            f"{k} {results['meta'].get(k)} vs {baseline.get('meta', {}).get(k)}" for k in mismatched))
+    regressions = []
+    for name, metric in sorted(results["metrics"].items()):
+        base = baseline.get("metrics", {}).get(name)
+        if base is None or not base["value"]:
+            print(f"{name:32} {metric['value']:>12.3f} {metric['unit']:<11} (no baseline)")
+            continue
+        change = (metric["value"] - base["value"]) / base["value"]
+        worse = -change if metric["better"] == "higher" else change
+        tolerance = threshold + metric.get("spread", 0.0) + base.get("spread", 0.0)
+        flag = "REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:32} {metric['value']:>12.3f} {metric['unit']:<11} baseline {base['value']:>10.3f} "
+              f"{change:+7.1%} (allowed {tolerance:.0%}) {flag}")
+    return regressions
+
+
+def _compare_or_exit(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    try:
+        return compare(results, baseline, threshold)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="News API benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmark suite")
+    p_run.add_argument("--quick", action="store_true", help="small sizes, one repetition")
+    p_run.add_argument("--pages", type=int, default=12, help="pages in the synthetic PDF")
+    p_run.add_argument("--articles", type=int, default=5000, help="articles inserted and queried")
+    p_run.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    p_run.add_argument("--runs", type=int, default=1, help="separate runs to take the median of")
+    p_run.add_argument("--database-url", action="store_true",
+                       help="use DATABASE_URL from the environment instead of a scratch database")
+    p_run.add_argument("--output", help="write the results JSON here")
+    p_run.add_argument("--baseline", help="baseline JSON to compare against")
+    p_run.add_argument("--save-baseline", help="also write the results here as the new baseline")
+    p_run.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+
+    p_cmp = sub.add_parser("compare", help="compare two result files")
+    p_cmp.add_argument("results")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("--threshold", type=float, default=0.25)
+
+    p_seed = sub.add_parser("seed", help="add synthetic articles to DATABASE_URL")
+    p_seed.add_argument("--articles", type=int, default=5000)
+    p_seed.add_argument("--seed", type=int, default=SEED)
+
+    p_startup = sub.add_parser("startup", help="startup time and RSS per APP_ROLE")
+    p_startup.add_argument("--repeat", type=int, default=5, help="starts per role")
+    p_startup.add_argument("--output", help="write the results JSON here")
+
+    p_backends = sub.add_parser("backends", help="compare the PDF text extraction backends")
+    p_backends.add_argument("pdfs", nargs="*", help="PDFs to extract (default: a synthetic edition)")
+    p_backends.add_argument("--pages", type=int, default=12, help="pages in the synthetic PDF")
+    p_backends.add_argument("--repeat", type=int, default=3, help="extractions per backend and PDF")
+    p_backends.add_argument("--output", help="write the results JSON here")
+
+    args = parser.parse_args()
+
+    if args.command == "backends":
+        pdfs = args.pdfs
+        if not pdfs:
+            from synthetic_pdf import write_newspaper_pdf
+
+            pdfs = [os.path.join(tempfile.mkdtemp(prefix="news-bench-"), "edition.pdf")]
+            write_newspaper_pdf(pdfs[0], pages=args.pages, articles_per_page=6, columns=4, seed=SEED)
+        results = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                            "pdfs": [os.path.basename(p) for p in pdfs]},
+                   "metrics": bench_backends(pdfs, args.repeat)}
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text)
+        else:
+            print(text)
+        return
+
+    if args.command == "startup":
+        tmp = tempfile.mkdtemp(prefix="news-bench-")
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        os.environ.setdefault("BLOB_DIR", os.path.join(tmp, "blobs"))
+        results = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                            "cpu_count": os.cpu_count()},
+                   "metrics": bench_startup(args.repeat)}
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text)
+        else:
+            print(text)
+        return
+
+    if args.command == "seed":
+        from database import SessionLocal, init_db
+
+        init_db()
+        db = SessionLocal()
+        try:
+            print(f"Seeded {seed_articles(db, args.articles, seed=args.seed)} articles")
+        finally:
+            db.close()
+        return
+
+    if args.command == "compare":
+        with open(args.results) as f:
+            results = json.load(f)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        sys.exit(1 if _compare_or_exit(results, baseline, args.threshold) else 0)
+
+    if args.runs > 1 and args.database_url:
+        parser.error("--runs needs scratch databases; it cannot be combined with --database-url")
+    results = run_repeated(args) if args.runs > 1 else run(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = _compare_or_exit(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%} plus their spread")
+            sys.exit(1)
+    elif not args.output:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
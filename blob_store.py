@@ -0,0 +1,269 @@
+# blob_store.py
+"""
+Content-addressed storage for uploaded PDFs.
+
+Uploads are streamed to disk in UPLOAD_CHUNK_SIZE chunks and hashed on the
+way, so memory use per upload does not depend on the file size.  The file
+is stored as uploads/blobs/<sha[:2]>/<sha>.pdf: uploading the same edition
+twice (under any name) keeps a single copy.
+
+Every blob row counts the live articles that were extracted from it
+(articles.source_hash); crud keeps the count in step with inserts and
+deletes.  collect_garbage() removes blobs nobody references any more.
+
+UploadLimitMiddleware turns away an oversized request body with 413 before
+it is spooled: at once when Content-Length says so, otherwise as soon as the
+received bytes pass the limit.
+
+    python blob_store.py --gc        delete unreferenced blobs
+    python blob_store.py --repair    recount references from the articles table
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = os.environ.get("BLOB_DIR", os.path.join("uploads", "blobs"))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 100 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+# Multipart boundaries and part headers on top of the file itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+# Unreferenced blobs younger than this may still be waiting for their ingest job
+BLOB_GC_GRACE_SECONDS = int(os.environ.get("BLOB_GC_GRACE_SECONDS", 3600))
+
+_TMP_DIR = os.path.join(BLOB_DIR, "tmp")
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES."""
+
+
+def blob_path(content_hash: str) -> str:
+    return os.path.join(BLOB_DIR, content_hash[:2], f"{content_hash}.pdf")
+
+
+def save_upload(upload, max_bytes: int = UPLOAD_MAX_BYTES) -> Tuple[str, str, int]:
+    """
+    Stream an UploadFile into the store. Returns (sha256, path, size).
+    Nothing is kept when the upload is larger than max_bytes.
+    Blocking file I/O: call it from a worker thread, not the event loop.
+    """
+    os.makedirs(_TMP_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=_TMP_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = upload.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"File is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+
+        content_hash = digest.hexdigest()
+        path = blob_path(content_hash)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return content_hash, path, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that caps request bodies at max_bytes.
+
+    A declared Content-Length above the cap is answered with 413 without
+    reading the body.  Chunked or understated bodies are counted as they
+    arrive; once the count passes the cap the app's own response (the form
+    parser fails or the handler never runs) is dropped in favour of 413.
+    save_upload() still checks the file itself.
+    """
+
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def counting_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLargeError(f"Request body is larger than {self.max_bytes} bytes")
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded and not started:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except Exception:
+            if not exceeded or started:
+                raise
+        if exceeded and not started:
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"Request body is larger than {self.max_bytes} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def register(db: Session, content_hash: str, path: str, size: int) -> models.Blob:
+    """Record an uploaded blob (or refresh the upload time of a known one)."""
+    blob = db.get(models.Blob, content_hash)
+    if blob is None:
+        blob = models.Blob(content_hash=content_hash, path=path, size_bytes=size, ref_count=0)
+        db.add(blob)
+    blob.path = path
+    blob.last_uploaded_at = datetime.now()
+    db.commit()
+    return blob
+
+
+def add_refs(db: Session, content_hash: Optional[str], delta: int):
+    """Adjust the reference count of a blob, in the caller's transaction."""
+    if not content_hash or not delta:
+        return
+    (
+        db.query(models.Blob)
+        .filter(models.Blob.content_hash == content_hash)
+        .update({"ref_count": models.Blob.ref_count + delta}, synchronize_session=False)
+    )
+
+
+def collect_garbage(db: Session, grace_seconds: int = BLOB_GC_GRACE_SECONDS) -> Dict:
+    """
+    Delete blobs that no article references, that no queued or running job
+    still needs, and that were not uploaded within the grace period.
+    Leftover partial uploads older than the grace period are removed too.
+    """
+    cutoff = datetime.now() - timedelta(seconds=grace_seconds)
+    busy = (
+        db.query(models.IngestJob.content_hash)
+        .filter(models.IngestJob.state.in_(("queued", "running")))
+        .filter(models.IngestJob.content_hash.isnot(None))
+    )
+    candidates = (
+        db.query(models.Blob)
+        .filter(models.Blob.ref_count <= 0)
+        .filter(models.Blob.last_uploaded_at < cutoff)
+        .filter(models.Blob.content_hash.notin_(busy))
+        .all()
+    )
+    paths = [blob.path for blob in candidates]
+    freed = sum(blob.size_bytes for blob in candidates)
+    for blob in candidates:
+        db.delete(blob)
+    db.commit()
+
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove blob %s: %s", path, e)
+
+    if os.path.isdir(_TMP_DIR):
+        for name in os.listdir(_TMP_DIR):
+            tmp_path = os.path.join(_TMP_DIR, name)
+            if os.path.getmtime(tmp_path) < time.time() - grace_seconds:
+                os.remove(tmp_path)
+
+    return {"blobs_deleted": len(paths), "bytes_freed": freed}
+
+
+def repair(db: Session) -> int:
+    """Recount every blob's references from the articles table. Returns the number of blobs."""
+    counts = dict(
+        db.query(models.Article.source_hash, func.count(models.Article.id))
+        .filter(models.Article.source_hash.isnot(None))
+        .group_by(models.Article.source_hash)
+        .all()
+    )
+    blobs = db.query(models.Blob).all()
+    for blob in blobs:
+        blob.ref_count = counts.get(blob.content_hash, 0)
+    db.commit()
+    return len(blobs)
+
+
+def stats(db: Session) -> Dict:
+    count, total = db.query(
+        func.count(models.Blob.content_hash),
+        func.coalesce(func.sum(models.Blob.size_bytes), 0),
+    ).one()
+    unreferenced = db.query(models.Blob).filter(models.Blob.ref_count <= 0).count()
+    return {
+        "blobs": count,
+        "total_bytes": total,
+        "unreferenced": unreferenced,
+        "max_upload_bytes": UPLOAD_MAX_BYTES,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Uploaded PDF store")
+    parser.add_argument("--gc", action="store_true", help="delete unreferenced blobs")
+    parser.add_argument("--repair", action="store_true", help="recount references")
+    parser.add_argument("--grace", type=int, default=BLOB_GC_GRACE_SECONDS, help="seconds")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.repair:
+            print(f"Recounted references of {repair(db)} blobs")
+        if args.gc:
+            print(collect_garbage(db, args.grace))
+        print(stats(db))
+    finally:
+        db.close()
@@ -0,0 +1,108 @@
+# changelog.py
+"""
+Change sequence behind /sync.
+
+crud appends one row per inserted (or rewritten) article and one tombstone
+per deleted article to article_changes, in the same transaction as the write.  The
+sequence number of the last change a client has seen is its sync token:
+/sync?since=<token> returns only what changed after it, so a refresh costs
+in proportion to the number of changes rather than to the size of the feed.
+
+When an article is deleted its insert entry is dropped, so the log holds
+one row per live article plus the tombstones.
+"""
+from typing import Dict, Iterable, List
+
+from sqlalchemy import false, func, insert, select
+from sqlalchemy.orm import Session
+
+import models
+
+
+class StaleTokenError(ValueError):
+    """Raised for a token from a newer change sequence (e.g. a database that was reset)."""
+
+
+def record_inserted(db: Session, article_ids: Iterable[int]):
+    """Log newly inserted articles, in the caller's transaction."""
+    rows = [{"article_id": article_id, "deleted": False} for article_id in article_ids]
+    if rows:
+        db.execute(insert(models.ArticleChange), rows)
+
+
+def record_updated(db: Session, article_ids: Iterable[int]):
+    """Log articles rewritten in place; /sync returns them again like new ones."""
+    article_ids = list(article_ids)
+    if not article_ids:
+        return
+    (
+        db.query(models.ArticleChange)
+        .filter(models.ArticleChange.article_id.in_(article_ids))
+        .delete(synchronize_session=False)
+    )
+    record_inserted(db, article_ids)
+
+
+def record_deleted(db: Session, article_ids: Iterable[int]):
+    """Log tombstones for deleted articles, in the caller's transaction."""
+    article_ids = list(article_ids)
+    if not article_ids:
+        return
+    (
+        db.query(models.ArticleChange)
+        .filter(models.ArticleChange.article_id.in_(article_ids))
+        .delete(synchronize_session=False)
+    )
+    db.execute(insert(models.ArticleChange), [{"article_id": i, "deleted": True} for i in article_ids])
+
+
+def current_token(db: Session) -> int:
+    return db.query(func.max(models.ArticleChange.seq)).scalar() or 0
+
+
+def changes_since(db: Session, since: int, limit: int, fields: List[str]) -> Dict:
+    """
+    Up to `limit` changes after token `since`: the articles inserted (with
+    the given fields, newest first) and the ids deleted, plus the token to
+    pass next time and whether more changes are waiting.
+    """
+    import crud
+
+    if since > current_token(db):
+        raise StaleTokenError("Sync token is ahead of the server; reload the feed")
+    changes = (
+        db.query(models.ArticleChange)
+        .filter(models.ArticleChange.seq > since)
+        .order_by(models.ArticleChange.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    inserted = [c.article_id for c in changes if not c.deleted]
+    articles = []
+    if inserted:
+        articles = (
+            crud._articles_query(db, fields)
+            .filter(models.Article.id.in_(inserted))
+            .order_by(models.Article.created_at.desc(), models.Article.id.desc())
+            .all()
+        )
+    return {
+        "articles": articles,
+        "deleted": [c.article_id for c in changes if c.deleted],
+        "token": changes[-1].seq if changes else since,
+        "has_more": has_more,
+    }
+
+
+def rebuild(db: Session):
+    """Log every existing article as inserted (databases from before the change log)."""
+    db.query(models.ArticleChange).delete(synchronize_session=False)
+    db.execute(
+        insert(models.ArticleChange).from_select(
+            ["article_id", "deleted"],
+            select(models.Article.id, false()).order_by(models.Article.id),
+        )
+    )
+    db.commit()
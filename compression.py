@@ -0,0 +1,266 @@
+# compression.py
+"""
+Transparent compression of article content and summary.
+
+With CONTENT_COMPRESSION=zlib, new values are stored as BLOBs that start
+with a one-byte codec tag:
+
+    0x01  zlib
+    0x02  zlib with a shared dictionary; a 2-byte dictionary id follows
+
+The dictionary is trained on our own articles (common words and phrases of
+newspaper text) and kept in compression_dicts, so short articles compress
+well too.  Values that are still plain TEXT (rows written before
+compression, or with CONTENT_COMPRESSION=none) are returned unchanged, so
+both kinds of row can live side by side while the migration runs.
+
+SQLite only: the BLOBs are stored in the existing TEXT columns, and SQL that
+needs the text (the FTS index) reads it through the article_text() function
+registered on every app connection.  While compressed rows exist, writes to
+articles therefore have to go through the app (or another connection that
+registers article_text()); see fts.init_fts().
+
+    python compression.py --train              train a new dictionary
+    python compression.py --migrate            compress existing rows in batches
+    python compression.py --decompress         store every row as plain text again
+"""
+import logging
+import os
+import re
+import struct
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.types import Text, TypeDecorator
+
+logger = logging.getLogger(__name__)
+
+CONTENT_COMPRESSION = os.environ.get("CONTENT_COMPRESSION", "none").lower()  # none or zlib
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 512))  # shorter values (summaries) stay plain text
+COMPRESSION_LEVEL = 6
+
+CODEC_ZLIB = 0x01
+CODEC_ZLIB_DICT = 0x02
+
+DICT_SIZE = 32 * 1024  # zlib only uses the last 32 KB of a preset dictionary
+
+_dicts: Dict[int, bytes] = {}
+_active_dict_id: Optional[int] = None
+
+
+def set_dictionaries(dicts: Dict[int, bytes]):
+    """Install known dictionaries; the highest id is used for new values."""
+    global _active_dict_id
+    _dicts.update(dicts)
+    _active_dict_id = max(_dicts) if _dicts else None
+
+
+def load_dictionaries(engine):
+    """Read every trained dictionary from the database."""
+    import models
+
+    table = models.CompressionDict.__table__
+    with engine.connect() as conn:
+        set_dictionaries({row.id: row.data for row in conn.execute(table.select())})
+
+
+def _dictionary(dict_id: int) -> bytes:
+    if dict_id not in _dicts:
+        # Trained by another process after this one started
+        from database import read_engine
+        load_dictionaries(read_engine)
+    return _dicts[dict_id]
+
+
+def compress_text(value: str) -> bytes:
+    raw = value.encode("utf-8")
+    if _active_dict_id is not None:
+        c = zlib.compressobj(COMPRESSION_LEVEL, zdict=_dicts[_active_dict_id])
+        return bytes([CODEC_ZLIB_DICT]) + struct.pack(">H", _active_dict_id) + c.compress(raw) + c.flush()
+    return bytes([CODEC_ZLIB]) + zlib.compress(raw, COMPRESSION_LEVEL)
+
+
+def decode_text(value):
+    """Return the text of a stored value, whatever codec it was written with."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    codec = value[0] if value else None
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    if codec == CODEC_ZLIB_DICT:
+        (dict_id,) = struct.unpack(">H", value[1:3])
+        d = zlib.decompressobj(zdict=_dictionary(dict_id))
+        return (d.decompress(value[3:]) + d.flush()).decode("utf-8")
+    raise ValueError(f"Unknown content codec: {codec!r}")
+
+
+def encode_text(value, mode: Optional[str] = None):
+    """Value to store for a text, according to the compression mode."""
+    mode = CONTENT_COMPRESSION if mode is None else mode
+    if value is None or mode != "zlib" or len(value) < COMPRESS_MIN_BYTES:
+        return value
+    return compress_text(value)
+
+
+class CompressedText(TypeDecorator):
+    """Text column whose values may be stored compressed (see module docstring)."""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_text(value)
+
+
+def install_sqlite_functions(dbapi_connection):
+    """Make article_text(value) available to SQL on a new SQLite connection."""
+    dbapi_connection.create_function("article_text", 1, decode_text, deterministic=True)
+
+
+def has_compressed_rows(conn) -> bool:
+    """Whether any article still stores summary or content compressed (SQLite)."""
+    from sqlalchemy import text
+
+    return conn.execute(
+        text("SELECT 1 FROM articles WHERE typeof(content) = 'blob' OR typeof(summary) = 'blob' LIMIT 1")
+    ).first() is not None
+
+
+def train_dictionary(texts: Iterable[str], size: int = DICT_SIZE, segment: int = 256) -> bytes:
+    """
+    Build a zlib preset dictionary from sample articles.
+
+    The articles are cut into segments; segments that repeat, or are made of
+    words found in many articles (bylines, datelines, common phrasing), are
+    kept until the dictionary is full.  The best segments go last, where
+    zlib reaches them at the shortest distance.
+    """
+    texts = list(texts)
+    doc_freq = Counter()
+    for text in texts:
+        doc_freq.update(set(re.findall(r"\w+", text.lower())))
+
+    segments = Counter()
+    for text in texts:
+        for i in range(0, len(text), segment):
+            segments[text[i:i + segment]] += 1
+
+    def score(seg: str) -> float:
+        words = re.findall(r"\w+", seg.lower())
+        return segments[seg] * sum(doc_freq[w] for w in words) / max(1, len(seg))
+
+    picked = []
+    total = 0
+    for seg in sorted(segments, key=score, reverse=True):
+        chunk = seg.encode("utf-8")
+        if total + len(chunk) > size:
+            continue
+        picked.append(chunk)
+        total += len(chunk)
+    return b"".join(reversed(picked))
+
+
+def _sample_texts(db, limit: int = 2000):
+    import models
+    from sqlalchemy import func
+
+    rows = db.query(models.Article.content).order_by(func.random()).limit(limit)
+    return [content for (content,) in rows if content]
+
+
+def train_and_store(db, limit: int = 2000) -> int:
+    """Train a dictionary on a sample of stored articles and make it the active one."""
+    import models
+
+    data = train_dictionary(_sample_texts(db, limit))
+    entry = models.CompressionDict(data=data)
+    db.add(entry)
+    db.commit()
+    set_dictionaries({entry.id: data})
+    return entry.id
+
+
+def migrate(engine, mode: str = "zlib", batch_size: int = 500) -> int:
+    """
+    Re-encode every article in batches of batch_size rows, one short
+    transaction per batch, so the API keeps serving while it runs.
+    Returns the number of rows rewritten.
+    """
+    from sqlalchemy import text
+    import fts
+
+    want_blob = mode == "zlib"
+    if want_blob:
+        # The index must decode rows from the first compressed one on
+        fts.init_fts(engine, decoded=True)
+    rewritten = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, summary, content, typeof(content) = 'blob' AS is_blob FROM articles "
+                    "WHERE id > :last_id ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": batch_size},
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                last_id = row.id
+                if bool(row.is_blob) == want_blob:
+                    continue
+                summary = decode_text(row.summary)
+                content = decode_text(row.content)
+                conn.execute(
+                    text("UPDATE articles SET summary = :summary, content = :content WHERE id = :id"),
+                    {
+                        "id": row.id,
+                        "summary": encode_text(summary, mode),
+                        "content": encode_text(content, mode),
+                    },
+                )
+                rewritten += 1
+        logger.info("Re-encoded up to article %d (%d rows rewritten)", last_id, rewritten)
+    # Back to plain view and triggers once no compressed row is left
+    if fts.init_fts(engine) and rewritten:
+        # Every rewrite re-indexed its row; merge the resulting index segments
+        with engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {fts.FTS_TABLE}({fts.FTS_TABLE}) VALUES ('optimize')"))
+    return rewritten
+
+
+if __name__ == "__main__":
+    import argparse
+    import logs
+    from database import SessionLocal, engine, init_db
+
+    logs.setup_logging()
+
+    parser = argparse.ArgumentParser(description="Compressed article storage")
+    parser.add_argument("--train", action="store_true", help="train a new shared dictionary")
+    parser.add_argument("--migrate", action="store_true", help="compress existing rows")
+    parser.add_argument("--decompress", action="store_true", help="store every row as plain text")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the file")
+    args = parser.parse_args()
+
+    init_db()
+    if args.train or (args.migrate and _active_dict_id is None):
+        db = SessionLocal()
+        try:
+            print(f"Trained dictionary {train_and_store(db)}")
+        finally:
+            db.close()
+    if args.migrate:
+        migrate(engine, "zlib", args.batch_size)
+    elif args.decompress:
+        migrate(engine, "none", args.batch_size)
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
@@ -1,7 +1,77 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-import models, schemas
-from typing import List, Dict, Optional
+from sqlalchemy.orm import Session, Query, load_only
+from sqlalchemy import func, desc, insert, select, update, tuple_, type_coerce, String, Text
+from pydantic import ValidationError
+import models, schemas, fts, stats, blob_store, changelog, dedup, related
+from datetime import datetime
+from typing import Iterable, Iterator, List, Dict, Optional, Union
+from collections import Counter
+import base64
+import json
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(position: Dict) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except Exception:
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise InvalidCursorError("Invalid cursor")
+    return position
+
+def _page_by_created_at(query: Query, limit: int, offset: int, cursor: Optional[str]):
+    """
+    Page a query newest first. With a cursor the page starts right after the
+    (created_at, id) it encodes, which an index can seek to directly and which
+    is not shifted by rows inserted meanwhile; otherwise offset is used.
+    Every returned article carries the cursor of its own position.
+    """
+    # created_at exactly as stored, so cursor comparisons match ORDER BY
+    created_raw = type_coerce(models.Article.created_at, String)
+    query = query.add_columns(created_raw)
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            after = (str(position["c"]), int(position["i"]))
+        except (KeyError, TypeError, ValueError):
+            raise InvalidCursorError("Invalid cursor")
+        query = query.filter(tuple_(created_raw, models.Article.id) < tuple_(*after))
+        offset = 0
+    rows = (
+        query
+        .order_by(models.Article.created_at.desc(), models.Article.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    articles = []
+    for article, created_at in rows:
+        article.cursor = encode_cursor({"c": str(created_at), "i": article.id})
+        articles.append(article)
+    return articles
+
+def bump_generation(db: Session):
+    """
+    Mark the article data as changed, in the caller's transaction.
+    Cached responses built from an older generation are no longer served.
+    """
+    db.execute(
+        update(models.DataGeneration)
+        .where(models.DataGeneration.id == 1)
+        .values(value=models.DataGeneration.value + 1)
+    )
+
+def get_generation(db: Session) -> int:
+    return db.query(models.DataGeneration.value).filter(models.DataGeneration.id == 1).scalar() or 0
 
 def create_article(db: Session, article_in: schemas.ArticleCreate):
     db_article = models.Article(
@@ -13,18 +83,185 @@ def create_article(db: Session, article_in: schemas.ArticleCreate):
         published_date=article_in.published_date,
     )
     db.add(db_article)
+    db.flush()
+    db.refresh(db_article)  # server-side created_at, needed for the hourly bucket
+    stats.record_inserted(db, [(db_article.category, db_article.created_at)])
+    changelog.record_inserted(db, [db_article.id])
+    if dedup.DEDUP_MODE != "off":
+        # Matchable by later ingests; a hand-posted article is not checked itself
+        dedup.index(db, [(db_article.id, dedup.signature(db_article.content))])
+    related.index(db, [(db_article.id, f"{db_article.title}\n{db_article.content}")])
+    bump_generation(db)
     db.commit()
     db.refresh(db_article)
     return db_article
 
-def get_articles(db: Session, limit: int = 50, offset: int = 0):
-    return (
-        db.query(models.Article)
-        .order_by(models.Article.created_at.desc())
-        .offset(offset)
-        .limit(limit)
+def create_articles_bulk(
+    db: Session,
+    articles: List[Union[Dict, schemas.ArticleCreate]],
+    commit: bool = True,
+    source_hash: Optional[str] = None,
+    deduplicate: bool = False,
+    created_at: Optional[datetime] = None,
+) -> Dict:
+    """
+    Validate a batch of articles and insert the valid ones in one transaction.
+    Returns {"ids": [...], "errors": [...], "duplicates": [...]}: ids lines up
+    with the input (None for rejected rows) and errors holds {"index", "error"}
+    for every row that failed validation. Invalid rows never abort the rest
+    of the batch.
+    source_hash links the articles to the uploaded PDF they came from.
+    With deduplicate=True, rows that near-duplicate a stored article or an
+    earlier row of the batch are not inserted (see dedup.py); duplicates
+    holds {"index", "original_id", "similarity"} for each.
+    created_at overrides the insert time (reprocess keeps an edition's date).
+    With commit=False the caller owns the transaction.
+    """
+    rows = []
+    positions = []
+    errors = []
+    for i, item in enumerate(articles):
+        try:
+            if not isinstance(item, schemas.ArticleCreate):
+                item = schemas.ArticleCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append({"index": i, "error": "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )})
+            continue
+        row = {**item.model_dump(), "source_hash": source_hash}
+        if created_at is not None:
+            row["created_at"] = created_at
+        rows.append(row)
+        positions.append(i)
+
+    ids = [None] * len(articles)
+    duplicates = []
+    signatures = None
+    if rows and deduplicate and dedup.DEDUP_MODE != "off":
+        signatures, matches = dedup.check(db, [row["content"] for row in rows], source_hash)
+        # Rows duplicating an earlier row of the batch are linked once that row has an id
+        kept = {i: k for k, i in enumerate(i for i, match in enumerate(matches) if match is None)}
+        duplicates = [(i, match) for i, match in enumerate(matches) if match is not None]
+        dropped = [(rows[i], positions[i], match) for i, match in duplicates]
+        rows = [rows[i] for i in kept]
+        positions = [positions[i] for i in kept]
+        signatures = [signatures[i] for i in kept]
+
+    if rows:
+        result = db.execute(
+            insert(models.Article).returning(
+                models.Article.id, models.Article.category, models.Article.created_at,
+                sort_by_parameter_order=True,
+            ),
+            rows,
+        )
+        inserted = result.all()
+        for position, row in zip(positions, inserted):
+            ids[position] = row.id
+        stats.record_inserted(db, [(row.category, row.created_at) for row in inserted])
+        changelog.record_inserted(db, [row.id for row in inserted])
+        if signatures is not None:
+            dedup.index(db, zip((row.id for row in inserted), signatures))
+        related.index(db, [(r.id, f"{row['title']}\n{row['content']}") for r, row in zip(inserted, rows)])
+        blob_store.add_refs(db, source_hash, len(inserted))
+        bump_generation(db)
+
+    if duplicates:
+        resolved = []
+        for row, position, (kind, original, similarity) in dropped:
+            if kind == "batch":
+                original = inserted[kept[original]].id
+            resolved.append({"index": position, "original_id": original, "similarity": similarity})
+        if dedup.DEDUP_MODE == "link":
+            dedup.link(db, [
+                {"original_id": d["original_id"], "title": row["title"], "source_file": row["source_file"],
+                 "source_hash": source_hash, "similarity": d["similarity"]}
+                for (row, _, _), d in zip(dropped, resolved)
+            ])
+            bump_generation(db)
+        duplicates = resolved
+
+    if commit and (rows or duplicates):
+        db.commit()
+
+    return {"ids": ids, "errors": errors, "duplicates": duplicates}
+
+def update_articles_bulk(db: Session, updates: Dict[int, Union[Dict, schemas.ArticleCreate]],
+                         commit: bool = True) -> int:
+    """
+    Rewrite existing articles in place: {article id: new fields}. Ids and
+    created_at stay, so the feed order does not change; statistics, the
+    /sync log and the dedup and related indexes are updated as for a
+    re-insert. Returns the number of articles updated.
+    With commit=False the caller owns the transaction.
+    """
+    rows = {
+        article_id: schemas.ArticleCreate.model_validate(fields).model_dump()
+        for article_id, fields in updates.items()
+    }
+    current = (
+        db.query(models.Article.id, models.Article.category, models.Article.created_at)
+        .filter(models.Article.id.in_(list(rows)))
         .all()
     )
+    if not current:
+        return 0
+    ids = [article_id for article_id, _, _ in current]
+    related.forget(db, ids)  # reads the old text, so before the rewrite
+    db.execute(update(models.Article), [{"id": article_id, **rows[article_id]} for article_id in ids])
+    stats.record_deleted(db, [(category, created) for _, category, created in current])
+    stats.record_inserted(db, [(rows[article_id]["category"], created) for article_id, _, created in current])
+    changelog.record_updated(db, ids)
+    if dedup.DEDUP_MODE != "off":
+        dedup.forget(db, ids)
+        dedup.index(db, [(article_id, dedup.signature(rows[article_id]["content"])) for article_id in ids])
+    related.index(db, [(article_id, f"{rows[article_id]['title']}\n{rows[article_id]['content']}") for article_id in ids])
+    bump_generation(db)
+    if commit:
+        db.commit()
+    return len(ids)
+
+def _articles_query(db: Session, fields: Optional[Iterable[str]] = None) -> Query:
+    """
+    Query articles loading only the columns behind the given fields; None
+    loads every column.  List views leave out content, so SQLite never
+    reads (or decompresses) it for them.
+    """
+    query = db.query(models.Article)
+    if fields is not None:
+        columns = models.Article.__table__.c
+        query = query.options(load_only(*[getattr(models.Article, f) for f in fields if f in columns]))
+    return query
+
+def get_articles(db: Session, limit: int = 50, offset: int = 0, cursor: Optional[str] = None,
+                 fields: Optional[Iterable[str]] = None):
+    return _page_by_created_at(_articles_query(db, fields), limit, offset, cursor)
+
+# Columns of crud.iter_articles rows, in export order
+EXPORT_COLUMNS = ("id", "title", "summary", "content", "category", "source_file", "published_date", "created_at")
+
+def iter_articles(db: Session, category: Optional[str] = None, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None, source_file: Optional[str] = None,
+                  batch_size: int = 1000) -> Iterator[Dict]:
+    """
+    Every article matching the filters, as dicts in id order, in one pass
+    over the table: rows are fetched batch_size at a time (yield_per), so
+    memory does not grow with the number of articles. since/until bound
+    created_at (since inclusive, until exclusive).
+    """
+    columns = models.Article.__table__.c
+    stmt = select(*[columns[name] for name in EXPORT_COLUMNS]).order_by(columns.id)
+    if category:
+        stmt = stmt.where(columns.category == category)
+    if since:
+        stmt = stmt.where(columns.created_at >= since)
+    if until:
+        stmt = stmt.where(columns.created_at < until)
+    if source_file:
+        stmt = stmt.where(columns.source_file == source_file)
+    for row in db.execute(stmt.execution_options(yield_per=batch_size)).mappings():
+        yield dict(row)
 
 def get_article(db: Session, article_id: int):
     return db.query(models.Article).filter(models.Article.id == article_id).first()
@@ -36,63 +273,79 @@ def get_categories(db: Session) -> List[str]:
 
 def get_categories_with_counts(db: Session) -> List[Dict]:
     """Get categories with article counts."""
-    results = (
-        db.query(
-            models.Article.category,
-            func.count(models.Article.id).label('count')
-        )
-        .filter(models.Article.category.isnot(None))
-        .group_by(models.Article.category)
-        .order_by(desc('count'))
-        .all()
-    )
-    
     return [
         {"name": category, "count": count, "display_name": category.title()} 
-        for category, count in results
+        for category, count in stats.get_category_counts(db)
     ]
 
-def get_articles_by_category(db: Session, category: str, limit: int = 50, offset: int = 0):
-    return (
-        db.query(models.Article)
-        .filter(models.Article.category == category)
-        .order_by(models.Article.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+def get_articles_by_category(db: Session, category: str, limit: int = 50, offset: int = 0, cursor: Optional[str] = None,
+                             fields: Optional[Iterable[str]] = None):
+    return _page_by_created_at(
+        _articles_query(db, fields).filter(models.Article.category == category),
+        limit, offset, cursor,
     )
 
-def search_articles(db: Session, q: str, limit: int = 50, offset: int = 0):
+def _text_of(db: Session, column):
+    """SQL expression for the text of a possibly compressed column (see compression.py)."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.article_text(column, type_=Text)
+    return type_coerce(column, Text)
+
+def _search_like(db: Session, q: str, category: Optional[str], limit: int, offset: int, cursor: Optional[str],
+                 fields: Optional[Iterable[str]] = None):
+    """Fallback substring search for databases without FTS5."""
     q_like = f"%{q}%"
-    return (
-        db.query(models.Article)
-        .filter(
-            (models.Article.title.ilike(q_like)) | 
-            (models.Article.content.ilike(q_like)) |
-            (models.Article.summary.ilike(q_like))
-        )
-        .order_by(models.Article.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    query = _articles_query(db, fields)
+    if category:
+        query = query.filter(models.Article.category == category)
+    query = query.filter(
+        (models.Article.title.ilike(q_like)) | 
+        (_text_of(db, models.Article.content).ilike(q_like)) |
+        (_text_of(db, models.Article.summary).ilike(q_like))
     )
+    return _page_by_created_at(query, limit, offset, cursor)
+
+def _search_ranked(db: Session, q: str, category: Optional[str], limit: int, offset: int, cursor: Optional[str],
+                   fields: Optional[Iterable[str]] = None):
+    """BM25-ranked full-text search; attaches rank, highlighted title and snippet to each article."""
+    if not fts.fts_available(db.connection()):
+        return _search_like(db, q, category, limit, offset, cursor, fields)
 
-def search_articles_by_category(db: Session, category: str, q: str, limit: int = 50, offset: int = 0):
+    after = None
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            after = (float(position["r"]), int(position["i"]))
+        except (KeyError, TypeError, ValueError):
+            raise InvalidCursorError("Invalid cursor")
+    hits = fts.search_ids(db, q, category=category, limit=limit, offset=offset, after=after)
+    if not hits:
+        return []
+
+    by_id = {
+        a.id: a
+        for a in _articles_query(db, fields).filter(models.Article.id.in_([h[0] for h in hits])).all()
+    }
+    results = []
+    for article_id, rank, title_highlight, snippet in hits:
+        article = by_id.get(article_id)
+        if article is None:
+            continue
+        article.rank = rank
+        article.title_highlight = title_highlight
+        article.snippet = snippet
+        article.cursor = encode_cursor({"r": rank, "i": article_id})
+        results.append(article)
+    return results
+
+def search_articles(db: Session, q: str, limit: int = 50, offset: int = 0, cursor: Optional[str] = None,
+                    fields: Optional[Iterable[str]] = None):
+    return _search_ranked(db, q, None, limit, offset, cursor, fields)
+
+def search_articles_by_category(db: Session, category: str, q: str, limit: int = 50, offset: int = 0,
+                                cursor: Optional[str] = None, fields: Optional[Iterable[str]] = None):
     """Search articles within a specific category."""
-    q_like = f"%{q}%"
-    return (
-        db.query(models.Article)
-        .filter(models.Article.category == category)
-        .filter(
-            (models.Article.title.ilike(q_like)) | 
-            (models.Article.content.ilike(q_like)) |
-            (models.Article.summary.ilike(q_like))
-        )
-        .order_by(models.Article.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+    return _search_ranked(db, q, category, limit, offset, cursor, fields)
 
 def get_recent_articles(db: Session, days: int = 7, limit: int = 10):
     """Get most recent articles from the last N days."""
@@ -111,39 +364,65 @@ def get_popular_articles(db: Session, limit: int = 10):
     """Get articles with longest content (proxy for importance)."""
     return (
         db.query(models.Article)
-        .order_by(func.length(models.Article.content).desc())
+        .order_by(func.length(_text_of(db, models.Article.content)).desc())
         .limit(limit)
         .all()
     )
 
 def get_database_stats(db: Session) -> Dict:
     """Get overall database statistics."""
-    total_articles = db.query(models.Article).count()
-    categories_count = db.query(models.Article.category).distinct().count()
-    
-    # Recent articles (last 24 hours)
-    from datetime import datetime, timedelta
-    yesterday = datetime.now() - timedelta(days=1)
-    recent_count = db.query(models.Article).filter(
-        models.Article.created_at >= yesterday
-    ).count()
-    
+    categories = get_categories_with_counts(db)
     return {
-        "total_articles": total_articles,
-        "categories_count": categories_count,
-        "recent_articles_24h": recent_count,
-        "categories": get_categories_with_counts(db)
+        "total_articles": stats.get_total_articles(db),
+        "categories_count": len(categories),
+        "recent_articles_24h": stats.get_recent_count(db, hours=24),
+        "categories": categories
     }
 
 def delete_article(db: Session, article_id: int) -> bool:
     """Delete an article by ID."""
     article = db.query(models.Article).filter(models.Article.id == article_id).first()
     if article:
+        related.forget(db, [article.id])  # reads the row, so before it goes
         db.delete(article)
+        stats.record_deleted(db, [(article.category, article.created_at)])
+        changelog.record_deleted(db, [article.id])
+        dedup.forget(db, [article.id])
+        blob_store.add_refs(db, article.source_hash, -1)
+        bump_generation(db)
         db.commit()
         return True
     return False
 
+def delete_articles_by_source_hash(db: Session, content_hash: str, commit: bool = True) -> int:
+    """Delete every article extracted from one PDF. Returns how many were deleted."""
+    query = db.query(models.Article).filter(models.Article.source_hash == content_hash)
+    return _delete_articles(db, query, commit)
+
+def delete_articles_by_ids(db: Session, article_ids: Iterable[int], commit: bool = True) -> int:
+    """Delete the given articles. Returns how many were deleted."""
+    query = db.query(models.Article).filter(models.Article.id.in_(list(article_ids)))
+    return _delete_articles(db, query, commit)
+
+def _delete_articles(db: Session, query: Query, commit: bool) -> int:
+    rows = query.with_entities(
+        models.Article.id, models.Article.category, models.Article.created_at, models.Article.source_hash,
+    ).all()
+    if rows:
+        deleted_ids = [article_id for article_id, _, _, _ in rows]
+        related.forget(db, deleted_ids)  # reads the rows, so before they go
+        query.delete(synchronize_session=False)
+        stats.record_deleted(db, [(category, created_at) for _, category, created_at, _ in rows])
+        changelog.record_deleted(db, deleted_ids)
+        dedup.forget(db, deleted_ids)
+        refs = Counter(source_hash for _, _, _, source_hash in rows)
+        for source_hash, count in refs.items():
+            blob_store.add_refs(db, source_hash, -count)
+        bump_generation(db)
+        if commit:
+            db.commit()
+    return len(rows)
+
 def get_articles_by_source(db: Session, source_file: str, limit: int = 50):
     """Get all articles from a specific source file."""
     return (
@@ -1,19 +1,154 @@
 # database.py
-from sqlalchemy import create_engine
+"""
+Engines and sessions.
+
+Connection settings come from the environment:
+
+    DATABASE_URL        default sqlite:///./news.db
+    READ_DATABASE_URL   optional replica for read-only requests
+    STORAGE_PROFILE     production (default) or compat, see STORAGE_PROFILES
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+    SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB, SQLITE_BUSY_TIMEOUT_MS
+
+Writes go through `engine` / SessionLocal; GET handlers use the read-only
+`read_engine` / ReadSessionLocal.  On SQLite the writer pool holds a single
+connection and every write transaction starts with BEGIN IMMEDIATE, so
+writers (API threads and ingest worker processes) queue for the write lock
+instead of failing with "database is locked", while WAL lets readers keep
+reading during a bulk ingest.
+"""
+import os
+from typing import Dict
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./news.db"  # ✅ simple SQLite DB (can replace with PostgreSQL/MySQL)
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./news.db")
+READ_DATABASE_URL = os.environ.get("READ_DATABASE_URL", DATABASE_URL)
+STORAGE_PROFILE = os.environ.get("STORAGE_PROFILE", "production")
+
+STORAGE_PROFILES: Dict[str, Dict] = {
+    # WAL + relaxed fsync: readers never wait for the writer; a power loss can
+    # lose the last transactions but never corrupts the database
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size_kb": 64 * 1024,
+        "busy_timeout_ms": 30000,
+        "pool_size": 5,
+        "max_overflow": 10,
+    },
+    # SQLite defaults, for file systems without shared memory (WAL needs it)
+    "compat": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size_kb": 2 * 1024,
+        "busy_timeout_ms": 30000,
+        "pool_size": 5,
+        "max_overflow": 10,
+    },
+}
+
+if STORAGE_PROFILE not in STORAGE_PROFILES:
+    raise ValueError(f"Unknown STORAGE_PROFILE {STORAGE_PROFILE!r}, expected one of {sorted(STORAGE_PROFILES)}")
+
+_profile = STORAGE_PROFILES[STORAGE_PROFILE]
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", _profile["synchronous"])
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", _profile["mmap_size"]))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", _profile["cache_size_kb"]))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", _profile["busy_timeout_ms"]))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", _profile["pool_size"]))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", _profile["max_overflow"]))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 3600))
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _apply_pragmas(dbapi_connection, writer: bool):
+    import compression
+
+    cursor = dbapi_connection.cursor()
+    if writer:
+        cursor.execute(f"PRAGMA journal_mode={_profile['journal_mode']}")
+    else:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={-SQLITE_CACHE_SIZE_KB}")  # negative = KiB
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+    compression.install_sqlite_functions(dbapi_connection)
+
+
+def _make_engine(url: str, writer: bool):
+    if not _is_sqlite(url):
+        return create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    pool_args = {}
+    if not _is_memory(url):
+        # The single writer connection is the write queue of this process
+        pool_args = {
+            "pool_size": 1 if writer else DB_POOL_SIZE,
+            "max_overflow": 0 if writer else DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+        }
+    new_engine = create_engine(url, connect_args={"check_same_thread": False}, **pool_args)
+
+    @event.listens_for(new_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_pragmas(dbapi_connection, writer)
+        if writer:
+            # Let SQLAlchemy emit BEGIN itself (see _on_begin)
+            dbapi_connection.isolation_level = None
+
+    if writer:
+        @event.listens_for(new_engine, "begin")
+        def _on_begin(conn):
+            if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+                # Take the write lock up front; a deferred transaction that
+                # reads first cannot wait for it and fails immediately instead
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return new_engine
+
+
+engine = _make_engine(DATABASE_URL, writer=True)
+read_engine = engine if _is_memory(DATABASE_URL) else _make_engine(READ_DATABASE_URL, writer=False)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
 
+def dispose_engines():
+    """Drop pooled connections inherited from a parent process."""
+    engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.dispose(close=False)
+
+
 def init_db():
     """Initialize database and create tables."""
     import models  # ensure models are imported before creating tables
+    import compression, fts, migrations
     Base.metadata.create_all(bind=engine)
+    migrations.run_migrations(engine)
+    compression.load_dictionaries(engine)
+    fts.init_fts(engine)
@@ -0,0 +1,242 @@
+# dedup.py
+"""
+Near-duplicate detection for ingested articles.
+
+Syndicated wire stories appear in several editions, and re-chunked parses
+of one PDF overlap.  Each article's content is cut into word shingles and
+summarised by a MinHash signature; the signature is split into LSH bands,
+whose hashes are stored in lsh_bands.  A new article is compared only with
+the articles that share at least one band with it (an indexed lookup, so
+the cost does not grow with the table), and counts as a duplicate when the
+estimated Jaccard similarity of their shingles reaches DEDUP_THRESHOLD.
+
+Signatures use one-permutation hashing: each shingle is hashed once and the
+hash picks one of NUM_HASHES bins, which keeps the minimum.  This gives the
+same Jaccard estimate as NUM_HASHES independent hash functions for one
+NUM_HASHES-th of the work.
+
+DEDUP_MODE decides what happens to a duplicate:
+- "link" (default): it is not inserted; a duplicate_links row records
+  where else the original appeared;
+- "skip": it is dropped;
+- "off": no checks.
+
+Articles stored before this module existed have no signature; index them with
+
+    python dedup.py --rebuild
+"""
+import hashlib
+import os
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+
+DEDUP_MODE = os.environ.get("DEDUP_MODE", "link")
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", 0.8))  # estimated Jaccard similarity
+SHINGLE_WORDS = int(os.environ.get("DEDUP_SHINGLE_WORDS", 5))
+
+NUM_HASHES = 128
+BANDS = 16  # 8 rows per band: pairs above ~0.7 similarity share a band with high probability
+ROWS = NUM_HASHES // BANDS
+_MASK32 = 0xFFFFFFFF
+
+_WORD = re.compile(r"\w+")
+
+if DEDUP_MODE not in ("link", "skip", "off"):
+    raise ValueError(f"DEDUP_MODE must be link, skip or off, not {DEDUP_MODE!r}")
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def signature(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash signature of the word shingles of text; None when it is too short to have any."""
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return None
+    bins: List[Optional[int]] = [None] * NUM_HASHES
+    for i in range(len(words) - SHINGLE_WORDS + 1):
+        h = _hash64(" ".join(words[i:i + SHINGLE_WORDS]).encode())
+        slot, value = h % NUM_HASHES, h >> 32
+        if bins[slot] is None or value < bins[slot]:
+            bins[slot] = value
+    # Empty bins borrow from the next filled one, offset by the distance
+    filled = [i for i, v in enumerate(bins) if v is not None]
+    for i, value in enumerate(bins):
+        if value is None:
+            j = next((f for f in filled if f > i), filled[0])
+            distance = (j - i) % NUM_HASHES
+            bins[i] = (bins[j] + distance * 0x9E3779B1) & _MASK32
+    return tuple(bins)
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_HASHES
+
+
+def band_buckets(sig: Sequence[int]) -> List[int]:
+    """One bucket per band; articles sharing a bucket are candidate duplicates."""
+    buckets = []
+    for band in range(BANDS):
+        rows = array("I", sig[band * ROWS:(band + 1) * ROWS]).tobytes()
+        # Signed, to fit an SQLite INTEGER
+        buckets.append(_hash64(bytes([band]) + rows) - (1 << 63))
+    return buckets
+
+
+def _pack(sig: Sequence[int]) -> bytes:
+    return array("I", sig).tobytes()
+
+
+def _unpack(data: bytes) -> Tuple[int, ...]:
+    return tuple(array("I", data))
+
+
+def _candidates(db: Session, buckets: Iterable[int],
+                exclude_source_hash: Optional[str] = None) -> Dict[int, Tuple[int, ...]]:
+    """
+    Signatures of the stored articles in any of the buckets, by article id,
+    leaving out articles extracted from the PDF exclude_source_hash.
+    """
+    buckets = list(set(buckets))
+    ids = set()
+    for start in range(0, len(buckets), 500):
+        ids.update(
+            article_id for (article_id,) in
+            db.query(models.LshBand.article_id).filter(models.LshBand.bucket.in_(buckets[start:start + 500]))
+        )
+    if ids and exclude_source_hash is not None:
+        ids -= {
+            article_id for (article_id,) in
+            db.query(models.Article.id)
+            .filter(models.Article.id.in_(ids))
+            .filter(models.Article.source_hash == exclude_source_hash)
+        }
+    if not ids:
+        return {}
+    return {
+        article_id: _unpack(data) for article_id, data in
+        db.query(models.MinHashSignature.article_id, models.MinHashSignature.signature)
+        .filter(models.MinHashSignature.article_id.in_(ids))
+    }
+
+
+def check(db: Session, contents: Sequence[str], source_hash: Optional[str] = None) -> Tuple[List[Optional[Tuple[int, ...]]], List[Optional[Tuple[str, int, float]]]]:
+    """
+    Signatures of a batch of new articles and, for each, the article it
+    duplicates: ("stored", article id, similarity), ("batch", index of an
+    earlier article of this batch, similarity), or None.
+    Stored articles from the same PDF (source_hash) do not count: a forced
+    re-ingest of an edition is a fresh copy, not a duplicate of the old one.
+    """
+    sigs = [signature(text or "") for text in contents]
+    buckets = [band_buckets(sig) if sig else [] for sig in sigs]
+    stored = _candidates(db, (b for bs in buckets for b in bs), source_hash)
+
+    matches: List[Optional[Tuple[str, int, float]]] = []
+    batch_buckets: Dict[int, List[int]] = {}  # bucket -> indexes of kept articles in this batch
+    for i, sig in enumerate(sigs):
+        match = None
+        if sig is not None:
+            best = (None, None, 0.0)
+            for article_id, other in stored.items():
+                score = similarity(sig, other)
+                if score > best[2]:
+                    best = ("stored", article_id, score)
+            for j in {j for b in buckets[i] for j in batch_buckets.get(b, ())}:
+                score = similarity(sig, sigs[j])
+                if score > best[2]:
+                    best = ("batch", j, score)
+            if best[0] is not None and best[2] >= DEDUP_THRESHOLD:
+                match = best
+        matches.append(match)
+        if match is None:
+            for b in buckets[i]:
+                batch_buckets.setdefault(b, []).append(i)
+    return sigs, matches
+
+
+def index(db: Session, items: Iterable[Tuple[int, Optional[Sequence[int]]]]):
+    """Store (article id, signature) pairs and their bands, in the caller's transaction."""
+    signatures = []
+    bands = []
+    for article_id, sig in items:
+        if sig is None:
+            continue
+        signatures.append({"article_id": article_id, "signature": _pack(sig)})
+        bands.extend({"bucket": b, "article_id": article_id} for b in set(band_buckets(sig)))
+    if signatures:
+        db.bulk_insert_mappings(models.MinHashSignature, signatures)
+        db.bulk_insert_mappings(models.LshBand, bands)
+
+
+def link(db: Session, links: Iterable[Dict]):
+    """Record duplicates that were not inserted, in the caller's transaction."""
+    links = list(links)
+    if links:
+        db.bulk_insert_mappings(models.DuplicateLink, links)
+
+
+def forget(db: Session, article_ids: Iterable[int]):
+    """Drop deleted articles from the index, with the links to them, in the caller's transaction."""
+    article_ids = list(article_ids)
+    for start in range(0, len(article_ids), 500):
+        chunk = article_ids[start:start + 500]
+        for model, column in (
+            (models.MinHashSignature, models.MinHashSignature.article_id),
+            (models.LshBand, models.LshBand.article_id),
+            (models.DuplicateLink, models.DuplicateLink.original_id),
+        ):
+            db.query(model).filter(column.in_(chunk)).delete(synchronize_session=False)
+
+
+def get_links(db: Session, article_id: int) -> List[models.DuplicateLink]:
+    return (
+        db.query(models.DuplicateLink)
+        .filter(models.DuplicateLink.original_id == article_id)
+        .order_by(models.DuplicateLink.created_at)
+        .all()
+    )
+
+
+def rebuild(db: Session, batch_size: int = 1000) -> int:
+    """Index every stored article from scratch. Returns how many got a signature."""
+    db.query(models.MinHashSignature).delete(synchronize_session=False)
+    db.query(models.LshBand).delete(synchronize_session=False)
+    indexed = 0
+    batch = []
+    for article_id, content in (
+        db.query(models.Article.id, models.Article.content).order_by(models.Article.id).yield_per(batch_size)
+    ):
+        sig = signature(content or "")
+        if sig is not None:
+            batch.append((article_id, sig))
+        if len(batch) >= batch_size:
+            index(db, batch)
+            indexed += len(batch)
+            batch = []
+    index(db, batch)
+    indexed += len(batch)
+    db.commit()
+    return indexed
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, init_db
+
+    if "--rebuild" not in sys.argv[1:]:
+        print("usage: python dedup.py --rebuild")
+        sys.exit(2)
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"Indexed {rebuild(db)} articles")
+    finally:
+        db.close()
@@ -1,76 +1,382 @@
 # enhanced_pdf_parser.py
-import pdfplumber
+import logging
 import re
 import os
-from typing import List, Dict, Tuple
-from utils import categorize_text, summarize_text, extract_date
+import time
+from bisect import bisect_right
+from collections import Counter
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from utils import categorize_text, enrich_article
+import metrics
 
+logger = logging.getLogger(__name__)
 
-def extract_articles_from_pdf(pdf_path: str) -> List[Dict]:
+stage_timer = metrics.INGEST_STAGE_SECONDS.time
+
+
+# Bump whenever a change here (or in utils) changes the extracted articles,
+# so cached parse results from older versions are no longer used.
+PARSER_VERSION = "6"
+
+# Bump whenever page_layout() output changes; cached page layouts of older
+# versions are extracted again (see page_cache.py).
+EXTRACTOR_VERSION = "1"
+
+# Parallel page extraction: worker processes used for one PDF, and the page
+# count below which the process start-up cost is not worth paying.  Callers
+# that already run in a process pool pass their own share (jobs.py,
+# ingest_dir.py), so pools are never nested cpu_count deep.
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 8))
+
+# "layout" finds articles from font sizes and positions (see LayoutSplitter);
+# "text" splits the page text at ARTICLE_BOUNDARY_PATTERNS
+PDF_SEGMENTATION = os.environ.get("PDF_SEGMENTATION", "layout")
+
+# Backend of plain text extraction (iter_page_texts, pdf_parser and the
+# benchmark): "pdfplumber" or "pdfium" (pypdfium2, much faster, falling back
+# to pdfplumber for PDFs it cannot read; its text differs in line breaks and
+# spacing).  Ingestion does not use it: page_layout() needs font sizes and
+# positions and always uses pdfplumber.
+PDF_TEXT_BACKEND = os.environ.get("PDF_TEXT_BACKEND", "pdfplumber")
+
+
+class _PdfplumberDocument:
     """
-    Enhanced PDF extraction that properly identifies articles, headlines, and content.
+    pdfminer layout analysis through pdfplumber: words with their fonts and
+    positions, which page_layout() needs. Pages are probed with pypdfium2
+    first, when it is installed, so pages without a text layer skip the
+    layout analysis.
+    """
+
+    def __init__(self, pdf_path: str):
+        import pdfplumber
+
+        self._pdf = pdfplumber.open(pdf_path)
+        self._probe = _open_pdfium(pdf_path)
+        self.page_count = len(self._pdf.pages)
+
+    def pages(self, start: int, end: int) -> Iterator[Tuple[object, Optional[bool]]]:
+        for i in range(start, end):
+            page = self._pdf.pages[i]
+            yield page, _probe_page(self._probe, i) if self._probe is not None else None
+            page.close()  # drops cached chars/layout and the textmap cache
+
+    def close(self):
+        if self._probe is not None:
+            self._probe.close()
+        self._pdf.close()
+
+
+class _PdfiumDocument:
+    """
+    PDFium's text layer through pypdfium2: plain text in content order, many
+    times faster than pdfminer, but without fonts, so no page_layout().
+    Pages are given as their text page; the probe is the text page itself.
+    """
+
+    def __init__(self, pdf_path: str):
+        self._pdf = _open_pdfium(pdf_path)
+        if self._pdf is None:
+            raise RuntimeError("pypdfium2 cannot open the PDF")
+        self.page_count = len(self._pdf)
+
+    def pages(self, start: int, end: int) -> Iterator[Tuple[object, Optional[bool]]]:
+        for i in range(start, end):
+            page = self._pdf[i]
+            textpage = page.get_textpage()
+            try:
+                if textpage.count_chars():
+                    yield textpage, None
+                else:
+                    yield None, _has_images(page)
+            finally:
+                textpage.close()
+                page.close()
+
+    def close(self):
+        self._pdf.close()
+
+
+PDF_BACKENDS = {"pdfium": _PdfiumDocument, "pdfplumber": _PdfplumberDocument}
+if PDF_TEXT_BACKEND not in PDF_BACKENDS:
+    raise ValueError(f"PDF_TEXT_BACKEND must be one of {', '.join(PDF_BACKENDS)}, not {PDF_TEXT_BACKEND!r}")
+
+
+def _open_pdfium(pdf_path: str):
+    """A pypdfium2 document, or None when pypdfium2 is missing or cannot read the file."""
+    try:
+        import pypdfium2
+    except ImportError:
+        return None
+    try:
+        return pypdfium2.PdfDocument(pdf_path)
+    except pypdfium2.PdfiumError as e:
+        logger.warning("pypdfium2 cannot open %s: %s", pdf_path, e)
+        return None
+
+
+def _has_images(page) -> bool:
+    import pypdfium2.raw as pdfium_c
+
+    return next(page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]), None) is not None
+
+
+def _probe_page(pdf, index: int) -> Optional[bool]:
+    """
+    Cheap text layer check of one page: None when it has text; otherwise
+    whether it was scanned (has images) rather than left blank. PDFium only
+    counts the characters, which is a fraction of the cost of laying them out.
+    """
+    page = pdf[index]
+    try:
+        textpage = page.get_textpage()
+        try:
+            if textpage.count_chars():
+                return None
+        finally:
+            textpage.close()
+        return _has_images(page)
+    finally:
+        page.close()
+
+
+def _open(pdf_path: str, backend: str):
+    """Open the PDF with backend, falling back to pdfplumber when pypdfium2 cannot read it."""
+    try:
+        return PDF_BACKENDS[backend](pdf_path)
+    except RuntimeError:
+        if backend == "pdfplumber":
+            raise
+        return _PdfplumberDocument(pdf_path)
+
+
+def _page_text(page) -> str:
+    # pdfplumber page or pypdfium2 text page (see _open)
+    if hasattr(page, "get_text_bounded"):
+        return page.get_text_bounded().replace("\r\n", "\n")
+    return page.extract_text()
+
+
+def _empty_layout(scanned: bool) -> Dict:
+    layout = {"body_size": 0.0, "lines": []}
+    if scanned:
+        layout["scanned"] = True
+    return layout
+
+
+def _extract_pages(doc, start: int, end: int, extract: Callable, empty: Optional[Callable]) -> Iterator:
+    """
+    extract(page) of pages [start, end). Pages without a text layer give
+    empty(scanned), or "" when empty is None.
+    """
+    for page, scanned in doc.pages(start, end):
+        with stage_timer(stage="extract_text"):
+            if scanned is None:
+                result = extract(page)
+            else:
+                result = empty(scanned) if empty is not None else ""
+        metrics.INGEST_PAGES.inc()
+        if scanned:
+            metrics.INGEST_SCANNED_PAGES.inc()
+        yield result
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int, extract: Callable, empty: Optional[Callable],
+                        backend: str) -> Tuple[List, Dict]:
+    """
+    Extract pages [start, end) with extract(page). Runs in a worker process,
+    which opens the PDF itself so no pdfplumber or PDFium objects cross
+    process boundaries. Returns the results and the metrics recorded, for
+    the caller to merge.
+    """
+    metrics.reset()  # forked: drop whatever the parent had recorded
+    with stage_timer(stage="pdf_open"):
+        doc = _open(pdf_path, backend)
+    try:
+        return list(_extract_pages(doc, start, end, extract, empty)), metrics.drain()
+    finally:
+        doc.close()
+
+
+def _iter_pages(pdf_path: str, extract: Callable, empty: Optional[Callable], backend: str,
+                workers: Optional[int], min_pages: Optional[int]) -> Iterator:
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    min_pages = PDF_PARALLEL_MIN_PAGES if min_pages is None else min_pages
+
+    started = time.perf_counter()
+    doc = _open(pdf_path, backend)
+    try:
+        page_count = doc.page_count
+        metrics.INGEST_STAGE_SECONDS.observe(time.perf_counter() - started, stage="pdf_open")
+        if workers <= 1 or page_count < max(min_pages, 2):
+            yield from _extract_pages(doc, 0, page_count, extract, empty)
+            return
+    finally:
+        doc.close()
+
+    workers = min(workers, page_count)
+    # Two ranges per worker evens out pages that take longer than others
+    chunk = -(-page_count // (workers * 2))
+    ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_extract_page_range, pdf_path, start, end, extract, empty, backend)
+            for start, end in ranges
+        ]
+        for future in futures:  # submission order == page order
+            results, recorded = future.result()
+            metrics.merge(recorded)
+            yield from results
+
+
+def iter_page_texts(pdf_path: str, workers: Optional[int] = None, min_pages: Optional[int] = None,
+                    backend: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield the text of every page, in page order ("" for pages without a
+    text layer), extracted by backend (default PDF_TEXT_BACKEND).
+    Each page's layout cache is released as soon as its text is extracted.
+    Page ranges are spread across worker processes when the PDF has at least
+    min_pages pages and more than one worker is allowed.
+    """
+    return _iter_pages(pdf_path, _page_text, None, backend or PDF_TEXT_BACKEND, workers, min_pages)
+
+
+def iter_page_layouts(pdf_path: str, workers: Optional[int] = None, min_pages: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Like iter_page_texts, but yields page_layout() of every page, which
+    always takes pdfplumber. Pages without a text layer are not analysed;
+    their layout is empty, with "scanned": True when the page holds images.
+    """
+    return _iter_pages(pdf_path, page_layout, _empty_layout, "pdfplumber", workers, min_pages)
+
+
+def extract_page_texts(pdf_path: str, workers: Optional[int] = None, min_pages: Optional[int] = None,
+                       backend: Optional[str] = None) -> List[str]:
+    """Extract the text of every page, in page order."""
+    return list(iter_page_texts(pdf_path, workers, min_pages, backend))
+
+
+def iter_articles_from_pdf(pdf_path: str, workers: Optional[int] = None, mode: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Streaming article extraction: pages are extracted one at a time and each
+    article is yielded as soon as it is complete, so memory stays flat
+    regardless of page count and callers can store articles while parsing
+    continues. mode overrides PDF_SEGMENTATION.
     """
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
+    return segment_pages(iter_page_layouts(pdf_path, workers), pdf_path, mode)
+
+
+def layout_text(layout: Dict) -> str:
+    """Plain text of a page layout, one line per line, in reading order."""
+    return "\n".join(line[0] for line in layout["lines"])
+
+
+def segment_pages(layouts: Iterable[Dict], source_file: str, mode: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Articles from page layouts, extracted just now or loaded from
+    page_cache. Only segmentation and enrichment run here, so re-running it
+    on stored layouts is cheap. mode overrides PDF_SEGMENTATION; "text"
+    splits layout_text() of the pages at the boundary patterns.
+    """
+    splitter = LayoutSplitter() if (mode or PDF_SEGMENTATION) == "layout" else None
+    if splitter is None:
+        splitter = ArticleSplitter()
+        layouts = (layout_text(layout) for layout in layouts)
+
     try:
-        articles = []
-        with pdfplumber.open(pdf_path) as pdf:
-            full_text = ""
-            
-            # Extract all text first
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    full_text += page_text + "\n"
-            
-            if not full_text.strip():
-                return []
-            
-            # Split into potential articles
-            raw_articles = split_into_articles(full_text)
-            
-            # Process each article
-            for i, raw_article in enumerate(raw_articles, 1):
-                processed_article = process_article(raw_article, pdf_path, i)
+        article_num = 0
+        blocks = []
+        for page in layouts:
+            with stage_timer(stage="split"):
+                blocks = splitter.feed(page)
+            for block in blocks:
+                article_num += 1
+                with stage_timer(stage="enrich"):
+                    processed_article = _process(block, source_file, article_num)
                 if processed_article:
-                    articles.append(processed_article)
-        
-        return articles
-    
+                    yield processed_article
+
+        with stage_timer(stage="split"):
+            blocks = splitter.finish()
+        for block in blocks:
+            article_num += 1
+            with stage_timer(stage="enrich"):
+                processed_article = _process(block, source_file, article_num)
+            if processed_article:
+                yield processed_article
+
     except Exception as e:
         raise RuntimeError(f"Error extracting articles from PDF: {str(e)}")
 
 
+def _process(block, source_file: str, article_num: int) -> Optional[Dict]:
+    # LayoutSplitter gives (title, content) pairs, ArticleSplitter raw text
+    if isinstance(block, tuple):
+        return process_block(block[0], block[1], source_file)
+    return process_article(block, source_file, article_num)
+
+
+def extract_articles_from_pdf(pdf_path: str, workers: Optional[int] = None, mode: Optional[str] = None) -> List[Dict]:
+    """
+    Enhanced PDF extraction that properly identifies articles, headlines, and content.
+    workers overrides PDF_EXTRACT_WORKERS; pass 1 to force serial extraction.
+    mode overrides PDF_SEGMENTATION ("layout" or "text").
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+
+    return list(iter_articles_from_pdf(pdf_path, workers, mode))
+
+
+# Common patterns that indicate article boundaries
+ARTICLE_BOUNDARY_PATTERNS = [
+    re.compile(r'\n[A-Z][A-Za-z\s]{10,50}\n', re.IGNORECASE),  # Headlines (ALL CAPS or Title Case)
+    re.compile(r'\n\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', re.IGNORECASE),  # Dates
+    re.compile(r'\n(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)', re.IGNORECASE),  # Days
+    re.compile(r'\n(?:SPORTS?|POLITICS?|BUSINESS|TECH|ENTERTAINMENT|HEALTH)', re.IGNORECASE),  # Category headers
+]
+# No boundary match is longer than this, so boundaries further from the end
+# of a partial buffer cannot change when more text arrives
+_BOUNDARY_LOOKAHEAD = 64
+
+CHUNK_SIZE = 1200        # fallback article length when no boundaries are found
+MIN_ARTICLE_CHARS = 100  # shorter boundary-delimited blocks are dropped
+STREAM_WINDOW = 64 * 1024
+
+
+def _normalize_text(text: str) -> str:
+    # Line breaks are kept: the boundary patterns are anchored on them
+    text = re.sub(r'[^\S\n]+', ' ', text)  # Normalize spaces and tabs
+    text = re.sub(r' ?\n\s*', '\n', text)  # Remove blank lines and indentation
+    return text
+
+
+def _find_boundaries(text: str) -> List[int]:
+    potential_splits = set()
+    for pattern in ARTICLE_BOUNDARY_PATTERNS:
+        potential_splits.update(m.start() for m in pattern.finditer(text))
+    return sorted(potential_splits)
+
+
 def split_into_articles(text: str) -> List[str]:
     """
     Split text into individual articles based on patterns.
     """
     # Clean up text
-    text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
-    text = re.sub(r'\n+', '\n', text)  # Remove excessive newlines
-    
-    # Common patterns that indicate article boundaries
-    article_patterns = [
-        r'\n[A-Z][A-Za-z\s]{10,50}\n',  # Headlines (ALL CAPS or Title Case)
-        r'\n\d{1,2}[-/]\d{1,2}[-/]\d{2,4}',  # Dates
-        r'\n(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)',  # Days
-        r'\n(?:SPORTS?|POLITICS?|BUSINESS|TECH|ENTERTAINMENT|HEALTH)',  # Category headers
-    ]
+    text = _normalize_text(text)
     
     # Try to split by patterns
-    potential_splits = []
-    for pattern in article_patterns:
-        matches = list(re.finditer(pattern, text, re.IGNORECASE))
-        potential_splits.extend([m.start() for m in matches])
-    
-    # Remove duplicates and sort
-    potential_splits = sorted(set(potential_splits))
+    potential_splits = _find_boundaries(text)
     
     if not potential_splits:
         # Fallback: split by length if no patterns found
-        chunk_size = 1200
-        return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        return [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
     
     # Split text at identified boundaries
     articles = []
@@ -79,12 +385,344 @@ def split_into_articles(text: str) -> List[str]:
         end = potential_splits[i + 1] if i + 1 < len(potential_splits) else len(text)
         article_text = text[start:end].strip()
         
-        if len(article_text) > 100:  # Only keep substantial content
+        if len(article_text) > MIN_ARTICLE_CHARS:  # Only keep substantial content
             articles.append(article_text)
     
     return articles
 
 
+class ArticleSplitter:
+    """
+    Incremental split_into_articles for text that arrives page by page.
+
+    Only the current partial article is buffered. Whether the document is split
+    at boundaries or in fixed-size chunks is decided by the first STREAM_WINDOW
+    characters; within that limit the output is the same as calling
+    split_into_articles on the whole text.
+    """
+
+    def __init__(self, window: int = STREAM_WINDOW):
+        self.window = window
+        self._buf = ""
+        self._mode = None  # "boundary" or "chunk" once decided
+        self._fed = False
+
+    def feed(self, text: str) -> List[str]:
+        """Add text (whole lines, such as a page) and return the articles it completed."""
+        text = _normalize_text(text).strip()
+        if text:
+            if self._fed:
+                self._buf += "\n"
+            self._buf += text
+            self._fed = True
+        return self._drain(final=False)
+
+    def finish(self) -> List[str]:
+        """Return the remaining articles once all text has been fed."""
+        articles = self._drain(final=True)
+        self._buf = ""
+        return articles
+
+    def _drain(self, final: bool) -> List[str]:
+        if self._mode is None:
+            if _find_boundaries(self._buf):
+                self._mode = "boundary"
+            elif final or len(self._buf) > self.window:
+                self._mode = "chunk"
+            else:
+                return []
+
+        if self._mode == "chunk":
+            end = len(self._buf) if final else len(self._buf) - len(self._buf) % CHUNK_SIZE
+            chunks = [self._buf[i:i + CHUNK_SIZE] for i in range(0, end, CHUNK_SIZE)]
+            self._buf = self._buf[end:]
+            return chunks
+
+        starts = _find_boundaries(self._buf)
+        if not final:
+            starts = [s for s in starts if s < len(self._buf) - _BOUNDARY_LOOKAHEAD]
+        if not starts:
+            return []
+        if final:
+            starts.append(len(self._buf))
+
+        articles = []
+        for start, end in zip(starts, starts[1:]):
+            article_text = self._buf[start:end].strip()
+            if len(article_text) > MIN_ARTICLE_CHARS:
+                articles.append(article_text)
+        # Keep the article that is still open; text before the first boundary
+        # is not part of any article and is dropped here as well
+        self._buf = self._buf[starts[-1]:]
+        return articles
+
+
+# Layout segmentation
+HEADLINE_SIZE_RATIO = float(os.environ.get("HEADLINE_SIZE_RATIO", 1.25))  # headline font size / body font size
+MAX_HEADLINE_LINES = 4   # further large lines belong to the body (pull quotes, lists)
+PARAGRAPH_GAP = 0.8      # vertical gap, in line heights, that starts a new paragraph
+COLUMN_GAP = 0.8         # narrowest column gutter, in body font sizes
+BAND_GAP = 0.35          # narrowest space between stacked regions, in body font sizes
+
+
+def _is_bold(fontname: str) -> bool:
+    return any(weight in fontname for weight in ("Bold", "Black", "Heavy"))
+
+
+def _body_size(words: List[Dict]) -> float:
+    """The font size most characters are set in."""
+    sizes = Counter()
+    for w in words:
+        sizes[round(w["size"], 1)] += len(w["text"])
+    return sizes.most_common(1)[0][0]
+
+
+def _runs(words: List[Dict], body_size: float) -> List[Dict]:
+    """
+    Words on the same line and in the same font size, with less than
+    COLUMN_GAP font sizes (at least the body size) between them, joined.
+    A wider gap is a column gutter, so a run never crosses one, while a
+    headline spanning several columns stays one run.
+    """
+    runs = []
+    words = sorted(words, key=lambda w: (w["top"], w["x0"]))
+    i = 0
+    while i < len(words):
+        top = words[i]["top"]
+        tolerance = words[i]["size"] * 0.5
+        j = i
+        while j < len(words) and words[j]["top"] - top <= tolerance:
+            j += 1
+        line = sorted(words[i:j], key=lambda w: w["x0"])
+        i = j
+
+        run = None
+        for w in line:
+            if (
+                run is not None
+                and w["x0"] - run["x1"] < COLUMN_GAP * max(body_size, run["size"])
+                and abs(w["size"] - run["size"]) <= 0.1 * run["size"]
+            ):
+                run["text"] += " " + w["text"]
+                run["x1"] = max(run["x1"], w["x1"])
+                run["bottom"] = max(run["bottom"], w["bottom"])
+                run["size"] = max(run["size"], w["size"])
+                run["bold"] = run["bold"] and _is_bold(w["fontname"])
+                continue
+            run = {
+                "text": w["text"], "x0": w["x0"], "x1": w["x1"], "top": w["top"],
+                "bottom": w["bottom"], "size": w["size"], "bold": _is_bold(w["fontname"]),
+            }
+            runs.append(run)
+    return runs
+
+
+def _gaps(spans: List[Tuple[float, float]], min_gap: float) -> List[Tuple[float, float]]:
+    """(start, width) of the stretches of at least min_gap that no span covers."""
+    gaps = []
+    spans = sorted(spans)
+    covered_to = spans[0][1]
+    for start, end in spans[1:]:
+        if start - covered_to >= min_gap:
+            gaps.append((covered_to, start - covered_to))
+        covered_to = max(covered_to, end)
+    return gaps
+
+
+def _reading_order(runs: List[Dict], body_size: float) -> List[List[Dict]]:
+    """
+    Recursive XY-cut: split the region at every vertical gutter that the
+    body text never crosses (columns, left to right); without one, at its
+    widest horizontal gap (bands, top to bottom). A headline spanning
+    columns goes with the first of them. Returns the leaf regions in
+    reading order.
+    """
+    body = [(r["x0"], r["x1"]) for r in runs if r["size"] < body_size * HEADLINE_SIZE_RATIO]
+    if len(runs) < 2 or not body:
+        return [runs]
+    gutters = _gaps(body, body_size * COLUMN_GAP)
+    if gutters:
+        cuts = [start + width / 2 for start, width in gutters]
+        parts = [[] for _ in range(len(cuts) + 1)]
+        for r in runs:
+            parts[bisect_right(cuts, r["x0"])].append(r)
+    else:
+        bands = _gaps([(r["top"], r["bottom"]) for r in runs], body_size * BAND_GAP)
+        if not bands:
+            return [runs]
+        start, width = max(bands, key=lambda gap: gap[1])
+        cut = start + width / 2
+        parts = [[r for r in runs if r["top"] < cut], [r for r in runs if r["top"] >= cut]]
+    regions = []
+    for part in parts:
+        regions += _reading_order(part, body_size)
+    return regions
+
+
+def page_layout(page) -> Dict:
+    """
+    The lines of one page in reading order with their font size and weight:
+
+        {"body_size": 9.0, "lines": [[text, size, bold, new_paragraph], ...]}
+
+    Built from the words of the characters pdfminer has already laid out
+    for the page, so each page is analysed once. Plain lists, so a layout
+    can be sent between processes and stored as JSON.
+    """
+    words = page.extract_words(extra_attrs=["size", "fontname"])
+    if not words:
+        return {"body_size": 0.0, "lines": []}
+    body_size = _body_size(words)
+    runs = _runs(words, body_size)
+
+    lines = []
+    for region in _reading_order(runs, body_size):
+        previous = None
+        for run in sorted(region, key=lambda r: (r["top"], r["x0"])):
+            if previous is not None and run["top"] - previous["top"] <= previous["size"] * 0.5:
+                # Same line, split by a wide gap (justified text, tab stops)
+                line = lines[-1]
+                line[0] += " " + run["text"]
+                line[1] = max(line[1], round(run["size"], 1))
+                line[2] = line[2] and run["bold"]
+                continue
+            new_paragraph = previous is not None and run["top"] - previous["bottom"] > previous["size"] * PARAGRAPH_GAP
+            lines.append([run["text"], round(run["size"], 1), run["bold"], new_paragraph])
+            previous = run
+    return {"body_size": body_size, "lines": lines}
+
+
+def _join_lines(lines: List[Tuple[str, bool]]) -> str:
+    """Reflow (text, new_paragraph) lines: words hyphenated at a line end are rejoined."""
+    out = ""
+    for text, new_paragraph in lines:
+        if not out:
+            out = text
+        elif new_paragraph:
+            out += "\n" + text
+        elif out.endswith("-") and text[:1].islower():
+            out = out[:-1] + text
+        else:
+            out += " " + text
+    return out
+
+
+class LayoutSplitter:
+    """
+    Articles from page_layout() results, fed page by page.
+
+    A run of headline-size lines (HEADLINE_SIZE_RATIO times the body size of
+    the page) opens an article, which takes every following body line,
+    across columns and pages, until the next headline. Articles come out as
+    (title, content) pairs. Large type that fails is_headline() (a drop cap,
+    a one-word kicker) opens no article: it becomes a paragraph of the
+    article before it, so an article is only handed out once the next
+    headline is known to be one. Text before the first headline, which is
+    all of it in a PDF without larger type, goes through ArticleSplitter
+    instead, as does an article whose own headline fails the check.
+    """
+
+    def __init__(self):
+        self._untitled = ArticleSplitter()
+        self._title = []
+        self._body = []
+        self._held = None  # (title lines, body) of the article before the current headline
+
+    def feed(self, layout: Dict) -> List:
+        """Add one page layout and return the articles it completed."""
+        done = []
+        untitled = []
+        headline_size = layout["body_size"] * HEADLINE_SIZE_RATIO
+        for text, size, bold, new_paragraph in layout["lines"]:
+            if size >= headline_size:
+                if self._title and not self._body and len(self._title) < MAX_HEADLINE_LINES:
+                    self._title.append(text)
+                    continue
+                if not self._title or self._body:
+                    done += self._hold()
+                    self._title = [text]
+                    continue
+            if self._title and not self._body:
+                # First body line: the headline is complete
+                done += self._settle()
+            if self._title:
+                self._body.append((text, new_paragraph))
+            else:
+                untitled.append(text)
+        if untitled:
+            done = self._untitled.feed("\n".join(untitled)) + done
+        return done
+
+    def finish(self) -> List:
+        """Return the remaining articles once all pages have been fed."""
+        done = self._settle() if self._title and not self._body else []
+        done += self._hold() + self._hold()
+        return self._untitled.finish() + done
+
+    def _hold(self) -> List:
+        """Set the current article aside until the next headline is settled; returns the one held before."""
+        done = self._emit(*self._held) if self._held else []
+        self._held = (self._title, self._body) if self._title else None
+        self._title, self._body = [], []
+        return done
+
+    def _settle(self) -> List:
+        """The current headline is complete: hand out the held article, or continue it."""
+        title = " ".join(self._title)
+        if is_headline(title) or self._held is None:
+            done = self._emit(*self._held) if self._held else []
+            self._held = None
+            return done
+        held_title, held_body = self._held
+        self._held = None
+        self._title, self._body = held_title, held_body + [(title, True)]
+        return []
+
+    @staticmethod
+    def _emit(title_lines: List[str], body: List[Tuple[str, bool]]) -> List:
+        title = " ".join(title_lines)
+        if is_headline(title):
+            return [(title, _join_lines(body))]
+        # Raw text, whose headline is then picked as in text mode
+        return ["\n".join(title_lines + [_join_lines(body)])]
+
+
+def process_block(title: str, content: str, source_file: str) -> Optional[Dict]:
+    """Structured data for one article found by LayoutSplitter."""
+    if len(content) < 50:  # Headline without a story: captions, page furniture
+        return None
+    enrichment = enrich_article(content, max_chars=250)
+    category = enrichment["category"]
+    if category == "general":
+        category = categorize_text(title)
+    return {
+        "title": clean_headline(title) or "Untitled Article",
+        "summary": enrichment["summary"],
+        "content": content,
+        "category": category,
+        "source_file": os.path.basename(source_file),
+        "published_date": enrichment["published_date"],
+    }
+
+
+def is_headline(line: str) -> bool:
+    """Whether a line can be a headline; LayoutSplitter titles must pass this too."""
+    # Skip very short lines (likely not headlines)
+    if len(line) < 10:
+        return False
+
+    # Skip lines that look like dates or metadata
+    if re.match(r'^\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', line):
+        return False
+
+    # Skip lines with too many numbers (likely not headlines)
+    if len(re.findall(r'\d', line)) > len(line) * 0.3:
+        return False
+
+    # Reasonable headline length
+    return len(line) <= 150
+
+
 def extract_headline(text: str) -> str:
     """
     Extract the most likely headline from article text.
@@ -96,20 +734,7 @@ def extract_headline(text: str) -> str:
     
     # Look for headline patterns
     for line in lines[:5]:  # Check first 5 lines
-        # Skip very short lines (likely not headlines)
-        if len(line) < 10:
-            continue
-            
-        # Skip lines that look like dates or metadata
-        if re.match(r'^\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', line):
-            continue
-            
-        # Skip lines with too many numbers (likely not headlines)
-        if len(re.findall(r'\d', line)) > len(line) * 0.3:
-            continue
-            
-        # This looks like a good headline
-        if len(line) <= 150:  # Reasonable headline length
+        if is_headline(line):
             return clean_headline(line)
     
     # Fallback: use first substantial line
@@ -149,23 +774,22 @@ def process_article(raw_text: str, source_file: str, article_num: int) -> Dict:
     
     # Extract components
     headline = extract_headline(raw_text)
-    category = categorize_text(raw_text)
-    summary = summarize_text(raw_text, max_chars=250)
-    published_date = extract_date(raw_text)
+    enrichment = enrich_article(raw_text, max_chars=250)
     
-    # Clean content (remove headline if it appears at the start)
-    content = raw_text
-    first_line = content.split('\n')[0].strip()
-    if first_line in headline or headline in first_line:
-        content = '\n'.join(content.split('\n')[1:]).strip()
+    # Clean content (remove headline if it appears at the start); a single
+    # line is all content, even when the headline was taken from it
+    content = raw_text.strip()
+    first_line, _, rest = content.partition('\n')
+    if rest and (first_line.strip() in headline or headline in first_line):
+        content = rest.strip()
     
     return {
         "title": headline,
-        "summary": summary,
+        "summary": enrichment["summary"],
         "content": content,
-        "category": category,
+        "category": enrichment["category"],
         "source_file": os.path.basename(source_file),
-        "published_date": published_date,
+        "published_date": enrichment["published_date"],
     }
 
 
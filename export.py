@@ -0,0 +1,113 @@
+# export.py
+"""
+Streaming export of the article corpus as NDJSON or CSV.
+
+GET /export/ and this CLI stream every article matching the filters in one
+pass over the table (crud.iter_articles), so memory stays flat however
+many rows are exported.
+
+    python export.py [--format ndjson|csv] [--output articles.ndjson]
+                     [--category sports] [--since 2024-01-01] [--until 2024-02-01]
+                     [--source-file edition.pdf]
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator
+
+from crud import EXPORT_COLUMNS
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))  # rows per fetch
+EXPORT_CHUNK_BYTES = 64 * 1024  # rows are written out in chunks of about this size
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[str]:
+    """Group lines into chunks of about EXPORT_CHUNK_BYTES, one write per chunk."""
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def to_ndjson(rows: Iterable[Dict]) -> Iterator[str]:
+    """One JSON object per line."""
+    return _chunked(
+        json.dumps({k: _value(v) for k, v in row.items()}, ensure_ascii=False) + "\n" for row in rows
+    )
+
+
+def to_csv(rows: Iterable[Dict]) -> Iterator[str]:
+    """CSV with a header row; fields with newlines are quoted."""
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: _value(v) for k, v in row.items()})
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    return _chunked(lines())
+
+
+FORMATTERS = {"ndjson": to_ndjson, "csv": to_csv}
+
+
+def stream(session_factory, fmt: str = "ndjson", **filters) -> Iterator[str]:
+    """
+    The export as text chunks. Opens its own session, because a
+    StreamingResponse is still being sent after request dependencies have
+    been cleaned up.
+    """
+    import crud
+
+    db = session_factory()
+    try:
+        yield from FORMATTERS[fmt](crud.iter_articles(db, batch_size=EXPORT_BATCH_SIZE, **filters))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    from database import ReadSessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Export articles as NDJSON or CSV")
+    parser.add_argument("--format", choices=sorted(FORMATTERS), default="ndjson")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    parser.add_argument("--category")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="created at or after (ISO date/time)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="created before (ISO date/time)")
+    parser.add_argument("--source-file")
+    args = parser.parse_args()
+
+    init_db()
+    started = time.perf_counter()
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for chunk in stream(ReadSessionLocal, args.format, category=args.category, since=args.since,
+                            until=args.until, source_file=args.source_file):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported in {time.perf_counter() - started:.1f}s", file=sys.stderr)
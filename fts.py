@@ -0,0 +1,289 @@
+# fts.py
+"""
+SQLite FTS5 full-text index over the articles table.
+
+The index is an external-content FTS5 table that mirrors title, summary and
+content of models.Article.  Triggers keep it in sync with inserts, updates
+and deletes, so the ORM code never has to touch it directly.
+
+The index reads its text through the articles_text view.  While compressed
+rows may exist (CONTENT_COMPRESSION=zlib, or rows not yet decompressed) the
+view and the triggers decode summary and content with article_text(), an
+SQL function only the app's own connections have (see compression.py);
+otherwise they use the plain columns, so other SQLite clients can still
+write to articles.
+"""
+import logging
+import re
+import weakref
+from typing import List, Optional, Tuple, Union
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "articles_fts"
+TEXT_VIEW = "articles_text"
+
+# bm25() column weights, in the order the columns are declared below
+TITLE_WEIGHT = 10.0
+SUMMARY_WEIGHT = 4.0
+CONTENT_WEIGHT = 1.0
+
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+SNIPPET_TOKENS = 24
+
+_TEXT_FUNCTION = "article_text("
+
+
+def _text(column: str, decoded: bool) -> str:
+    return f"article_text({column})" if decoded else column
+
+
+def _create_view(decoded: bool) -> str:
+    return f"""
+    CREATE VIEW {TEXT_VIEW} AS
+    SELECT id, title, {_text("summary", decoded)} AS summary, {_text("content", decoded)} AS content
+    FROM articles
+    """
+
+
+_CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    title, summary, content,
+    content='{TEXT_VIEW}', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+)
+"""
+
+def _create_triggers(decoded: bool) -> List[str]:
+    new = f"new.id, new.title, {_text('new.summary', decoded)}, {_text('new.content', decoded)}"
+    old = f"'delete', old.id, old.title, {_text('old.summary', decoded)}, {_text('old.content', decoded)}"
+    return [
+        f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, summary, content) VALUES ({new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, content) VALUES ({old});
+        END
+        """,
+        f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON articles BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, content) VALUES ({old});
+            INSERT INTO {FTS_TABLE}(rowid, title, summary, content) VALUES ({new});
+        END
+        """,
+    ]
+
+
+_TRIGGER_NAMES = [f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au"]
+
+# Keyed by engine, not URL: the writer and the read-only engine share a URL
+_available_cache: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+_PROBE_SQL = "SELECT 1 FROM pragma_module_list WHERE name = 'fts5'"
+_PROBE_FALLBACK_SQL = "SELECT sqlite_compileoption_used('ENABLE_FTS5')"
+
+
+def _probe(conn: Connection) -> bool:
+    """Read-only check for the fts5 module; works on query_only connections too."""
+    try:
+        return conn.execute(text(_PROBE_SQL)).first() is not None
+    except OperationalError:
+        # SQLite built without the introspection pragmas
+        return bool(conn.execute(text(_PROBE_FALLBACK_SQL)).scalar())
+
+
+def fts_available(bind: Union[Engine, Connection]) -> bool:
+    """
+    Check whether the database is SQLite with the FTS5 extension compiled in.
+    Pass the caller's connection (session.connection()) where there is one:
+    opening a second connection would wait for the single writer connection.
+    A probe that fails is not cached, so a transient error never turns
+    full-text search off for the rest of the process.
+    """
+    engine = bind.engine
+    if engine not in _available_cache:
+        if engine.dialect.name != "sqlite":
+            _available_cache[engine] = False
+        else:
+            try:
+                if isinstance(bind, Connection):
+                    ok = _probe(bind)
+                else:
+                    with bind.connect() as conn:
+                        ok = _probe(conn)
+            except Exception:
+                logger.warning("FTS5 probe failed; not using full-text search for this query", exc_info=True)
+                return False
+            _available_cache[engine] = ok
+    return _available_cache[engine]
+
+
+def _decodes(conn: Connection) -> Optional[bool]:
+    """Whether the installed insert trigger decodes with article_text(); None when it is missing."""
+    row = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+        {"name": _TRIGGER_NAMES[0]},
+    ).first()
+    return None if row is None else _TEXT_FUNCTION in row.sql
+
+
+def init_fts(engine: Engine, decoded: Optional[bool] = None) -> bool:
+    """
+    Create the FTS5 table, the articles_text view and the sync triggers if
+    they are missing.  The first time the table is created it is backfilled
+    from articles; an index created before articles_text existed is dropped
+    and rebuilt.
+
+    decoded picks plain or article_text() view and triggers.  By default
+    they decode when CONTENT_COMPRESSION is on, and keep decoding while any
+    compressed row is left after it was turned off.
+    Returns True when full-text search is available.
+    """
+    import compression
+
+    if not fts_available(engine):
+        return False
+
+    with engine.begin() as conn:
+        installed = _decodes(conn)
+        if decoded is None:
+            decoded = compression.CONTENT_COMPRESSION == "zlib" or (
+                bool(installed) and compression.has_compressed_rows(conn)
+            )
+        if installed is not None and installed != decoded:
+            conn.execute(text(f"DROP VIEW IF EXISTS {TEXT_VIEW}"))
+            for trigger in _TRIGGER_NAMES:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            installed = None
+        has_view = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = :name"), {"name": TEXT_VIEW},
+        ).first()
+        if not has_view:
+            conn.execute(text(_create_view(decoded)))
+        existing = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE},
+        ).first()
+        if existing and TEXT_VIEW not in existing.sql:
+            for trigger in _TRIGGER_NAMES:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            conn.execute(text(f"DROP TABLE {FTS_TABLE}"))
+            existing = installed = None
+        if not existing:
+            conn.execute(text(_CREATE_TABLE))
+            # One-time backfill of rows that existed before the index did
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        if installed is None:
+            for ddl in _create_triggers(decoded):
+                conn.execute(text(ddl))
+    return True
+
+
+def rebuild_fts(engine: Engine) -> None:
+    """Rebuild the whole index from the articles table."""
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Turn free text from the user into a safe FTS5 MATCH expression.
+    Every word is quoted (so FTS5 operators in the input are treated as text)
+    and all words must match; the last word is a prefix match so partially
+    typed queries still find results.
+    """
+    terms = re.findall(r"\w+", q, flags=re.UNICODE)
+    if not terms:
+        return None
+    quoted = ['"%s"' % t.replace('"', '""') for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_ids(
+    db: Session,
+    q: str,
+    category: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+    after: Optional[Tuple[float, int]] = None,
+) -> List[Tuple[int, float, str, str]]:
+    """
+    Run a BM25-ranked full-text search.
+    Returns (article_id, rank, highlighted_title, snippet) tuples, best match first.
+    after=(rank, article_id) of the last hit of the previous page continues
+    from there (keyset pagination) instead of using offset.
+    """
+    match = build_match_query(q)
+    if match is None:
+        return []
+
+    # Rank and page on ids alone, then compute highlight() and snippet()
+    # (which decode compressed content) for the rows of this page only
+    inner = f"""
+        SELECT {FTS_TABLE}.rowid AS id,
+               bm25({FTS_TABLE}, :w_title, :w_summary, :w_content) AS score
+        FROM {FTS_TABLE}
+        JOIN articles ON articles.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match
+    """
+    params = {
+        "match": match,
+        "w_title": TITLE_WEIGHT,
+        "w_summary": SUMMARY_WEIGHT,
+        "w_content": CONTENT_WEIGHT,
+        "limit": limit,
+        "offset": offset,
+    }
+    if category:
+        inner += " AND articles.category = :category"
+        params["category"] = category
+
+    sql = f"SELECT * FROM ({inner}) AS hits"
+    if after is not None:
+        sql += " WHERE score > :after_score OR (score = :after_score AND id < :after_id)"
+        params["after_score"], params["after_id"] = after
+        params["offset"] = 0
+    sql += " ORDER BY score, id DESC LIMIT :limit OFFSET :offset"
+
+    page = db.execute(text(sql), params).all()
+    if not page:
+        return []
+
+    # "+rowid" keeps FTS5 from seeking each id, one doclist merge per row for
+    # prefix queries; one pass over the matches filtered to the page is cheaper
+    marked = text(f"""
+        SELECT rowid AS id,
+               highlight({FTS_TABLE}, 0, :open, :close) AS title_highlight,
+               snippet({FTS_TABLE}, 2, :open, :close, '…', :tokens) AS snippet
+        FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH :match AND +rowid IN :ids
+    """).bindparams(bindparam("ids", expanding=True))
+    marks = {
+        r.id: (r.title_highlight, r.snippet)
+        for r in db.execute(marked, {
+            "match": match, "ids": [r.id for r in page],
+            "open": HIGHLIGHT_OPEN, "close": HIGHLIGHT_CLOSE, "tokens": SNIPPET_TOKENS,
+        })
+    }
+    return [(r.id, r.score, *marks[r.id]) for r in page]
+
+
+if __name__ == "__main__":
+    from database import engine, init_db
+
+    init_db()
+    if init_fts(engine):
+        rebuild_fts(engine)
+        print(f"Rebuilt {FTS_TABLE}")
+    else:
+        print("FTS5 is not available for this database; search falls back to LIKE")
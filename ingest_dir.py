@@ -0,0 +1,255 @@
+# ingest_dir.py
+"""
+Backfill ingestion of a directory of PDFs, without going through HTTP.
+
+    python ingest_dir.py ARCHIVE_DIR [--workers 4] [--checkpoint ingest_checkpoint.jsonl]
+                         [--mode layout|text] [--force] [--retry-failed]
+
+Every *.pdf under the directory is hashed; PDFs whose content was already
+ingested (by an upload or an earlier run) are skipped.  The others are
+parsed in a process pool and their articles written with
+crud.create_articles_bulk, one transaction per PDF, by this process only,
+so the workers never contend for the SQLite write lock.  This process holds
+it only while it looks a file up or saves one, never while it waits for a
+parse, so an API server can keep writing during a backfill.  Each PDF gets a
+finished IngestJob row, which is what later uploads of the same file are
+deduplicated against, and its pages go into page_cache, so reprocess.py
+can rebuild its articles.
+
+The outcome of every file is appended to the checkpoint file as it
+finishes; a rerun skips the files listed there (unless they changed on
+disk), so an interrupted backfill resumes where it stopped.
+"""
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import crud, models, page_cache, parse_cache
+from database import dispose_engines
+from jobs import find_ingested, prepare_article
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = "ingest_checkpoint.jsonl"
+
+
+def find_pdfs(directory: str) -> List[str]:
+    """Absolute paths of the PDFs under directory, sorted."""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return [os.path.abspath(p) for p in paths]
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict]:
+    """Latest checkpoint entry per PDF path. A truncated last line is ignored."""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["path"]] = entry
+    return entries
+
+
+def _unchanged(entry: Optional[Dict], path: str) -> bool:
+    if entry is None:
+        return False
+    try:
+        st = os.stat(path)
+    except OSError:
+        # Still unreadable, as when it was recorded
+        return entry.get("size") is None
+    return entry.get("size") == st.st_size and entry.get("mtime") == st.st_mtime
+
+
+def parse_pdf(path: str, source_file: str, mode: Optional[str]) -> Tuple[List[Dict], List[Dict]]:
+    """Page layouts and articles of one PDF. Runs in a pool worker."""
+    # iter_articles_from_pdf / extract_articles_from_pdf, keeping the pages for page_cache
+    from enhanced_pdf_parser import iter_page_layouts, segment_pages
+
+    layouts = list(iter_page_layouts(path, workers=1))
+    return layouts, list(segment_pages(layouts, source_file, mode))
+
+
+def save_pdf(db: Session, path: str, source_file: str, content_hash: str, articles: List[Dict],
+             layouts: Optional[List[Dict]], mode: Optional[str]) -> Dict:
+    """Insert the articles of one PDF with its IngestJob row, in one transaction, and fill the caches."""
+    from enhanced_pdf_parser import EXTRACTOR_VERSION, PARSER_VERSION
+
+    rows = [row for row in (prepare_article(a, i, source_file) for i, a in enumerate(articles)) if row]
+    result = crud.create_articles_bulk(db, rows, commit=False, source_hash=content_hash, deduplicate=True)
+    saved = sum(1 for article_id in result["ids"] if article_id is not None)
+    duplicates = len(result["duplicates"])
+    ok = saved or duplicates  # an edition of nothing but wire copies is still ingested
+    now = datetime.now()
+    db.add(models.IngestJob(
+        id=uuid.uuid4().hex,
+        filename=source_file,
+        file_path=path,
+        content_hash=content_hash,
+        state="done" if ok else "failed",
+        stage="save",
+        progress={"parse": {"state": "done", "articles_found": len(articles)},
+                  "save": {"state": "done", "done": len(articles)}},
+        articles_found=len(articles),
+        articles_saved=saved,
+        articles_skipped=len(articles) - saved,
+        result={"categories_found": sorted({r["category"] for r in rows if r["category"]}), "articles": [],
+                "duplicates": duplicates},
+        error=None if ok else "No valid articles could be extracted and saved from the PDF",
+        finished_at=now,
+    ))
+    db.commit()
+    if layouts is not None:
+        page_cache.put(db, content_hash, EXTRACTOR_VERSION, layouts)
+    if mode is None:
+        parse_cache.put(db, content_hash, PARSER_VERSION, articles)
+    return {"status": "done" if ok else "failed", "articles": saved, "duplicates": duplicates}
+
+
+def _cached_articles(db: Session, content_hash: str, source_file: str, mode: Optional[str]) -> Optional[List[Dict]]:
+    """Articles of a PDF from the parse or page cache, or None when it has to be parsed."""
+    from enhanced_pdf_parser import segment_pages, EXTRACTOR_VERSION, PARSER_VERSION
+
+    if mode is None:
+        cached = parse_cache.get(db, content_hash, PARSER_VERSION)
+        if cached is not None:
+            return [{**a, "source_file": source_file} for a in cached]
+    layouts = page_cache.get(db, content_hash, EXTRACTOR_VERSION)
+    if layouts is not None:
+        return list(segment_pages(layouts, source_file, mode))
+    return None
+
+
+def ingest_directory(db: Session, directory: str, checkpoint: str = DEFAULT_CHECKPOINT,
+                     workers: Optional[int] = None, mode: Optional[str] = None,
+                     force: bool = False, retry_failed: bool = False, progress: bool = True) -> Dict[str, int]:
+    """Ingest every PDF under directory. Returns the number of files per outcome and of articles saved."""
+    from tqdm import tqdm
+
+    workers = workers or os.cpu_count() or 1
+    # Fork the pool before this process holds any database lock (see jobs.start_workers)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=dispose_engines)
+    executor.submit(int).result()
+
+    done = load_checkpoint(checkpoint)
+    paths = find_pdfs(directory)
+    totals = {"done": 0, "skipped": 0, "failed": 0, "articles": 0}
+    bar = tqdm(total=len(paths), unit="pdf", disable=not progress)
+
+    with open(checkpoint, "a") as log:
+        def record(path: str, content_hash: Optional[str], outcome: Dict):
+            try:
+                st = os.stat(path)
+                size, mtime = st.st_size, st.st_mtime
+            except OSError:
+                # Gone since the directory was listed; recorded so the totals add up
+                size = mtime = None
+            entry = {"path": path, "size": size, "mtime": mtime, "hash": content_hash, **outcome}
+            log.write(json.dumps(entry) + "\n")
+            log.flush()
+            totals[outcome["status"]] += 1
+            totals["articles"] += outcome.get("articles", 0)
+            bar.update()
+            bar.set_postfix(saved=totals["articles"], skipped=totals["skipped"], failed=totals["failed"])
+
+        def pending() -> Iterator[Tuple[str, str, str]]:
+            """PDFs left to parse; the others are recorded on the way."""
+            seen = set()  # hashes handled in this run, including those still being parsed
+            for path in paths:
+                source_file = os.path.relpath(path, directory).replace(os.sep, "/")
+                content_hash = None
+                try:
+                    entry = done.get(path)
+                    if _unchanged(entry, path) and (entry["status"] != "failed" or not retry_failed):
+                        bar.update()
+                        continue
+                    content_hash = parse_cache.hash_file(path)
+                    if content_hash in seen or (not force and find_ingested(db, content_hash) is not None):
+                        record(path, content_hash, {"status": "skipped"})
+                        continue
+                    seen.add(content_hash)
+                    articles = _cached_articles(db, content_hash, source_file, mode)
+                    if articles is not None:
+                        record(path, content_hash, save_pdf(db, path, source_file, content_hash, articles, None, mode))
+                        continue
+                except Exception as e:
+                    # An unreadable or corrupt file must not stop the run
+                    db.rollback()
+                    logger.error("Failed to ingest %s: %s", source_file, e)
+                    record(path, content_hash, {"status": "failed", "error": str(e)})
+                    continue
+                finally:
+                    # The lookups opened a writer transaction, which on SQLite holds
+                    # the write lock; end it before hashing the next file or
+                    # waiting on the pool, so the API server can write meanwhile
+                    db.commit()
+                yield path, source_file, content_hash
+
+        try:
+            running = {}
+            queue = pending()
+            while True:
+                for path, source_file, content_hash in queue:
+                    future = executor.submit(parse_pdf, path, source_file, mode)
+                    running[future] = (path, source_file, content_hash)
+                    if len(running) >= workers * 2:
+                        break
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path, source_file, content_hash = running.pop(future)
+                    try:
+                        layouts, articles = future.result()
+                        outcome = save_pdf(db, path, source_file, content_hash, articles, layouts, mode)
+                    except Exception as e:
+                        db.rollback()
+                        logger.error("Failed to ingest %s: %s", source_file, e)
+                        outcome = {"status": "failed", "error": str(e)}
+                    record(path, content_hash, outcome)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            bar.close()
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import logs
+    from database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Ingest a directory of PDFs")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, help="parser processes (default: CPU count)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="progress file to resume from")
+    parser.add_argument("--mode", choices=["layout", "text"], help="segmentation mode (default PDF_SEGMENTATION)")
+    parser.add_argument("--force", action="store_true", help="ingest PDFs whose content was already ingested")
+    parser.add_argument("--retry-failed", action="store_true", help="retry files the checkpoint lists as failed")
+    parser.add_argument("--no-progress", action="store_true", help="hide the progress bar")
+    args = parser.parse_args()
+
+    logs.setup_logging()
+    init_db()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        totals = ingest_directory(db, args.directory, args.checkpoint, args.workers, args.mode,
+                                  args.force, args.retry_failed, not args.no_progress)
+        print(f"{totals['done']} ingested, {totals['skipped']} already ingested, {totals['failed']} failed; "
+              f"{totals['articles']} articles saved in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
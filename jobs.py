@@ -0,0 +1,461 @@
+# jobs.py
+"""
+Background ingestion of uploaded PDFs.
+
+Uploads are recorded as IngestJob rows and handed to a bounded process pool
+(pdfminer layout analysis is CPU-bound, so threads would not help).  The
+worker parses the PDF, saves the articles and writes its progress back to the
+job row, which is what /jobs/{id} reports.
+
+A worker runs a job only after claiming it (claim_job), which takes a lease
+on the row: a conditional UPDATE that succeeds for exactly one worker.  The
+lease is renewed in every transaction that saves progress, and a worker that
+finds its lease taken over stops without committing.  Jobs still queued, or
+running under a lease that has expired (their worker died), are resubmitted
+at startup and every JOB_LEASE_SECONDS after that, by any app process.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+import crud, logs, metrics, models, page_cache, parse_cache
+from database import SessionLocal, dispose_engines
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", min(2, os.cpu_count() or 1)))
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", 16))  # queued + running
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", 100))  # articles per insert transaction
+# Page extraction processes per job: the CPUs shared out among the job
+# workers, rather than a cpu_count-sized pool in each of them
+JOB_EXTRACT_WORKERS = int(os.environ.get("JOB_EXTRACT_WORKERS",
+                                         max(1, (os.cpu_count() or 1) // INGEST_WORKERS)))
+# A running job whose lease was not renewed for this long is taken over
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 300))
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue already holds INGEST_QUEUE_SIZE jobs."""
+
+
+class LeaseLostError(Exception):
+    """Raised when another worker has taken over the job this worker was running."""
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = set()
+_lock = threading.Lock()
+_stop_watch = threading.Event()
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be reused here
+    dispose_engines()
+    logs.setup_logging()
+    # Counts inherited from the parent would be reported twice
+    metrics.reset()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=INGEST_WORKERS, initializer=_init_worker)
+    return _executor
+
+
+def start_workers():
+    """
+    Fork the worker pool now, before any request holds a database lock.
+    SQLite keeps its lock state per process and fork copies it, so a worker
+    forked while the API was inside a write transaction would see the
+    database as locked for good.
+    """
+    _get_executor().submit(int).result()
+
+
+def _watch_leases():
+    while not _stop_watch.wait(JOB_LEASE_SECONDS):
+        try:
+            resume_pending_jobs()
+        except Exception:
+            logger.exception("Could not resume expired ingest jobs")
+
+
+def start_lease_watch():
+    """Resubmit jobs whose worker died, every JOB_LEASE_SECONDS, in a daemon thread."""
+    _stop_watch.clear()
+    threading.Thread(target=_watch_leases, name="ingest-lease-watch", daemon=True).start()
+
+
+def shutdown(wait: bool = True):
+    """Stop the worker pool. Unfinished jobs stay queued/running and resume on restart."""
+    global _executor
+    _stop_watch.set()
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+    with _lock:
+        _pending.clear()
+
+
+def _job_finished(job_id: str, future):
+    with _lock:
+        _pending.discard(job_id)
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.error("Ingest job crashed: %s", future.exception(), extra={"job_id": job_id})
+        return
+    # What the worker recorded while running the job
+    metrics.merge(future.result())
+
+
+def _submit(job_id: str):
+    with _lock:
+        if job_id in _pending:
+            return
+        _pending.add(job_id)
+    future = _get_executor().submit(run_job, job_id)
+    future.add_done_callback(lambda f: _job_finished(job_id, f))
+
+
+def queue_size() -> int:
+    with _lock:
+        return len(_pending)
+
+
+def create_job(db: Session, filename: str, file_path: str, content_hash: Optional[str] = None) -> models.IngestJob:
+    """Persist a new job and hand it to the worker pool."""
+    if queue_size() >= INGEST_QUEUE_SIZE:
+        raise QueueFullError(f"Ingestion queue is full ({INGEST_QUEUE_SIZE} jobs)")
+
+    job = models.IngestJob(
+        id=uuid.uuid4().hex,
+        filename=filename,
+        file_path=file_path,
+        content_hash=content_hash,
+        state="queued",
+        progress={},
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _submit(job.id)
+    return job
+
+
+def get_job(db: Session, job_id: str) -> Optional[models.IngestJob]:
+    return db.query(models.IngestJob).filter(models.IngestJob.id == job_id).first()
+
+
+def find_ingested(db: Session, content_hash: str) -> Optional[models.IngestJob]:
+    """Return the job that already ingested (or is ingesting) a PDF with this hash."""
+    return (
+        db.query(models.IngestJob)
+        .filter(models.IngestJob.content_hash == content_hash)
+        .filter(models.IngestJob.state.in_(ACTIVE_STATES + ("done",)))
+        .order_by(models.IngestJob.created_at.desc())
+        .first()
+    )
+
+
+def _claimable():
+    """Jobs nobody runs: queued, or running under an expired lease."""
+    cutoff = datetime.now() - timedelta(seconds=JOB_LEASE_SECONDS)
+    return or_(
+        models.IngestJob.state == "queued",
+        and_(
+            models.IngestJob.state == "running",
+            or_(models.IngestJob.heartbeat_at.is_(None), models.IngestJob.heartbeat_at < cutoff),
+        ),
+    )
+
+
+def claim_job(db: Session, job_id: str) -> Optional[str]:
+    """
+    Take the lease on a claimable job and mark it running. Returns the lease
+    holder id, or None when the job is finished or another worker holds it.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    claimed = (
+        db.query(models.IngestJob)
+        .filter(models.IngestJob.id == job_id)
+        .filter(_claimable())
+        .update({"state": "running", "worker": worker, "heartbeat_at": datetime.now()},
+                synchronize_session=False)
+    )
+    db.commit()
+    return worker if claimed == 1 else None
+
+
+def _renew_lease(db: Session, job: models.IngestJob, worker: str):
+    """
+    Extend the lease `worker` (claim_job's return value) holds on the job, in
+    the current transaction, or raise LeaseLostError. Not job.worker: every
+    commit reloads that from the row, where a new holder may have written
+    itself.
+    """
+    renewed = (
+        db.query(models.IngestJob)
+        .filter(models.IngestJob.id == job.id)
+        .filter(models.IngestJob.worker == worker)
+        .update({"heartbeat_at": datetime.now()}, synchronize_session=False)
+    )
+    if renewed != 1:
+        raise LeaseLostError(f"Job {job.id} was taken over by another worker")
+
+
+def resume_pending_jobs() -> List[str]:
+    """Resubmit jobs that are queued or whose worker's lease has expired."""
+    db = SessionLocal()
+    try:
+        job_ids = [
+            job_id for (job_id,) in
+            db.query(models.IngestJob.id)
+            .filter(_claimable())
+            .order_by(models.IngestJob.created_at)
+            .all()
+        ]
+    finally:
+        db.close()
+
+    for job_id in job_ids:
+        _submit(job_id)
+    if job_ids:
+        logger.info("Resumed %d ingest job(s)", len(job_ids))
+    return job_ids
+
+
+def prepare_article(article_data: Dict, idx: int, filename: str) -> Optional[Dict]:
+    """Fill in defaults for one parser result, or return None when it has no content."""
+    if not article_data.get("content"):
+        return None
+    return {
+        "title": article_data.get("title") or f"Article {idx + 1} from {filename}",
+        "summary": article_data.get("summary", article_data.get("content", "")[:500]),
+        "content": article_data.get("content", ""),
+        "category": article_data.get("category", "general"),
+        "source_file": article_data.get("source_file", filename),
+        "published_date": article_data.get("published_date"),
+    }
+
+
+def _recorded(items: Iterator, into: List) -> Iterator:
+    """Pass items through, keeping a copy of each in `into`."""
+    for item in items:
+        into.append(item)
+        yield item
+
+
+def _set_stage(db: Session, job: models.IngestJob, worker: str, stage: str, **progress):
+    job.stage = stage
+    job.progress = {**(job.progress or {}), stage: progress}
+    _renew_lease(db, job, worker)
+    db.commit()
+
+
+def _fail(db: Session, job: models.IngestJob, worker: str, error: str):
+    if job.state == "running":
+        _renew_lease(db, job, worker)
+    job.state = "failed"
+    job.error = error
+    job.finished_at = datetime.now()
+    db.commit()
+    metrics.INGEST_JOBS.inc(state="failed")
+    logger.warning("Ingest job failed: %s", error)
+
+
+def run_job(job_id: str) -> Dict:
+    """
+    Parse and save one uploaded PDF. Runs inside a pool worker process and
+    returns the metrics recorded meanwhile (see metrics.drain()).
+
+    Articles are saved as the parser yields them, so the "parse" and "save"
+    stages run side by side. PDFs whose content hash is in the parse cache
+    skip parsing altogether; those whose pages are in page_cache skip the
+    layout analysis and are only segmented. Parsing is deterministic, so a
+    resumed job re-parses the PDF and skips the articles its "save" progress
+    says were already handled before the restart.
+    """
+    token = logs.job_id.set(job_id)
+    try:
+        _run_job(job_id)
+    finally:
+        logs.job_id.reset(token)
+    return metrics.drain()
+
+
+def _run_job(job_id: str):
+    from enhanced_pdf_parser import iter_page_layouts, segment_pages, EXTRACTOR_VERSION, PARSER_VERSION
+
+    db = SessionLocal()
+    try:
+        worker = claim_job(db, job_id)
+        if worker is None:
+            logger.info("Ingest job is finished or running elsewhere")
+            return
+        job = get_job(db, job_id)
+        logger.info("Ingest job started: %s", job.filename)
+
+        job.error = None
+        # Index of the first article not yet handled; non-zero when resuming
+        resume_from = (job.progress or {}).get("save", {}).get("done", 0)
+        _set_stage(db, job, worker, "parse", state="running", articles_found=0)
+        _set_stage(db, job, worker, "save", state="running", done=resume_from)
+
+        found = 0
+        skipped = 0
+        duplicates = 0
+        categories = set()
+        preview = []
+        batch = []  # (index in the PDF, prepared article)
+
+        def save_batch():
+            nonlocal skipped, duplicates
+            if not batch:
+                return
+            try:
+                with metrics.INGEST_STAGE_SECONDS.time(stage="db_insert"):
+                    result = crud.create_articles_bulk(
+                        db, [row for _, row in batch], commit=False, source_hash=content_hash,
+                        deduplicate=True,
+                    )
+                for (_, row), article_id in zip(batch, result["ids"]):
+                    if article_id is None:
+                        continue
+                    if len(preview) < 3:
+                        preview.append({
+                            "id": article_id,
+                            "title": row["title"],
+                            "category": row["category"],
+                            "summary": row["summary"][:200] if row["summary"] else "",
+                        })
+                for error in result["errors"]:
+                    logger.warning("Skipping article %d: %s", batch[error["index"]][0] + 1, error["error"])
+                for duplicate in result["duplicates"]:
+                    logger.info("Skipping article %d: duplicate of article %d (similarity %.2f)",
+                                batch[duplicate["index"]][0] + 1, duplicate["original_id"], duplicate["similarity"])
+                saved = sum(1 for article_id in result["ids"] if article_id is not None)
+                skipped += len(batch) - saved
+                duplicates += len(result["duplicates"])
+                # Progress is committed in the same transaction as the articles it counts
+                job.articles_found = found
+                job.articles_saved += saved
+                job.progress = {
+                    "parse": {"state": "running", "articles_found": found},
+                    "save": {"state": "running", "done": batch[-1][0] + 1},
+                }
+                _renew_lease(db, job, worker)
+                with metrics.INGEST_STAGE_SECONDS.time(stage="db_insert"):
+                    db.commit()
+                metrics.INGEST_ARTICLES.inc(saved, outcome="saved")
+                metrics.INGEST_ARTICLES.inc(len(result["duplicates"]), outcome="duplicate")
+                metrics.INGEST_ARTICLES.inc(len(batch) - saved - len(result["duplicates"]), outcome="skipped")
+            except LeaseLostError:
+                db.rollback()
+                raise
+            except Exception as save_error:
+                logger.error("Error saving %d articles: %s", len(batch), save_error)
+                db.rollback()
+                skipped += len(batch)
+                metrics.INGEST_ARTICLES.inc(len(batch), outcome="skipped")
+            batch.clear()
+
+        filename, file_path = job.filename, job.file_path
+        content_hash = job.content_hash or parse_cache.hash_file(file_path)
+        cached = parse_cache.get(db, content_hash, PARSER_VERSION)
+        extracted = None  # page layouts for page_cache, when the PDF has to be opened
+        if cached is not None:
+            articles_iter = iter([{**a, "source_file": filename} for a in cached])
+        else:
+            layouts = page_cache.get(db, content_hash, EXTRACTOR_VERSION)
+            if layouts is None:
+                extracted = []
+                layouts = _recorded(iter_page_layouts(file_path, workers=JOB_EXTRACT_WORKERS), extracted)
+            articles_iter = segment_pages(layouts, filename)
+        # End the lookup transaction: on SQLite it holds the write lock (BEGIN
+        # IMMEDIATE), and parsing must not lock out every other writer. Until
+        # save_batch() nothing below touches the session (hence the locals).
+        db.commit()
+        parsed = []
+
+        try:
+            for idx, article_data in enumerate(articles_iter):
+                found = idx + 1
+                if cached is None:
+                    parsed.append(article_data)
+                row = prepare_article(article_data, idx, filename)
+                if row is None:
+                    logger.info("Skipping article %d: no content", idx + 1)
+                    skipped += 1
+                    metrics.INGEST_ARTICLES.inc(outcome="skipped")
+                    continue
+                if row["category"]:
+                    categories.add(row["category"])
+                if idx < resume_from:
+                    continue
+                batch.append((idx, row))
+                if len(batch) >= INGEST_BATCH_SIZE:
+                    save_batch()
+        except LeaseLostError:
+            raise
+        except Exception as parse_error:
+            logger.exception("Failed to parse PDF")
+            db.rollback()
+            _fail(db, job, worker, f"Failed to parse PDF: {str(parse_error)}")
+            return
+        save_batch()
+
+        job.articles_found = found
+        pages = extracted if extracted is not None else layouts if cached is None else []
+        scanned = sum(1 for layout in pages if layout.get("scanned"))
+        _set_stage(db, job, worker, "parse", state="done", articles_found=found, cached=cached is not None,
+                   pages_cached=extracted is None, scanned_pages=scanned)
+        if extracted is not None:
+            page_cache.put(db, content_hash, EXTRACTOR_VERSION, extracted)
+        if cached is None:
+            parse_cache.put(db, content_hash, PARSER_VERSION, parsed)
+        if found == 0 and pages and scanned == len(pages):
+            _fail(db, job, worker, f"No articles found in PDF: all {scanned} pages are scanned images without a text layer.")
+            return
+        if found == 0:
+            _fail(db, job, worker, "No articles found in PDF. The PDF might be empty, scanned, or have an incompatible format.")
+            return
+
+        job.articles_skipped = skipped
+        if job.articles_saved == 0 and duplicates == 0:
+            _fail(db, job, worker, "No valid articles could be extracted and saved from the PDF")
+            return
+
+        job.state = "done"
+        job.finished_at = datetime.now()
+        job.result = {"categories_found": sorted(categories), "articles": preview, "duplicates": duplicates}
+        _set_stage(db, job, worker, "save", state="done", done=found)
+        metrics.INGEST_JOBS.inc(state="done")
+        logger.info("Ingest job done: %d articles saved, %d skipped (%d duplicates)",
+                    job.articles_saved, skipped, duplicates)
+    except LeaseLostError as e:
+        db.rollback()
+        logger.warning("Stopping: %s", e)
+    except Exception as e:
+        logger.exception("Ingest job error")
+        db.rollback()
+        job = get_job(db, job_id)
+        if job is not None:
+            try:
+                _fail(db, job, worker, f"Processing error: {str(e)}")
+            except LeaseLostError as lost:
+                db.rollback()
+                logger.warning("Stopping: %s", lost)
+    finally:
+        db.close()
@@ -0,0 +1,81 @@
+# logs.py
+"""
+Structured logging.
+
+Every record carries the id of the HTTP request or ingest job it belongs to
+(request_id / job_id, from context variables), so the lines of one upload
+can be followed from the API process into the worker that parses it.
+
+LOG_FORMAT=json (default) writes one JSON object per line; LOG_FORMAT=text
+is easier to read in a terminal. LOG_LEVEL sets the level (default INFO).
+"""
+import json
+import logging
+import os
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+job_id: ContextVar[Optional[str]] = ContextVar("job_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class ContextFilter(logging.Filter):
+    """Copy the current request/job id onto each record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id.get()
+        if getattr(record, "job_id", None) is None:
+            record.job_id = job_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(ids)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        ids = [f"{k}={getattr(record, k)}" for k in ("request_id", "job_id") if getattr(record, k, None)]
+        record.ids = f" [{' '.join(ids)}]" if ids else ""
+        return super().format(record)
+
+
+_configured = False
+
+
+def setup_logging():
+    """Install the handler on the root logger. Safe to call more than once."""
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    _configured = True
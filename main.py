@@ -1,20 +1,105 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, UploadFile, File, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.routing import Match
 from typing import List, Optional
-import crud, models, schemas
-from database import SessionLocal, engine
-from enhanced_pdf_parser import extract_articles_from_pdf
+import crud, models, schemas, changelog, dedup, export, related, jobs, parse_cache, page_cache, reprocess, response_cache, blob_store, logs, metrics
+from database import SessionLocal, ReadSessionLocal, engine, init_db
+from contextlib import asynccontextmanager
+import logging
 import shutil
 import os
+import time
+import uuid
 from datetime import datetime
-import traceback
+
+logs.setup_logging()
+logger = logging.getLogger(__name__)
+
+# "reader" serves the query endpoints only and never loads the PDF stack or
+# forks ingest workers; "ingester" serves uploads, jobs and maintenance;
+# "all" is both, in one process.
+APP_ROLE = os.environ.get("APP_ROLE", "all")
+if APP_ROLE not in ("all", "reader", "ingester"):
+    raise ValueError(f"APP_ROLE must be all, reader or ingester, not {APP_ROLE!r}")
+INGESTS = APP_ROLE in ("all", "ingester")
+
+# Create tables, apply migrations and set up the search index
+init_db()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not INGESTS:
+        yield
+        return
+    jobs.start_workers()
+    # Pick up ingest jobs interrupted by the last shutdown, then any whose worker dies
+    jobs.resume_pending_jobs()
+    jobs.start_lease_watch()
+    db = SessionLocal()
+    try:
+        blob_store.collect_garbage(db)
+    finally:
+        db.close()
+    yield
+    jobs.shutdown(wait=False)
+
 
 # Initialize app
-app = FastAPI(title="Enhanced News API", description="News API with intelligent article extraction")
+app = FastAPI(
+    title="Enhanced News API",
+    description="News API with intelligent article extraction",
+    lifespan=lifespan,
+)
+
+# Cache read endpoints until the article data changes; ETag/304 support
+app.middleware("http")(response_cache.middleware)
+
+# Compress responses above GZIP_MIN_SIZE bytes for clients that accept gzip
+GZIP_MIN_SIZE = int(os.environ.get("GZIP_MIN_SIZE", 1024))
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
+# 413 for oversized bodies before Starlette spools the multipart form
+app.add_middleware(blob_store.UploadLimitMiddleware)
+
+
+def _route_template(request: Request) -> str:
+    """Path template of the matched route ("/news/{article_id}"), which keeps label cardinality bounded."""
+    route = request.scope.get("route")
+    if route is None:
+        # Cache hits are answered before routing
+        for candidate in app.router.routes:
+            if candidate.matches(request.scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", "unmatched")
+
+
+# Outermost: request id for the logs, per-route count and latency for /metrics
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = logs.request_id.set(request_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        route = _route_template(request)
+        metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route)
+        logs.request_id.reset(token)
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
+# Endpoints served per APP_ROLE; both are included at the end of this module
+query_routes = APIRouter()
+ingest_routes = APIRouter()
 
 # Directory to save uploaded PDFs
 UPLOAD_DIR = "uploads"
@@ -30,86 +115,237 @@ def get_db():
         db.close()
 
 
+# Read-only session for GET handlers (see database.py)
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 @app.get("/")
 def root():
     return {"message": "Enhanced News Backend is running!", "version": "2.0"}
 
 
-@app.get("/news/", response_model=List[schemas.ArticleOut])
+CURSOR_DESCRIPTION = "Opaque cursor from the X-Next-Cursor header of the previous page; replaces offset"
+
+
+def paginated(response: Response, fetch, limit: int):
+    """
+    Run a page query and advertise where the next page starts.
+    A full page sets X-Next-Cursor; pass it back as ?cursor= for the next page.
+    """
+    try:
+        items = fetch()
+    except crud.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = items[-1].cursor
+    return items
+
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return, e.g. id,title,category (default: all but content)"
+
+
+def parse_fields(fields: Optional[str], schema) -> Optional[List[str]]:
+    """Validate ?fields= against a schema; id is always included."""
+    if fields is None:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(requested) - set(schema.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(["id"] + requested))
+
+
+def list_response(response: Response, items, fields: Optional[List[str]]):
+    """
+    A page of articles: serialized with the endpoint's list schema, or, when
+    ?fields= was given, with exactly those fields.
+    """
+    if fields is None:
+        return items
+    body = jsonable_encoder([{f: getattr(a, f, None) for f in fields} for a in items])
+    headers = {k: v for k, v in response.headers.items() if k.lower() == "x-next-cursor"}
+    return JSONResponse(body, headers=headers)
+
+
+# Columns loaded for list views that do not ask for specific fields
+LIST_FIELDS = list(schemas.ArticleListOut.model_fields)
+
+
+@query_routes.get("/news/", response_model=List[schemas.ArticleListOut])
 def read_news(
+    response: Response,
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search in title and content"),
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
     """
     Enhanced news endpoint with filtering and search capabilities.
     """
+    selected = parse_fields(fields, schemas.ArticleOut)
+    load = selected or LIST_FIELDS
     if category and search:
         # Both category and search
-        return crud.search_articles_by_category(db, category, search, limit, offset)
+        fetch = lambda: crud.search_articles_by_category(db, category, search, limit, offset, cursor, load)
     elif category:
         # Category filter only
-        return crud.get_articles_by_category(db, category, limit, offset)
+        fetch = lambda: crud.get_articles_by_category(db, category, limit, offset, cursor, load)
     elif search:
         # Search only
-        return crud.search_articles(db, search, limit, offset)
+        fetch = lambda: crud.search_articles(db, search, limit, offset, cursor, load)
     else:
         # All articles
-        return crud.get_articles(db, limit, offset)
+        fetch = lambda: crud.get_articles(db, limit, offset, cursor, load)
+    return list_response(response, paginated(response, fetch, limit), selected)
 
 
-@app.get("/news/{article_id}", response_model=schemas.ArticleOut)
-def read_article(article_id: int, db: Session = Depends(get_db)):
+@query_routes.get("/news/{article_id}", response_model=schemas.ArticleOut)
+def read_article(article_id: int, db: Session = Depends(get_read_db)):
     article = crud.get_article(db, article_id)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
     return article
 
 
-@app.get("/categories/")
-def get_categories(db: Session = Depends(get_db)):
+@query_routes.get("/news/{article_id}/related", response_model=List[schemas.RelatedArticleOut])
+def read_related_articles(article_id: int, db: Session = Depends(get_read_db)):
+    """Most similar articles by content, closest first; precomputed at ingest (see related.py)."""
+    pairs = related.get_related(db, article_id, LIST_FIELDS)
+    if pairs is None:
+        if not crud.get_article(db, article_id):
+            raise HTTPException(status_code=404, detail="Article not found")
+        return []
+    return [
+        {**schemas.ArticleListOut.model_validate(article).model_dump(), "score": score}
+        for article, score in pairs
+    ]
+
+
+@query_routes.get("/news/{article_id}/duplicates", response_model=List[schemas.DuplicateOut])
+def read_article_duplicates(article_id: int, db: Session = Depends(get_read_db)):
+    """Other editions in which this article appeared (near-duplicates that were not stored)."""
+    if not crud.get_article(db, article_id):
+        raise HTTPException(status_code=404, detail="Article not found")
+    return dedup.get_links(db, article_id)
+
+
+@query_routes.get("/categories/")
+def get_categories(db: Session = Depends(get_read_db)):
     """Get all available categories with article counts."""
     categories = crud.get_categories_with_counts(db)
     return {"categories": categories}
 
 
-@app.get("/categories/{category}")
+@query_routes.get("/categories/{category}", response_model=List[schemas.ArticleListOut])
 def get_articles_by_category(
     category: str, 
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
-    return crud.get_articles_by_category(db, category, limit, offset)
+    selected = parse_fields(fields, schemas.ArticleOut)
+    items = paginated(
+        response,
+        lambda: crud.get_articles_by_category(db, category, limit, offset, cursor, selected or LIST_FIELDS),
+        limit,
+    )
+    return list_response(response, items, selected)
 
 
-@app.get("/search/")
+@query_routes.get("/search/", response_model=List[schemas.ArticleSearchListOut])
 def search_articles(
+    response: Response,
     q: str = Query(..., min_length=1),
     category: Optional[str] = None,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
-    """Enhanced search with optional category filtering."""
+    """BM25-ranked full-text search with optional category filtering, snippets and highlights."""
+    selected = parse_fields(fields, schemas.ArticleSearchOut)
+    load = selected or LIST_FIELDS
     if category:
-        return crud.search_articles_by_category(db, category, q, limit, offset)
-    return crud.search_articles(db, q, limit, offset)
+        fetch = lambda: crud.search_articles_by_category(db, category, q, limit, offset, cursor, load)
+    else:
+        fetch = lambda: crud.search_articles(db, q, limit, offset, cursor, load)
+    return list_response(response, paginated(response, fetch, limit), selected)
+
+
+@query_routes.get("/sync", response_model=schemas.SyncOut)
+def sync_articles(
+    since: Optional[int] = Query(None, ge=0, description="Token from the previous /sync; omit to get the current token"),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Articles inserted or rewritten (by /reprocess) and ids deleted after a
+    sync token, in change order, plus the new token. A client keeps its feed up to date by applying these
+    instead of downloading the feed again. 410 means the token is unknown
+    here (the database was reset) and the feed must be reloaded.
+    """
+    if since is None:
+        return {"articles": [], "deleted": [], "token": changelog.current_token(db), "has_more": False}
+    try:
+        return changelog.changes_since(db, since, limit, LIST_FIELDS)
+    except changelog.StaleTokenError as e:
+        raise HTTPException(status_code=410, detail=str(e))
 
 
-@app.post("/news/", response_model=schemas.ArticleOut)
+@query_routes.get("/export/")
+def export_articles(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    category: Optional[str] = None,
+    since: Optional[datetime] = Query(None, description="Created at or after"),
+    until: Optional[datetime] = Query(None, description="Created before"),
+    source_file: Optional[str] = None,
+):
+    """
+    Stream every article matching the filters, full content included, as
+    NDJSON or CSV, in id order. Memory use does not depend on the number of rows.
+    """
+    return StreamingResponse(
+        export.stream(ReadSessionLocal, format, category=category, since=since, until=until,
+                      source_file=source_file),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="articles.{format}"'},
+    )
+
+
+@ingest_routes.post("/news/", response_model=schemas.ArticleOut)
 def create_news(article: schemas.ArticleCreate, db: Session = Depends(get_db)):
     return crud.create_article(db=db, article_in=article)
 
 
-@app.post("/upload-pdf/")
-async def upload_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@ingest_routes.post("/upload-pdf/", status_code=202, response_model=schemas.JobOut)
+def upload_pdf(
+    response: Response,
+    file: UploadFile = File(...),
+    force: bool = Query(False, description="Ingest again even if this PDF was already ingested"),
+    db: Session = Depends(get_db)
+):
     """
-    Enhanced PDF upload with intelligent article extraction.
+    Save the uploaded PDF and queue it for background article extraction.
+    Poll /jobs/{job_id} for progress and the result.
+    A PDF whose content was already ingested returns the earlier job (200)
+    instead of inserting its articles a second time.
+    Files larger than blob_store.UPLOAD_MAX_BYTES are rejected with 413;
+    blob_store.UploadLimitMiddleware does so before the body is spooled.
+    A plain def on purpose: the file copy and the writer session block, and
+    FastAPI runs sync handlers in its threadpool, off the event loop.
     """
-    file_path = None
     try:
         # Validate file
         if not file.filename:
@@ -117,126 +353,152 @@ async def upload_pdf(file: UploadFile = File(...), db: Session = Depends(get_db)
             
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-        
-        # Save uploaded PDF
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        
-        # Use async file operations
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        print(f"PDF saved to: {file_path}")
-        print(f"File size: {os.path.getsize(file_path)} bytes")
-
-        # Extract articles using enhanced parser
-        try:
-            articles_data = extract_articles_from_pdf(file_path)
-            print(f"Extracted {len(articles_data) if articles_data else 0} articles")
-        except Exception as parse_error:
-            print(f"PDF parsing error: {str(parse_error)}")
-            print(traceback.format_exc())
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Failed to parse PDF: {str(parse_error)}"
-            )
 
-        # Check if articles were found
-        if not articles_data or len(articles_data) == 0:
-            raise HTTPException(
-                status_code=400, 
-                detail="No articles found in PDF. The PDF might be empty, scanned, or have an incompatible format."
-            )
-
-        # Save articles to database
-        saved_articles = []
-        for idx, article_data in enumerate(articles_data):
-            try:
-                # Validate required fields
-                if not article_data.get("title"):
-                    article_data["title"] = f"Article {idx + 1} from {file.filename}"
-                
-                if not article_data.get("content"):
-                    print(f"Skipping article {idx + 1}: No content")
-                    continue
-                
-                # Ensure all required fields have default values
-                article_create = schemas.ArticleCreate(
-                    title=article_data.get("title", f"Article {idx + 1}"),
-                    summary=article_data.get("summary", article_data.get("content", "")[:500]),
-                    content=article_data.get("content", ""),
-                    category=article_data.get("category", "general"),
-                    source_file=article_data.get("source_file", file.filename),
-                    published_date=article_data.get("published_date")
-                )
-                
-                saved_article = crud.create_article(db=db, article_in=article_create)
-                saved_articles.append(saved_article)
-                print(f"Saved article {idx + 1}: {article_data.get('title')}")
-                
-            except Exception as save_error:
-                print(f"Error saving article {idx + 1}: {str(save_error)}")
-                print(traceback.format_exc())
-                # Continue with other articles instead of failing completely
-                continue
-
-        if not saved_articles:
+        # Stream into the content-addressed store; identical PDFs share one file
+        try:
+            content_hash, file_path, size = blob_store.save_upload(file)
+        except blob_store.UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        blob_store.register(db, content_hash, file_path, size)
+
+        if not force:
+            existing = jobs.find_ingested(db, content_hash)
+            if existing:
+                logger.info("%s was already ingested by job %s", file.filename, existing.id)
+                response.status_code = 200
+                return existing
+
+        if jobs.queue_size() >= jobs.INGEST_QUEUE_SIZE:
             raise HTTPException(
-                status_code=400, 
-                detail="No valid articles could be extracted and saved from the PDF"
+                status_code=429,
+                detail="Ingestion queue is full, please retry later",
+                headers={"Retry-After": "30"},
             )
 
-        # Get unique categories
-        categories_found = list(set(
-            article.category for article in saved_articles if article.category
-        ))
-
-        return {
-            "message": f"Successfully extracted and saved {len(saved_articles)} articles from {file.filename}",
-            "articles_count": len(saved_articles),
-            "articles": [
-                {
-                    "id": article.id,
-                    "title": article.title,
-                    "category": article.category,
-                    "summary": article.summary[:200] if article.summary else ""
-                }
-                for article in saved_articles[:3]
-            ],  # Return first 3 as preview
-            "categories_found": categories_found
-        }
+        try:
+            job = jobs.create_job(db, file.filename, file_path, content_hash)
+            logger.info("Queued %s (%d bytes) as job %s", file.filename, size, job.id)
+            return job
+        except jobs.QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
 
     except HTTPException:
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        # Log the full error
-        print(f"Unexpected error in upload_pdf: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Unexpected error in upload_pdf")
         raise HTTPException(
             status_code=500, 
             detail=f"Processing error: {str(e)}"
         )
-    finally:
-        # Clean up uploaded file (optional - comment out if you want to keep files)
-        # if file_path and os.path.exists(file_path):
-        #     try:
-        #         os.remove(file_path)
-        #     except Exception as cleanup_error:
-        #         print(f"Could not delete file: {cleanup_error}")
-        pass
 
 
-@app.get("/stats/")
-def get_stats(db: Session = Depends(get_db)):
+@ingest_routes.get("/jobs/{job_id}", response_model=schemas.JobOut)
+def get_job(job_id: str, db: Session = Depends(get_read_db)):
+    """Get state, per-stage progress, article counts and errors of an ingest job."""
+    job = jobs.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@ingest_routes.get("/cache/parse/")
+def get_parse_cache_stats(db: Session = Depends(get_read_db)):
+    """Get size and hit count of the parse cache."""
+    return parse_cache.stats(db)
+
+
+@ingest_routes.delete("/cache/parse/")
+def invalidate_parse_cache(db: Session = Depends(get_db)):
+    """Drop every cached parse result."""
+    deleted = parse_cache.invalidate(db)
+    return {"message": f"Invalidated {deleted} cached parse result(s)"}
+
+
+@ingest_routes.delete("/cache/parse/{content_hash}")
+def invalidate_parse_cache_entry(content_hash: str, db: Session = Depends(get_db)):
+    """Drop the cached parse result of one PDF."""
+    deleted = parse_cache.invalidate(db, content_hash)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="No cached parse result for this hash")
+    return {"message": f"Invalidated {deleted} cached parse result(s)"}
+
+
+@ingest_routes.get("/cache/pages/")
+def get_page_cache_stats(db: Session = Depends(get_read_db)):
+    """Get the number of PDFs and pages whose extracted layout is cached."""
+    return page_cache.stats(db)
+
+
+@ingest_routes.post("/reprocess")
+def reprocess_pdfs(
+    source_file: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    mode: Optional[str] = Query(None, pattern="^(layout|text)$"),
+    limit: int = Query(reprocess.REPROCESS_MAX_PDFS, ge=1, le=reprocess.REPROCESS_MAX_PDFS),
+    after: Optional[str] = Query(None, description='"next" of the previous response'),
+    db: Session = Depends(get_db),
+):
+    """
+    Re-run segmentation and enrichment on the cached pages of ingested PDFs
+    and replace their articles. Without filters every cached PDF is
+    reprocessed, `limit` per request: repeat with ?after=<next> until next is null.
+    """
+    started = time.perf_counter()
+    results, next_hash = reprocess.reprocess(db, source_file, content_hash, mode, limit, after)
+    if not results and (source_file or content_hash):
+        raise HTTPException(status_code=404, detail="No cached pages for this PDF")
+    return {"pdfs": len(results), "seconds": round(time.perf_counter() - started, 3), "results": results,
+            "next": next_hash}
+
+
+@app.get("/cache/response/")
+def get_response_cache_stats():
+    """Get size and current data generation of the response cache."""
+    return response_cache.stats()
+
+
+@app.delete("/cache/response/")
+def clear_response_cache():
+    """Drop every cached response."""
+    response_cache.clear()
+    return {"message": "Response cache cleared"}
+
+
+@ingest_routes.get("/blobs/")
+def get_blob_stats(db: Session = Depends(get_read_db)):
+    """Get count and size of the stored PDFs."""
+    return blob_store.stats(db)
+
+
+@ingest_routes.post("/blobs/gc")
+def collect_blob_garbage(db: Session = Depends(get_db)):
+    """Delete stored PDFs whose articles have all been deleted."""
+    return blob_store.collect_garbage(db)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request counts and latencies per route, and ingestion stage timings, in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@query_routes.get("/stats/")
+def get_stats(db: Session = Depends(get_read_db)):
     """Get database statistics."""
     return crud.get_database_stats(db)
 
 
-@app.delete("/news/{article_id}")
+@ingest_routes.delete("/news/{article_id}")
 def delete_article(article_id: int, db: Session = Depends(get_db)):
     """Delete an article."""
     success = crud.delete_article(db, article_id)
     if not success:
         raise HTTPException(status_code=404, detail="Article not found")
-    return {"message": "Article deleted successfully"}
\ No newline at end of file
+    return {"message": "Article deleted successfully"}
+
+
+if APP_ROLE in ("all", "reader"):
+    app.include_router(query_routes)
+if INGESTS:
+    app.include_router(ingest_routes)
@@ -0,0 +1,171 @@
+# metrics.py
+"""
+Counters and histograms exposed at /metrics in the Prometheus text format.
+
+A small in-process registry (no client library needed).  Ingest jobs run in
+worker processes, so a worker drains what it recorded at the end of each job
+and returns it with the job result; the API process merges it in, and
+/metrics covers the ingestion stages too.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.001, 0.005, 0.025, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_lock = threading.Lock()
+_registry: Dict[str, "_Metric"] = {}
+
+
+def _after_fork():
+    # Another thread may have held the lock when the process forked
+    global _lock
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], key: Tuple[str, ...], extra: str = "") -> str:
+    parts = ['%s="%s"' % (n, v.replace("\\", "\\\\").replace('"', '\\"')) for n, v in zip(labelnames, key)]
+    if extra:
+        parts.append(extra)
+    return "{%s}" % ",".join(parts) if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            _registry[name] = self
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _merge(self, key, value):
+        self._values[key] = self._values.get(key, 0.0) + value
+
+    def _render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _merge(self, key, value):
+        counts, total, n = value
+        old_counts, old_total, old_n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+        self._values[key] = ([a + b for a, b in zip(old_counts, counts)], old_total + total, old_n + n)
+
+    def _render(self) -> List[str]:
+        lines = []
+        for key, (counts, total, n) in sorted(self._values.items()):
+            for bound, count in zip(self.buckets, counts):
+                le = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {count}")
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {n}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for metric in _registry.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric._render())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Forget every recorded value (a forked worker starts from zero)."""
+    with _lock:
+        for metric in _registry.values():
+            metric._values = {}
+
+
+def drain() -> Dict:
+    """Return everything recorded so far and reset; see merge()."""
+    with _lock:
+        data = {name: dict(metric._values) for name, metric in _registry.items() if metric._values}
+        for metric in _registry.values():
+            metric._values = {}
+    return data
+
+
+def merge(data: Optional[Dict]):
+    """Add values drained in another process."""
+    if not data:
+        return
+    with _lock:
+        for name, values in data.items():
+            metric = _registry.get(name)
+            if metric is None:
+                continue
+            for key, value in values.items():
+                metric._merge(key, value)
+
+
+# HTTP
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"])
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce a response", ["method", "route"])
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Cacheable GETs by cache outcome", ["result"])
+
+# Ingestion
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds",
+    "Time spent per ingestion stage (pdf_open, extract_text, split, enrich, db_insert)",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+INGEST_PAGES = Counter("ingest_pages_total", "PDF pages extracted")
+INGEST_SCANNED_PAGES = Counter("ingest_scanned_pages_total", "Scanned PDF pages: images without a text layer")
+INGEST_ARTICLES = Counter("ingest_articles_total", "Articles handled by ingest jobs", ["outcome"])
+INGEST_JOBS = Counter("ingest_jobs_total", "Finished ingest jobs", ["state"])
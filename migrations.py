@@ -0,0 +1,143 @@
+# migrations.py
+"""
+Schema migrations for databases created by older versions of the app.
+
+Base.metadata.create_all() only creates missing tables; it never touches
+tables that already exist.  Changes to existing tables (new indexes, new
+columns) are listed in MIGRATIONS and applied once, in order, by
+run_migrations().  Each applied step is recorded in schema_migrations.
+"""
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table
+from sqlalchemy.engine import Connection, Engine
+
+import models
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("name", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _article_feed_indexes(conn: Connection):
+    """Composite indexes backing keyset pagination of the feed endpoints."""
+    for index in models.Article.__table__.indexes:
+        if index.name in ("ix_articles_created_at_id", "ix_articles_category_created_at_id"):
+            index.create(bind=conn, checkfirst=True)
+
+
+def _data_generation_row(conn: Connection):
+    """The single row crud.bump_generation() increments."""
+    table = models.DataGeneration.__table__
+    table.create(bind=conn, checkfirst=True)
+    if conn.execute(table.select().where(table.c.id == 1)).first() is None:
+        conn.execute(table.insert().values(id=1, value=0))
+
+
+def _article_stats_backfill(conn: Connection):
+    """Fill the statistics tables from the articles already in the database."""
+    import stats
+    from sqlalchemy.orm import Session
+
+    for model in (models.StatTotal, models.CategoryCount, models.HourlyIngest):
+        model.__table__.create(bind=conn, checkfirst=True)
+    session = Session(bind=conn, join_transaction_mode="create_savepoint")
+    stats.rebuild(session)
+    session.close()
+
+
+def _article_source_hash(conn: Connection):
+    """Link articles to the uploaded PDF they came from (blob_store references)."""
+    from sqlalchemy import inspect
+
+    columns = {c["name"] for c in inspect(conn).get_columns("articles")}
+    if "source_hash" not in columns:
+        conn.exec_driver_sql("ALTER TABLE articles ADD COLUMN source_hash VARCHAR(64)")
+    for index in models.Article.__table__.indexes:
+        if index.name == "ix_articles_source_hash":
+            index.create(bind=conn, checkfirst=True)
+    models.Blob.__table__.create(bind=conn, checkfirst=True)
+
+
+def _article_change_log(conn: Connection):
+    """Seed the /sync change sequence with the articles already in the database."""
+    import changelog
+    from sqlalchemy.orm import Session
+
+    models.ArticleChange.__table__.create(bind=conn, checkfirst=True)
+    session = Session(bind=conn, join_transaction_mode="create_savepoint")
+    changelog.rebuild(session)
+    session.close()
+
+
+def _ingest_job_lease(conn: Connection):
+    """Lease columns that let exactly one worker claim and run an ingest job."""
+    from sqlalchemy import inspect
+
+    columns = {c["name"] for c in inspect(conn).get_columns("ingest_jobs")}
+    if "worker" not in columns:
+        conn.exec_driver_sql("ALTER TABLE ingest_jobs ADD COLUMN worker VARCHAR(100)")
+    if "heartbeat_at" not in columns:
+        conn.exec_driver_sql("ALTER TABLE ingest_jobs ADD COLUMN heartbeat_at DATETIME")
+
+
+def _term_postings_weight_index(conn: Connection):
+    """(term, weight) index behind related.index's capped posting reads."""
+    for index in models.TermPosting.__table__.indexes:
+        if index.name == "ix_term_postings_term_weight":
+            index.create(bind=conn, checkfirst=True)
+
+
+def _related_index_backfill(conn: Connection):
+    """Index the articles stored before /news/{id}/related existed."""
+    import related
+    from sqlalchemy.orm import Session
+
+    session = Session(bind=conn, join_transaction_mode="create_savepoint")
+    related.rebuild(session)
+    session.close()
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_article_feed_indexes", _article_feed_indexes),
+    ("0002_data_generation_row", _data_generation_row),
+    ("0003_article_stats_backfill", _article_stats_backfill),
+    ("0004_article_source_hash", _article_source_hash),
+    ("0005_article_change_log", _article_change_log),
+    ("0006_ingest_job_lease", _ingest_job_lease),
+    ("0007_term_postings_weight_index", _term_postings_weight_index),
+    ("0008_related_index_backfill", _related_index_backfill),
+]
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """Apply every migration that has not been applied yet. Returns their names."""
+    _metadata.create_all(bind=engine)
+    applied = []
+    with engine.begin() as conn:
+        done = {row.name for row in conn.execute(schema_migrations.select())}
+        for name, migrate in MIGRATIONS:
+            if name in done:
+                continue
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(name=name, applied_at=datetime.now()))
+            applied.append(name)
+    if applied:
+        logger.info("Applied migrations: %s", ", ".join(applied))
+    return applied
+
+
+if __name__ == "__main__":
+    import logs
+    from database import init_db
+
+    logs.setup_logging()
+    init_db()  # creates missing tables, then runs the migrations
@@ -1,7 +1,8 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, Float, Integer, String, Text, DateTime, JSON, Index, LargeBinary
 from sqlalchemy.sql import func
 from database import Base
+from compression import CompressedText
 
 
 class Article(Base):
@@ -9,9 +10,169 @@ class Article(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)   # headline
-    summary = Column(Text, nullable=True)                     # short summary
-    content = Column(Text, nullable=False)                    # full article
+    summary = Column(CompressedText, nullable=True)           # short summary
+    content = Column(CompressedText, nullable=False)          # full article (see compression.py)
     category = Column(String(100), index=True)                # sports, politics, etc.
     source_file = Column(String(255), nullable=True)          # optional (PDF name or URL)
     published_date = Column(String(50), nullable=True)        # parsed date if available
+    source_hash = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded PDF (blobs)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination of the feeds: ORDER BY created_at DESC, id DESC
+        Index("ix_articles_created_at_id", "created_at", "id"),
+        Index("ix_articles_category_created_at_id", "category", "created_at", "id"),
+    )
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String(36), primary_key=True)                 # uuid4 hex
+    filename = Column(String(255), nullable=False)            # name the client uploaded
+    file_path = Column(String(500), nullable=False)           # where the PDF is stored
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the PDF
+    state = Column(String(20), nullable=False, default="queued", index=True)  # queued, running, done, failed
+    stage = Column(String(20), nullable=True)                 # parse, save
+    progress = Column(JSON, nullable=True)                    # per-stage progress
+    articles_found = Column(Integer, nullable=False, default=0)
+    articles_saved = Column(Integer, nullable=False, default=0)
+    articles_skipped = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)                      # preview + categories once done
+    error = Column(Text, nullable=True)
+    worker = Column(String(100), nullable=True)               # lease holder while running (jobs.claim_job)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # lease renewed at
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ParseCache(Base):
+    __tablename__ = "parse_cache"
+
+    content_hash = Column(String(64), primary_key=True)       # sha256 of the PDF
+    parser_version = Column(String(20), primary_key=True)     # enhanced_pdf_parser.PARSER_VERSION
+    articles = Column(JSON, nullable=False)                   # extracted article dicts
+    size_bytes = Column(Integer, nullable=False, default=0)   # size of the serialized articles
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class PageLayout(Base):
+    __tablename__ = "page_layouts"
+
+    content_hash = Column(String(64), primary_key=True)       # sha256 of the PDF
+    extractor_version = Column(String(20), primary_key=True)  # enhanced_pdf_parser.EXTRACTOR_VERSION
+    page_number = Column(Integer, primary_key=True)           # 1-based
+    layout = Column(CompressedText, nullable=False)           # page_layout() result as JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    content_hash = Column(String(64), primary_key=True)       # sha256 of the PDF
+    path = Column(String(500), nullable=False)                # blob_store.blob_path()
+    size_bytes = Column(Integer, nullable=False, default=0)
+    ref_count = Column(Integer, nullable=False, default=0)    # live articles extracted from it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_uploaded_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class ArticleChange(Base):
+    __tablename__ = "article_changes"
+    __table_args__ = {"sqlite_autoincrement": True}  # sequence numbers are never reused
+
+    seq = Column(Integer, primary_key=True)                   # change sequence; /sync tokens are these
+    article_id = Column(Integer, nullable=False, index=True)
+    deleted = Column(Boolean, nullable=False, default=False)  # tombstone
+
+
+class MinHashSignature(Base):
+    __tablename__ = "minhash_signatures"
+
+    article_id = Column(Integer, primary_key=True)
+    signature = Column(LargeBinary, nullable=False)           # dedup.NUM_HASHES uint32 (see dedup.py)
+
+
+class LshBand(Base):
+    __tablename__ = "lsh_bands"
+
+    bucket = Column(BigInteger, primary_key=True)             # hash of one band of a signature
+    article_id = Column(Integer, primary_key=True, index=True)
+
+
+class DuplicateLink(Base):
+    __tablename__ = "duplicate_links"
+
+    id = Column(Integer, primary_key=True)
+    original_id = Column(Integer, nullable=False, index=True) # the stored article it duplicates
+    title = Column(String(255), nullable=True)
+    source_file = Column(String(255), nullable=True)          # where the duplicate appeared
+    source_hash = Column(String(64), nullable=True)
+    similarity = Column(Float, nullable=False)                # estimated Jaccard similarity
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TermFrequency(Base):
+    __tablename__ = "term_frequencies"
+
+    term = Column(String(100), primary_key=True)
+    df = Column(Integer, nullable=False, default=0)           # articles containing the term (see related.py)
+
+
+class TermPosting(Base):
+    __tablename__ = "term_postings"
+
+    term = Column(String(100), primary_key=True)
+    article_id = Column(Integer, primary_key=True, index=True)
+    weight = Column(Float, nullable=False)                    # normalised TF-IDF weight
+
+    __table_args__ = (
+        # Heaviest postings of a term first (related.index reads only those)
+        Index("ix_term_postings_term_weight", "term", "weight"),
+    )
+
+
+class RelatedArticles(Base):
+    __tablename__ = "related_articles"
+
+    article_id = Column(Integer, primary_key=True)
+    neighbours = Column(JSON, nullable=False)                 # [[article id, cosine], ...], closest first
+
+
+class DataGeneration(Base):
+    __tablename__ = "data_generation"
+
+    id = Column(Integer, primary_key=True)                    # single row, id = 1
+    value = Column(Integer, nullable=False, default=0)        # bumped by every article write
+
+
+class StatTotal(Base):
+    __tablename__ = "stat_totals"
+
+    name = Column(String(50), primary_key=True)               # e.g. total_articles
+    value = Column(Integer, nullable=False, default=0)
+
+
+class CategoryCount(Base):
+    __tablename__ = "category_counts"
+
+    category = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class HourlyIngest(Base):
+    __tablename__ = "hourly_ingest"
+
+    hour = Column(DateTime, primary_key=True)                 # created_at truncated to the hour (UTC)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class CompressionDict(Base):
+    __tablename__ = "compression_dicts"
+
+    id = Column(Integer, primary_key=True)                    # referenced by compressed values
+    data = Column(LargeBinary, nullable=False)                # zlib preset dictionary
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -59,6 +59,9 @@ class _NewsListPageState extends State<NewsListPage>
   String selectedCategory = 'all';
   String searchQuery = '';
 
+  // Token of the last change applied to `news`; null until the feed is loaded
+  int? _syncToken;
+
   final ApiService _apiService = ApiService();
   final TextEditingController _searchController = TextEditingController();
   Timer? _searchDebounce;
@@ -98,13 +101,25 @@ class _NewsListPageState extends State<NewsListPage>
         return;
       }
 
+      if (_syncToken != null && news.isNotEmpty) {
+        try {
+          await _applyChanges();
+          return;
+        } on SyncTokenExpiredException {
+          _syncToken = null;
+        }
+      }
+
+      // Token first: changes made while the feed downloads come with the next sync
+      final token = (await _apiService.syncNews())['token'] as int;
       final data = await _apiService.fetchNews();
       if (!mounted) return;
       setState(() {
         news = data;
-        filteredNews = data;
+        _syncToken = token;
         isLoading = false;
       });
+      _applyFilters();
     } catch (e) {
       if (!mounted) return;
       setState(() {
@@ -114,6 +129,38 @@ class _NewsListPageState extends State<NewsListPage>
     }
   }
 
+  /// Apply the articles inserted and deleted since [_syncToken] to [news].
+  Future<void> _applyChanges() async {
+    var token = _syncToken;
+    final inserted = <dynamic>[];
+    final deleted = <int>{};
+    while (true) {
+      final changes = await _apiService.syncNews(since: token);
+      inserted.addAll(changes['articles'] as List<dynamic>);
+      deleted.addAll((changes['deleted'] as List<dynamic>).cast<int>());
+      token = changes['token'] as int;
+      if (changes['has_more'] != true) break;
+    }
+    if (!mounted) return;
+
+    final insertedIds = inserted.map((article) => article['id']).toSet();
+    final merged = [
+      ...inserted.where((article) => !deleted.contains(article['id'])),
+      ...news.where((article) =>
+          !deleted.contains(article['id']) && !insertedIds.contains(article['id'])),
+    ];
+    merged.sort((a, b) {
+      final byDate = (b['created_at'] ?? '').toString().compareTo((a['created_at'] ?? '').toString());
+      return byDate != 0 ? byDate : (b['id'] as int).compareTo(a['id'] as int);
+    });
+    setState(() {
+      news = merged;
+      _syncToken = token;
+      isLoading = false;
+    });
+    _applyFilters();
+  }
+
   Future<void> loadCategories() async {
     try {
       final data = await _apiService.getCategories();
@@ -4,6 +4,12 @@ import 'package:http/http.dart' as http;
 import 'package:flutter/foundation.dart';
 import 'package:path/path.dart' as path;
 
+/// The sync token passed to [ApiService.syncNews] is not valid any more.
+class SyncTokenExpiredException implements Exception {
+  @override
+  String toString() => 'Sync token expired, reload the feed';
+}
+
 class ApiService {
   // Base URL selection based on environment
   String get baseUrl {
@@ -66,6 +72,94 @@ class ApiService {
     }
   }
 
+  /// Fetch one page of the news feed using cursor pagination.
+  /// Pass the returned 'next_cursor' to get the following page; it is null
+  /// on the last page. Unlike offsets, cursors do not skip or repeat
+  /// articles when new ones are ingested while scrolling.
+  Future<Map<String, dynamic>> fetchNewsPage({
+    String? category,
+    String? search,
+    String? cursor,
+    int limit = 50,
+  }) async {
+    try {
+      Map<String, String> queryParams = {
+        'limit': limit.toString(),
+      };
+
+      if (category != null && category.isNotEmpty && category != 'all') {
+        queryParams['category'] = category;
+      }
+
+      if (search != null && search.isNotEmpty) {
+        queryParams['search'] = search;
+      }
+
+      if (cursor != null) {
+        queryParams['cursor'] = cursor;
+      }
+
+      final uri = Uri.parse('$baseUrl/news/').replace(queryParameters: queryParams);
+
+      final response = await http
+          .get(
+            uri,
+            headers: {'Content-Type': 'application/json'},
+          )
+          .timeout(const Duration(seconds: 15));
+
+      if (response.statusCode == 200) {
+        return {
+          'items': jsonDecode(response.body) as List<dynamic>,
+          'next_cursor': response.headers['x-next-cursor'],
+        };
+      } else {
+        throw Exception('Failed to load news: ${response.statusCode}');
+      }
+    } catch (e, stack) {
+      debugPrint('Fetch news page error: $e\n$stack');
+      throw Exception('Network error: $e');
+    }
+  }
+
+  /// Fetch the changes to the article feed after a sync token.
+  /// Returns 'articles' (inserted since the token, newest first), 'deleted'
+  /// (ids of removed articles), 'token' (pass it as `since` next time) and
+  /// 'has_more' (call again right away). Without `since` only the current
+  /// token is returned; fetch it before loading the feed so no change is
+  /// missed. Throws [SyncTokenExpiredException] when the server no longer
+  /// knows the token, in which case the feed has to be reloaded.
+  Future<Map<String, dynamic>> syncNews({int? since, int limit = 500}) async {
+    try {
+      final queryParams = {
+        'limit': limit.toString(),
+        if (since != null) 'since': since.toString(),
+      };
+
+      final uri = Uri.parse('$baseUrl/sync').replace(queryParameters: queryParams);
+
+      final response = await http
+          .get(
+            uri,
+            headers: {'Content-Type': 'application/json'},
+          )
+          .timeout(const Duration(seconds: 15));
+
+      if (response.statusCode == 200) {
+        return jsonDecode(response.body) as Map<String, dynamic>;
+      } else if (response.statusCode == 410) {
+        throw SyncTokenExpiredException();
+      } else {
+        throw Exception('Failed to sync news: ${response.statusCode}');
+      }
+    } on SyncTokenExpiredException {
+      rethrow;
+    } catch (e, stack) {
+      debugPrint('Sync news error: $e\n$stack');
+      throw Exception('Network error: $e');
+    }
+  }
+
   /// Get all available categories with counts
   Future<Map<String, dynamic>> getCategories() async {
     try {
@@ -284,8 +378,11 @@ class ApiService {
       final streamedResponse = await request.send().timeout(const Duration(seconds: 60));
       final response = await http.Response.fromStream(streamedResponse);
 
-      if (response.statusCode == 200) {
+      // The server queues the PDF and answers 202 with the ingest job
+      if (response.statusCode == 200 || response.statusCode == 202) {
         return jsonDecode(response.body) as Map<String, dynamic>;
+      } else if (response.statusCode == 429) {
+        throw Exception('Server is busy processing other PDFs, please retry later');
       } else {
         throw Exception('Failed to upload PDF: ${response.statusCode}');
       }
@@ -294,4 +391,25 @@ class ApiService {
       throw Exception('Upload error: $e');
     }
   }
+
+  /// Get state and progress of a PDF ingest job
+  Future<Map<String, dynamic>> getJob(String jobId) async {
+    try {
+      final response = await http
+          .get(
+            Uri.parse('$baseUrl/jobs/$jobId'),
+            headers: {'Content-Type': 'application/json'},
+          )
+          .timeout(const Duration(seconds: 10));
+
+      if (response.statusCode == 200) {
+        return jsonDecode(response.body) as Map<String, dynamic>;
+      } else {
+        throw Exception('Failed to load job: ${response.statusCode}');
+      }
+    } catch (e, stack) {
+      debugPrint('Get job error: $e\n$stack');
+      throw Exception('Network error: $e');
+    }
+  }
 }
\ No newline at end of file
@@ -0,0 +1,77 @@
+# page_cache.py
+"""
+Persistent cache of extracted page layouts keyed by PDF content hash.
+
+pdfminer layout analysis is by far the slowest part of ingestion, and its
+output does not change when the segmentation or enrichment heuristics do.
+With the layout of every page kept here, reprocess.py rebuilds the articles
+of a PDF without opening it.  Unlike the parse cache this one is not
+evicted: it is what makes re-processing an archive cheap.
+"""
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+
+def get(db: Session, content_hash: str, extractor_version: str) -> Optional[List[Dict]]:
+    """Return the layouts of every page of a PDF, in page order, or None on a miss."""
+    rows = (
+        db.query(models.PageLayout.layout)
+        .filter(models.PageLayout.content_hash == content_hash)
+        .filter(models.PageLayout.extractor_version == extractor_version)
+        .order_by(models.PageLayout.page_number)
+        .all()
+    )
+    if not rows:
+        return None
+    return [json.loads(layout) for (layout,) in rows]
+
+
+def put(db: Session, content_hash: str, extractor_version: str, layouts: List[Dict]) -> None:
+    """Store the layouts of all pages of a PDF, replacing any stored before."""
+    invalidate(db, content_hash, commit=False)
+    db.add_all(
+        models.PageLayout(
+            content_hash=content_hash,
+            extractor_version=extractor_version,
+            page_number=number,
+            layout=json.dumps(layout, separators=(",", ":")),
+        )
+        for number, layout in enumerate(layouts, start=1)
+    )
+    db.commit()
+
+
+def hashes(db: Session, extractor_version: str) -> List[str]:
+    """Content hashes of the PDFs whose pages are cached."""
+    return [
+        content_hash for (content_hash,) in
+        db.query(models.PageLayout.content_hash)
+        .filter(models.PageLayout.extractor_version == extractor_version)
+        .distinct()
+        .all()
+    ]
+
+
+def invalidate(db: Session, content_hash: Optional[str] = None, commit: bool = True) -> int:
+    """Drop the cached pages of one PDF (all extractor versions), or everything."""
+    query = db.query(models.PageLayout)
+    if content_hash is not None:
+        query = query.filter(models.PageLayout.content_hash == content_hash)
+    deleted = query.delete(synchronize_session=False)
+    if commit:
+        db.commit()
+    return deleted
+
+
+def stats(db: Session) -> Dict:
+    pdfs, pages, size = db.query(
+        func.count(func.distinct(models.PageLayout.content_hash)),
+        func.count(models.PageLayout.page_number),
+        func.coalesce(func.sum(func.length(models.PageLayout.layout)), 0),
+    ).one()
+    return {"pdfs": pdfs, "pages": pages, "size_bytes": size}
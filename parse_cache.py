@@ -0,0 +1,98 @@
+# parse_cache.py
+"""
+Persistent cache of parser output keyed by PDF content hash and parser version.
+
+Re-uploads of the same edition (retries, other editors, other filenames) are
+served from here instead of running pdfplumber again.  The cache is bounded
+by the total size of the stored articles; least recently used entries are
+evicted first.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+PARSE_CACHE_MAX_BYTES = int(os.environ.get("PARSE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get(db: Session, content_hash: str, parser_version: str) -> Optional[List[Dict]]:
+    """Return the cached articles for a PDF, or None on a miss."""
+    entry = db.get(models.ParseCache, (content_hash, parser_version))
+    if entry is None:
+        return None
+    entry.hits += 1
+    entry.last_used_at = datetime.now()
+    db.commit()
+    return entry.articles
+
+
+def put(db: Session, content_hash: str, parser_version: str, articles: List[Dict]) -> None:
+    """Store the parser output for a PDF and evict old entries if the cache is too big."""
+    size = len(json.dumps(articles, default=str))
+    if size > PARSE_CACHE_MAX_BYTES:
+        return
+
+    entry = db.get(models.ParseCache, (content_hash, parser_version))
+    if entry is None:
+        entry = models.ParseCache(content_hash=content_hash, parser_version=parser_version, hits=0)
+        db.add(entry)
+    entry.articles = articles
+    entry.size_bytes = size
+    entry.last_used_at = datetime.now()
+    db.commit()
+    evict(db)
+
+
+def evict(db: Session, max_bytes: Optional[int] = None) -> int:
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    max_bytes = PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total = db.query(func.coalesce(func.sum(models.ParseCache.size_bytes), 0)).scalar()
+    if total <= max_bytes:
+        return 0
+
+    evicted = 0
+    for entry in db.query(models.ParseCache).order_by(models.ParseCache.last_used_at).all():
+        if total <= max_bytes:
+            break
+        total -= entry.size_bytes
+        db.delete(entry)
+        evicted += 1
+    db.commit()
+    return evicted
+
+
+def invalidate(db: Session, content_hash: Optional[str] = None) -> int:
+    """Drop the cached output for one PDF (all parser versions), or everything."""
+    query = db.query(models.ParseCache)
+    if content_hash is not None:
+        query = query.filter(models.ParseCache.content_hash == content_hash)
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def stats(db: Session) -> Dict:
+    entries, size, hits = db.query(
+        func.count(models.ParseCache.content_hash),
+        func.coalesce(func.sum(models.ParseCache.size_bytes), 0),
+        func.coalesce(func.sum(models.ParseCache.hits), 0),
+    ).one()
+    return {"entries": entries, "size_bytes": size, "hits": hits, "max_bytes": PARSE_CACHE_MAX_BYTES}
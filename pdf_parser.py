@@ -1,22 +1,22 @@
 # pdf_parser.py
-import pdfplumber
 import os
 
+from enhanced_pdf_parser import iter_page_texts
+
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
     Extract text from PDF file with error handling.
+    Uses PDF_TEXT_BACKEND (see enhanced_pdf_parser).
     """
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
     try:
         text = ''
-        with pdfplumber.open(pdf_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + '\n'
+        for page_text in iter_page_texts(pdf_path):
+            if page_text:
+                text += page_text + '\n'
         return text.strip()
     except Exception as e:
         raise RuntimeError(f"Error extracting text from PDF: {str(e)}")
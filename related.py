@@ -0,0 +1,313 @@
+# related.py
+"""
+Precomputed "related stories" behind /news/{id}/related.
+
+Every article is reduced to a sparse TF-IDF vector of its RELATED_TERMS
+strongest terms, stored as postings (term -> article, weight) in
+term_postings, and the RELATED_TOP_K most similar articles (cosine of the
+vectors) are stored per article in related_articles.  The endpoint is then
+one primary-key lookup.
+
+crud keeps this up to date as articles are inserted: the new articles are
+scored against the postings of their own terms (an inverted-index lookup,
+not a scan of the table), get their neighbour lists, and are merged into
+the lists of those neighbours.  Only the RELATED_POSTINGS_PER_TERM heaviest
+postings of each term are read, through the (term, weight) index, so the
+cost of an insert does not grow with the corpus; an article that shares
+only common terms with a new one can be missed until the next rebuild.
+Document frequencies go up as articles are indexed and down as they are
+forgotten, but stored weights keep the frequencies known at insert time, so
+the index drifts slowly as the corpus grows; rebuild it from scratch with
+
+    python related.py --rebuild
+
+which recomputes every vector with the final document frequencies and
+scores all articles in one pass over an in-memory inverted index (the
+sparse X @ X.T product, row by row).  Migration 0008 runs the rebuild once,
+for the articles stored before the index existed.
+"""
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, select, union_all
+from sqlalchemy.orm import Session
+
+import models, stats
+
+RELATED_TOP_K = int(os.environ.get("RELATED_TOP_K", 10))
+RELATED_TERMS = int(os.environ.get("RELATED_TERMS", 40))          # terms kept per article vector
+RELATED_MAX_DF = float(os.environ.get("RELATED_MAX_DF", 0.05))    # terms in more articles are not scored
+RELATED_MIN_SCORE = float(os.environ.get("RELATED_MIN_SCORE", 0.05))
+RELATED_POSTINGS_PER_TERM = int(os.environ.get("RELATED_POSTINGS_PER_TERM", 100))  # read per term at insert
+
+_WORD = re.compile(r"[^\W\d_]{3,}")
+STOPWORDS = frozenset("""
+    the and for are but not you all any can had her was one our out day get has him his how man new now old
+    see two way who boy did its let put say she too use that with have this will your from they know want been
+    good much some time very when come here just like long make many more only over such take than them well
+    were what which their said there would about after also into most other could these those where while
+    being because before between both each should since through under until upon again against
+""".split())
+
+
+def terms(text: str) -> Counter:
+    """Term counts of a text: lowercased words of 3+ letters, minus stopwords."""
+    return Counter(w for w in _WORD.findall(text.lower()) if w not in STOPWORDS)
+
+
+def vector(counts: Counter, df: Dict[str, int], n_docs: int) -> Dict[str, float]:
+    """L2-normalised TF-IDF weights of the RELATED_TERMS strongest terms."""
+    weights = {
+        term: (1 + math.log(tf)) * (math.log((n_docs + 1) / (df.get(term, 0) + 1)) + 1)
+        for term, tf in counts.items()
+    }
+    top = sorted(weights.items(), key=lambda kv: kv[1], reverse=True)[:RELATED_TERMS]
+    norm = math.sqrt(sum(w * w for _, w in top)) or 1.0
+    return {term: w / norm for term, w in top}
+
+
+def _top(scores: Dict[int, float]) -> List[List]:
+    best = sorted(((s, i) for i, s in scores.items() if s >= RELATED_MIN_SCORE), reverse=True)[:RELATED_TOP_K]
+    return [[i, round(s, 4)] for s, i in best]
+
+
+def _upsert(db: Session):
+    """INSERT .. ON CONFLICT for the current dialect (SQLite and PostgreSQL spell it the same)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert
+
+
+def _add_document_frequencies(db: Session, counts: Iterable[Counter]):
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+    if not df:
+        return
+    stmt = _upsert(db)(models.TermFrequency)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["term"], set_={"df": models.TermFrequency.df + stmt.excluded.df},
+    )
+    db.execute(stmt, [{"term": t, "df": n} for t, n in df.items()])
+
+
+def _remove_document_frequencies(db: Session, counts: Iterable[Counter]):
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+    if not df:
+        return
+    table = models.TermFrequency.__table__
+    db.execute(
+        table.update().where(table.c.term == bindparam("t")).values(df=table.c.df - bindparam("n")),
+        [{"t": t, "n": n} for t, n in df.items()],
+    )
+    db.execute(table.delete().where(table.c.df <= 0))
+
+
+def _document_frequencies(db: Session, term_set: Iterable[str]) -> Dict[str, int]:
+    term_set = list(term_set)
+    df = {}
+    for start in range(0, len(term_set), 500):
+        df.update(
+            db.query(models.TermFrequency.term, models.TermFrequency.df)
+            .filter(models.TermFrequency.term.in_(term_set[start:start + 500]))
+        )
+    return df
+
+
+def _heaviest_postings(db: Session, term_list: List[str]) -> Dict[str, List[Tuple[int, float]]]:
+    """Up to RELATED_POSTINGS_PER_TERM (article_id, weight) postings per term, heaviest first."""
+    table = models.TermPosting.__table__
+    postings = defaultdict(list)
+    # One LIMIT subquery per term; SQLite allows 500 terms in a compound SELECT
+    for start in range(0, len(term_list), 200):
+        parts = [
+            select(table.c.term, table.c.article_id, table.c.weight)
+            .where(table.c.term == t)
+            .order_by(table.c.weight.desc())
+            .limit(RELATED_POSTINGS_PER_TERM)
+            .subquery()
+            for t in term_list[start:start + 200]
+        ]
+        for t, other, w in db.execute(union_all(*(select(part) for part in parts))):
+            postings[t].append((other, w))
+    return postings
+
+
+def index(db: Session, articles: Sequence[Tuple[int, str]]):
+    """
+    Add newly inserted (id, text) articles to the index and to the neighbour
+    lists, in the caller's transaction.
+    """
+    if not articles:
+        return
+    counts = [terms(text) for _, text in articles]
+    _add_document_frequencies(db, counts)
+    n_docs = stats.get_total_articles(db) or 1
+    df = _document_frequencies(db, {t for c in counts for t in c})
+    max_df = max(50, RELATED_MAX_DF * n_docs)
+
+    vectors = {article_id: vector(c, df, n_docs) for (article_id, _), c in zip(articles, counts)}
+
+    # Score against the heaviest existing postings of the new articles' terms,
+    # and against each other
+    scored_terms = list({t for vec in vectors.values() for t in vec if df.get(t, 0) <= max_df})
+    postings = _heaviest_postings(db, scored_terms)
+    for article_id, vec in vectors.items():
+        for t, w in vec.items():
+            if df.get(t, 0) <= max_df:
+                postings[t].append((article_id, w))
+    db.execute(models.TermPosting.__table__.insert(), [
+        {"term": t, "article_id": article_id, "weight": w}
+        for article_id, vec in vectors.items() for t, w in vec.items()
+    ])
+
+    neighbours = {}
+    for article_id, vec in vectors.items():
+        scores = defaultdict(float)
+        for t, w in vec.items():
+            for other, w2 in postings.get(t, ()):
+                if other != article_id:
+                    scores[other] += w * w2
+        neighbours[article_id] = _top(scores)
+    db.execute(models.RelatedArticles.__table__.insert(), [
+        {"article_id": article_id, "neighbours": top} for article_id, top in neighbours.items()
+    ])
+
+    # The new articles may now be among the closest of their own neighbours
+    updates = defaultdict(dict)
+    for article_id, top in neighbours.items():
+        for other, score in top:
+            if other not in vectors:
+                updates[other][article_id] = score
+    _merge_neighbours(db, updates)
+
+
+def _merge_neighbours(db: Session, updates: Dict[int, Dict[int, float]]):
+    table = models.RelatedArticles.__table__
+    ids = list(updates)
+    changed = []
+    for start in range(0, len(ids), 500):
+        for article_id, current in db.execute(
+            select(table.c.article_id, table.c.neighbours).where(table.c.article_id.in_(ids[start:start + 500]))
+        ):
+            scores = {i: s for i, s in current}
+            scores.update(updates[article_id])
+            top = _top(scores)
+            if top != current:
+                changed.append({"id": article_id, "neighbours": top})
+    if changed:
+        db.execute(table.update().where(table.c.article_id == bindparam("id")), changed)
+
+
+def forget(db: Session, article_ids: Iterable[int]):
+    """
+    Drop articles from the index and lower the document frequencies of
+    their terms, in the caller's transaction. Call it before the rows are
+    deleted or rewritten: the frequencies come from their stored text.
+    Other articles' lists still name them until the next rebuild;
+    get_related() leaves them out.
+    """
+    article_ids = list(article_ids)
+    for start in range(0, len(article_ids), 500):
+        chunk = article_ids[start:start + 500]
+        indexed = (
+            db.query(models.Article.title, models.Article.content)
+            .join(models.RelatedArticles, models.RelatedArticles.article_id == models.Article.id)
+            .filter(models.Article.id.in_(chunk))
+        )
+        _remove_document_frequencies(db, [terms(f"{title}\n{content or ''}") for title, content in indexed])
+        db.query(models.TermPosting).filter(models.TermPosting.article_id.in_(chunk)).delete(synchronize_session=False)
+        (
+            db.query(models.RelatedArticles)
+            .filter(models.RelatedArticles.article_id.in_(chunk))
+            .delete(synchronize_session=False)
+        )
+
+
+def get_related(db: Session, article_id: int, fields: Optional[Iterable[str]] = None) -> Optional[List[Tuple[models.Article, float]]]:
+    """(article, score) of the stored neighbours, closest first; None when the article is not indexed."""
+    import crud
+
+    row = db.get(models.RelatedArticles, article_id)
+    if row is None:
+        return None
+    scores = dict((i, s) for i, s in row.neighbours)
+    if not scores:
+        return []
+    articles = crud._articles_query(db, fields).filter(models.Article.id.in_(scores)).all()
+    return sorted(((a, scores[a.id]) for a in articles), key=lambda pair: pair[1], reverse=True)
+
+
+def rebuild(db: Session, batch_size: int = 1000) -> Dict[str, int]:
+    """Recompute document frequencies, vectors and neighbour lists of every article."""
+    counts = {}
+    df = Counter()
+    for article_id, title, content in (
+        db.query(models.Article.id, models.Article.title, models.Article.content).yield_per(batch_size)
+    ):
+        c = terms(f"{title}\n{content or ''}")
+        counts[article_id] = c
+        df.update(c.keys())
+    n_docs = len(counts) or 1
+    max_df = max(50, RELATED_MAX_DF * n_docs)
+
+    vectors = {article_id: vector(c, df, n_docs) for article_id, c in counts.items()}
+    del counts
+    inverted = defaultdict(list)
+    for article_id, vec in vectors.items():
+        for t, w in vec.items():
+            if df[t] <= max_df:
+                inverted[t].append((article_id, w))
+
+    db.query(models.TermFrequency).delete(synchronize_session=False)
+    db.query(models.TermPosting).delete(synchronize_session=False)
+    db.query(models.RelatedArticles).delete(synchronize_session=False)
+    df_rows = [{"term": t, "df": n} for t, n in df.items()]
+    for start in range(0, len(df_rows), batch_size * 10):
+        db.execute(models.TermFrequency.__table__.insert(), df_rows[start:start + batch_size * 10])
+
+    postings = []
+    related = []
+    for article_id, vec in vectors.items():
+        scores = defaultdict(float)
+        for t, w in vec.items():
+            postings.append({"term": t, "article_id": article_id, "weight": w})
+            for other, w2 in inverted.get(t, ()):
+                scores[other] += w * w2
+        scores.pop(article_id, None)
+        related.append({"article_id": article_id, "neighbours": _top(scores)})
+        if len(related) >= batch_size:
+            db.execute(models.TermPosting.__table__.insert(), postings)
+            db.execute(models.RelatedArticles.__table__.insert(), related)
+            postings, related = [], []
+    if related:
+        db.execute(models.TermPosting.__table__.insert(), postings)
+        db.execute(models.RelatedArticles.__table__.insert(), related)
+    db.commit()
+    return {"articles": len(vectors), "terms": len(df)}
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from database import SessionLocal, init_db
+
+    if "--rebuild" not in sys.argv[1:]:
+        print("usage: python related.py --rebuild")
+        sys.exit(2)
+    init_db()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        result = rebuild(db)
+        print(f"Indexed {result['articles']} articles ({result['terms']} terms) "
+              f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
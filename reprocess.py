@@ -0,0 +1,180 @@
+# reprocess.py
+"""
+Rebuild the articles of ingested PDFs from their cached page layouts.
+
+After a change to the segmentation or enrichment heuristics
+(enhanced_pdf_parser, utils), the articles of every PDF whose pages are in
+page_cache can be rebuilt without opening the PDF again: only segmentation
+and enrichment run, which takes milliseconds per edition.  The articles of
+each PDF are replaced in one transaction.  A new article whose title (or
+else position) matches an old one is written over it, keeping its id and
+created_at; the rest are deleted or inserted, the inserted ones dated like
+the edition, so reprocessing never moves an old edition to the top of the
+feed.
+
+    python reprocess.py --all
+    python reprocess.py --source-file edition.pdf [--mode text]
+    python reprocess.py --hash <sha256>
+
+POST /reprocess does the same from the API, at most REPROCESS_MAX_PDFS per
+request; pass the returned "next" back as ?after= to continue.
+"""
+import logging
+import os
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import crud, models, page_cache, parse_cache
+from jobs import prepare_article
+
+logger = logging.getLogger(__name__)
+
+REPROCESS_MAX_PDFS = int(os.environ.get("REPROCESS_MAX_PDFS", 20))  # per /reprocess request
+
+
+def _filenames(db: Session, content_hashes: List[str]) -> Dict[str, str]:
+    """Name each PDF was last ingested under, from its jobs or else its articles."""
+    names = {}
+    for content_hash, name in (
+        db.query(models.Article.source_hash, models.Article.source_file)
+        .filter(models.Article.source_hash.in_(content_hashes))
+        .distinct()
+    ):
+        names[content_hash] = name
+    for content_hash, name in (
+        db.query(models.IngestJob.content_hash, models.IngestJob.filename)
+        .filter(models.IngestJob.content_hash.in_(content_hashes))
+        .order_by(models.IngestJob.created_at)
+    ):
+        names[content_hash] = name
+    return names
+
+
+def find_sources(db: Session, source_file: Optional[str] = None,
+                 content_hash: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(content_hash, filename) of the cached PDFs matching the filters; all of them without filters."""
+    from enhanced_pdf_parser import EXTRACTOR_VERSION
+
+    cached = page_cache.hashes(db, EXTRACTOR_VERSION)
+    if content_hash is not None:
+        cached = [h for h in cached if h == content_hash]
+    names = _filenames(db, cached)
+    sources = [(h, names.get(h) or f"{h}.pdf") for h in sorted(cached)]
+    if source_file is not None:
+        matching = {
+            h for (h,) in db.query(models.IngestJob.content_hash).filter(models.IngestJob.filename == source_file)
+        } | {
+            h for (h,) in db.query(models.Article.source_hash).filter(models.Article.source_file == source_file)
+        }
+        sources = [(h, name) for h, name in sources if h in matching]
+    return sources
+
+
+def match_articles(old: List[Tuple[int, str]], rows: List[Dict]) -> Dict[int, int]:
+    """
+    Pair new rows with old (id, title) articles, both in page order:
+    {row index: old id}. Equal titles pair first, in order; the rows left
+    take the unpaired old article at the same position.
+    """
+    by_title = defaultdict(deque)
+    for article_id, title in old:
+        by_title[title].append(article_id)
+    matched = {}
+    for i, row in enumerate(rows):
+        if by_title.get(row["title"]):
+            matched[i] = by_title[row["title"]].popleft()
+    used = set(matched.values())
+    for i in range(min(len(rows), len(old))):
+        if i not in matched and old[i][0] not in used:
+            matched[i] = old[i][0]
+            used.add(old[i][0])
+    return matched
+
+
+def reprocess_pdf(db: Session, content_hash: str, source_file: str, mode: Optional[str] = None) -> Dict:
+    """Re-segment one cached PDF and replace its articles."""
+    from enhanced_pdf_parser import segment_pages, EXTRACTOR_VERSION, PARSER_VERSION
+
+    layouts = page_cache.get(db, content_hash, EXTRACTOR_VERSION)
+    if layouts is None:
+        return {"content_hash": content_hash, "source_file": source_file, "error": "pages not cached"}
+
+    parsed = list(segment_pages(layouts, source_file, mode))
+    rows = [row for row in (prepare_article(a, i, source_file) for i, a in enumerate(parsed)) if row]
+    old = (
+        db.query(models.Article.id, models.Article.title, models.Article.created_at)
+        .filter(models.Article.source_hash == content_hash)
+        .order_by(models.Article.id)
+        .all()
+    )
+    matched = match_articles([(article_id, title) for article_id, title, _ in old], rows)
+    kept = set(matched.values())
+    edition_date = min((created for _, _, created in old if created is not None), default=None)
+
+    updated = crud.update_articles_bulk(db, {matched[i]: rows[i] for i in matched}, commit=False)
+    deleted = crud.delete_articles_by_ids(db, [article_id for article_id, _, _ in old if article_id not in kept],
+                                          commit=False)
+    result = crud.create_articles_bulk(
+        db, [row for i, row in enumerate(rows) if i not in matched], commit=False,
+        source_hash=content_hash, deduplicate=True, created_at=edition_date,
+    )
+    db.commit()
+    if mode is None:
+        parse_cache.put(db, content_hash, PARSER_VERSION, parsed)
+
+    saved = sum(1 for article_id in result["ids"] if article_id is not None)
+    logger.info("Reprocessed %s: %d articles updated, %d deleted, %d inserted",
+                source_file, updated, deleted, saved)
+    return {
+        "content_hash": content_hash,
+        "source_file": source_file,
+        "pages": len(layouts),
+        "articles_updated": updated,
+        "articles_deleted": deleted,
+        "articles_saved": saved,
+        "duplicates": len(result["duplicates"]),
+    }
+
+
+def reprocess(db: Session, source_file: Optional[str] = None, content_hash: Optional[str] = None,
+              mode: Optional[str] = None, limit: Optional[int] = None,
+              after: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Reprocess the cached PDFs matching the filters, in content hash order,
+    one transaction each: at most limit of them, starting after the hash
+    `after`. Returns one result per PDF and the hash to continue after
+    (None when none are left).
+    """
+    sources = [(h, name) for h, name in find_sources(db, source_file, content_hash) if after is None or h > after]
+    todo = sources if limit is None else sources[:limit]
+    results = [reprocess_pdf(db, h, name, mode) for h, name in todo]
+    return results, (todo[-1][0] if len(todo) < len(sources) else None)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import logs
+    from database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Rebuild articles from cached page layouts")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--all", action="store_true", help="every PDF with cached pages")
+    target.add_argument("--source-file", help="PDFs ingested under this filename")
+    target.add_argument("--hash", help="the PDF with this sha256")
+    parser.add_argument("--mode", choices=["layout", "text"], help="segmentation mode (default PDF_SEGMENTATION)")
+    args = parser.parse_args()
+
+    logs.setup_logging()
+    init_db()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        results, _ = reprocess(db, args.source_file, args.hash, args.mode)
+        for r in results:
+            print(r)
+        print(f"Reprocessed {len(results)} PDF(s) in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
@@ -0,0 +1,155 @@
+# response_cache.py
+"""
+In-process TTL + LRU cache for GET responses of the read endpoints.
+
+Entries are keyed by path and query string and tagged with the data
+generation (see crud.bump_generation) they were built from.  Writes made by
+any process bump the generation in the database; each process re-reads it
+at most every GENERATION_POLL_INTERVAL seconds, and immediately after a
+write request it handled itself.
+
+Every cached response carries an ETag, so a client revalidating with
+If-None-Match gets a 304 straight from the cache without any query.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+
+import crud, metrics
+from database import ReadSessionLocal
+
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 30))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 512))
+GENERATION_POLL_INTERVAL = float(os.environ.get("GENERATION_POLL_INTERVAL", 1.0))
+
+CACHEABLE_PREFIXES = ("/news/", "/categories/", "/stats/", "/search/")
+
+# Response headers worth replaying from the cache
+_KEPT_HEADERS = ("content-type", "x-next-cursor")
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, Tuple[int, float, bytes, str, Dict[str, str]]]" = OrderedDict()
+_generation = 0
+_generation_checked_at = 0.0
+
+
+def current_generation() -> int:
+    """Latest data generation, read from the database at most every poll interval."""
+    global _generation, _generation_checked_at
+    now = time.monotonic()
+    if now - _generation_checked_at >= GENERATION_POLL_INTERVAL:
+        db = ReadSessionLocal()
+        try:
+            _generation = crud.get_generation(db)
+        finally:
+            db.close()
+        _generation_checked_at = now
+    return _generation
+
+
+async def _generation_for_request() -> int:
+    """current_generation() for the async middleware: the database read, when due, runs in a worker thread."""
+    if time.monotonic() - _generation_checked_at < GENERATION_POLL_INTERVAL:
+        return _generation
+    # Under write contention the read can wait up to busy_timeout; never on the event loop
+    return await run_in_threadpool(current_generation)
+
+
+def expire_generation():
+    """Force the next lookup to re-read the generation (after a local write)."""
+    global _generation_checked_at
+    _generation_checked_at = 0.0
+
+
+def make_etag(body: bytes) -> str:
+    # Weak: the same tag covers the gzip and identity encodings of the body
+    return 'W/"%s"' % hashlib.sha1(body).hexdigest()[:20]
+
+
+def get(key: str, generation: int):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        entry_generation, expires_at = entry[0], entry[1]
+        if entry_generation != generation or expires_at < time.monotonic():
+            del _entries[key]
+            return None
+        _entries.move_to_end(key)
+        return entry
+
+
+def put(key: str, generation: int, body: bytes, etag: str, headers: Dict[str, str]):
+    with _lock:
+        _entries[key] = (generation, time.monotonic() + RESPONSE_CACHE_TTL, body, etag, headers)
+        _entries.move_to_end(key)
+        while len(_entries) > RESPONSE_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> Dict:
+    with _lock:
+        return {
+            "entries": len(_entries),
+            "max_entries": RESPONSE_CACHE_MAX_ENTRIES,
+            "ttl_seconds": RESPONSE_CACHE_TTL,
+            "generation": _generation,
+        }
+
+
+def _cache_key(request: Request) -> str:
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    return f"{request.url.path}?{query}"
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+
+async def middleware(request: Request, call_next):
+    """Serve cacheable GETs from the cache and answer conditional requests with 304."""
+    if request.method != "GET" or not request.url.path.startswith(CACHEABLE_PREFIXES):
+        response = await call_next(request)
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            expire_generation()
+        return response
+
+    key = _cache_key(request)
+    generation = await _generation_for_request()
+    entry = get(key, generation)
+    if entry is not None:
+        _, _, body, etag, headers = entry
+        if _not_modified(request, etag):
+            metrics.RESPONSE_CACHE_REQUESTS.inc(result="not_modified")
+            return Response(status_code=304, headers={"ETag": etag})
+        metrics.RESPONSE_CACHE_REQUESTS.inc(result="hit")
+        return Response(content=body, status_code=200, headers={**headers, "ETag": etag, "X-Cache": "HIT"})
+
+    metrics.RESPONSE_CACHE_REQUESTS.inc(result="miss")
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = make_etag(body)
+    headers = {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS}
+    put(key, generation, body, etag, headers)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, status_code=200, headers={**headers, "ETag": etag, "X-Cache": "MISS"})
@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class ArticleBase(BaseModel):
@@ -22,3 +22,72 @@ class ArticleOut(ArticleBase):
 
     class Config:
         from_attributes = True   # replaces orm_mode in Pydantic v2
+
+
+class ArticleListOut(BaseModel):
+    """Feed entry: everything but the full content (fetch /news/{id} for that)."""
+    id: int
+    title: str
+    summary: Optional[str] = None
+    category: Optional[str] = None
+    source_file: Optional[str] = None
+    published_date: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class RelatedArticleOut(ArticleListOut):
+    score: float                              # cosine similarity of the TF-IDF vectors
+
+
+class ArticleSearchListOut(ArticleListOut):
+    rank: Optional[float] = None
+    title_highlight: Optional[str] = None
+    snippet: Optional[str] = None
+
+
+class ArticleSearchOut(ArticleOut):
+    rank: Optional[float] = None              # bm25 score, lower is better
+    title_highlight: Optional[str] = None     # title with <mark> around matched terms
+    snippet: Optional[str] = None             # best matching fragment of the content
+
+
+class DuplicateOut(BaseModel):
+    """An ingested article that was not stored because it near-duplicates another."""
+    title: Optional[str] = None
+    source_file: Optional[str] = None         # edition the copy appeared in
+    similarity: float                         # estimated Jaccard similarity of the content
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SyncOut(BaseModel):
+    """Changes after a sync token; pass `token` as ?since= next time."""
+    articles: List[ArticleListOut]            # inserted since the token, newest first
+    deleted: List[int]                        # ids of articles deleted since the token
+    token: int
+    has_more: bool                            # call again right away with the new token
+
+
+class JobOut(BaseModel):
+    id: str
+    filename: str
+    content_hash: Optional[str] = None
+    state: str                                # queued, running, done, failed
+    stage: Optional[str] = None               # parse, save
+    progress: Optional[Dict[str, Any]] = None
+    articles_found: int = 0
+    articles_saved: int = 0
+    articles_skipped: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
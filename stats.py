@@ -0,0 +1,130 @@
+# stats.py
+"""
+Aggregates behind /stats/ and /categories/.
+
+Totals, per-category counts and per-hour ingest buckets are kept in small
+tables that crud updates in the same transaction as every article insert and
+delete, so reading statistics never scans the articles table.  If they ever
+drift (rows changed outside crud), rebuild them with:
+
+    python stats.py --repair
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import models
+
+TOTAL_ARTICLES = "total_articles"
+
+
+def _hour(created_at: Optional[datetime]) -> datetime:
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at.replace(minute=0, second=0, microsecond=0)
+
+
+def _add(db: Session, model, key_column, key, value_column: str, delta: int):
+    """Add delta to one counter row, creating it if needed."""
+    updated = (
+        db.query(model)
+        .filter(key_column == key)
+        .update({value_column: getattr(model, value_column) + delta}, synchronize_session=False)
+    )
+    if not updated:
+        db.add(model(**{key_column.key: key, value_column: delta}))
+        db.flush()
+
+
+def _apply(db: Session, rows: Iterable[Tuple[Optional[str], Optional[datetime]]], sign: int):
+    rows = list(rows)
+    if not rows:
+        return
+    categories = Counter(category for category, _ in rows if category)
+    hours = Counter(_hour(created_at) for _, created_at in rows)
+
+    _add(db, models.StatTotal, models.StatTotal.name, TOTAL_ARTICLES, "value", sign * len(rows))
+    for category, n in categories.items():
+        _add(db, models.CategoryCount, models.CategoryCount.category, category, "count", sign * n)
+    for hour, n in hours.items():
+        _add(db, models.HourlyIngest, models.HourlyIngest.hour, hour, "count", sign * n)
+
+
+def record_inserted(db: Session, rows: Iterable[Tuple[Optional[str], Optional[datetime]]]):
+    """Count newly inserted articles, given as (category, created_at) pairs."""
+    _apply(db, rows, 1)
+
+
+def record_deleted(db: Session, rows: Iterable[Tuple[Optional[str], Optional[datetime]]]):
+    """Uncount deleted articles, given as (category, created_at) pairs."""
+    _apply(db, rows, -1)
+
+
+def get_total_articles(db: Session) -> int:
+    return db.query(models.StatTotal.value).filter(models.StatTotal.name == TOTAL_ARTICLES).scalar() or 0
+
+
+def get_category_counts(db: Session) -> List[Tuple[str, int]]:
+    return (
+        db.query(models.CategoryCount.category, models.CategoryCount.count)
+        .filter(models.CategoryCount.count > 0)
+        .order_by(models.CategoryCount.count.desc())
+        .all()
+    )
+
+
+def get_recent_count(db: Session, hours: int = 24) -> int:
+    """Articles ingested in the last `hours` hours, at one-hour granularity."""
+    since = _hour(datetime.now(timezone.utc) - timedelta(hours=hours))
+    return (
+        db.query(func.coalesce(func.sum(models.HourlyIngest.count), 0))
+        .filter(models.HourlyIngest.hour >= since)
+        .scalar()
+    )
+
+
+def rebuild(db: Session) -> Dict:
+    """Recompute every aggregate from the articles table."""
+    db.query(models.StatTotal).delete(synchronize_session=False)
+    db.query(models.CategoryCount).delete(synchronize_session=False)
+    db.query(models.HourlyIngest).delete(synchronize_session=False)
+
+    total = db.query(func.count(models.Article.id)).scalar()
+    db.add(models.StatTotal(name=TOTAL_ARTICLES, value=total))
+
+    for category, n in (
+        db.query(models.Article.category, func.count(models.Article.id))
+        .filter(models.Article.category.isnot(None))
+        .group_by(models.Article.category)
+    ):
+        db.add(models.CategoryCount(category=category, count=n))
+
+    hours = Counter(
+        _hour(created_at)
+        for (created_at,) in db.query(models.Article.created_at).yield_per(1000)
+    )
+    for hour, n in hours.items():
+        db.add(models.HourlyIngest(hour=hour, count=n))
+
+    db.commit()
+    return {"total_articles": total, "hour_buckets": len(hours)}
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal, init_db
+
+    if "--repair" not in sys.argv[1:]:
+        print("usage: python stats.py --repair")
+        sys.exit(2)
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt statistics: {rebuild(db)}")
+    finally:
+        db.close()
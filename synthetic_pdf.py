@@ -0,0 +1,248 @@
+# synthetic_pdf.py
+"""
+Synthetic multi-column newspaper PDFs for benchmarks.
+
+Writes plain PDF 1.4 by hand (standard Helvetica fonts, no embedded fonts
+or images), so no PDF library is needed.  Every page has N columns of
+articles: a bold headline, a byline, a dateline and body text built from
+category vocabulary, so categorization and date extraction have something
+to find.  The same seed always gives the same file.
+
+    python synthetic_pdf.py edition.pdf --pages 8 --articles-per-page 6 --columns 4
+"""
+import random
+from typing import Dict, List, Tuple
+
+PAGE_WIDTH = 612   # US Letter, points
+PAGE_HEIGHT = 792
+MARGIN = 36
+GUTTER = 12
+HEADLINE_SIZE = 15
+BODY_SIZE = 9
+BYLINE_SIZE = 8
+LEADING = 1.25     # line height / font size
+CHAR_WIDTH = 0.56  # Helvetica glyph width / font size, generous so lines stay inside their column
+BOLD_CHAR_WIDTH = 0.62
+
+TOPICS = {
+    "sports": {
+        "subjects": ["The home side", "The national team", "The club captain", "The young striker", "The coach"],
+        "verbs": ["won", "lost", "drew", "dominated", "rescued"],
+        "objects": ["the league match", "the cricket final", "the tournament opener", "a tense football game",
+                    "the cup semi-final"],
+        "extras": ["with a late goal", "after a record score", "in front of a full stadium",
+                   "despite an injury to a key player"],
+        "headlines": ["Late Goal Settles Derby", "Captain Leads Comeback Win", "League Leaders Slip Again",
+                      "Cricket Final Goes To The Wire", "Young Player Shines In Tournament"],
+    },
+    "politics": {
+        "subjects": ["The minister", "The president", "The opposition party", "A senior senator",
+                     "The government"],
+        "verbs": ["announced", "defended", "rejected", "proposed", "delayed"],
+        "objects": ["a new policy on housing", "the election timetable", "the parliament budget debate",
+                    "reforms to the congress committees", "a vote on the health bill"],
+        "extras": ["during a press conference", "after a heated session", "ahead of the election",
+                   "in a statement on Monday"],
+        "headlines": ["Minister Defends Budget Plan", "Parliament Delays Key Vote", "Opposition Demands Inquiry",
+                      "President Signs Housing Policy", "Election Date Sparks Debate"],
+    },
+    "business": {
+        "subjects": ["The company", "Investors", "The central bank", "Local retailers", "The stock market"],
+        "verbs": ["reported", "welcomed", "warned about", "reacted to", "forecast"],
+        "objects": ["strong quarter revenue", "falling shares", "a slowing economy", "higher finance costs",
+                    "the market rally"],
+        "extras": ["as prices rose", "despite weak demand", "after the earnings call", "for the second quarter"],
+        "headlines": ["Shares Rally On Strong Revenue", "Economy Shows Signs Of Slowing",
+                      "Company Reports Record Quarter", "Market Braces For Rate Decision",
+                      "Retailers Warn Of Weak Demand"],
+    },
+    "technology": {
+        "subjects": ["The startup", "A software company", "Researchers", "The device maker", "Cyber experts"],
+        "verbs": ["launched", "tested", "unveiled", "patched", "released"],
+        "objects": ["a new AI assistant", "an app for farmers", "a low-cost gadget", "a security update",
+                    "open software tools"],
+        "extras": ["to wide interest", "after months of testing", "for schools and clinics",
+                   "amid a wave of cyber attacks"],
+        "headlines": ["Startup Unveils AI Assistant", "New App Helps Farmers", "Cyber Attack Hits Local Firms",
+                      "Gadget Maker Cuts Prices", "Software Update Fixes Flaws"],
+    },
+    "entertainment": {
+        "subjects": ["The actor", "The film festival", "A popular singer", "The director", "The celebrity couple"],
+        "verbs": ["premiered", "celebrated", "announced", "cancelled", "praised"],
+        "objects": ["a new movie", "the festival lineup", "a music tour", "the film awards", "a charity song"],
+        "extras": ["to a packed hall", "after years of work", "on opening night", "with fans across the city"],
+        "headlines": ["Festival Opens With Premiere", "Singer Announces Farewell Tour",
+                      "Director Wins Top Film Award", "Actress Returns To The Stage", "Music Week Draws Crowds"],
+    },
+    "health": {
+        "subjects": ["The hospital", "Doctors", "Health officials", "The vaccine team", "Nurses"],
+        "verbs": ["reported", "expanded", "warned about", "started", "completed"],
+        "objects": ["a rise in disease cases", "the vaccine programme", "new covid measures",
+                    "free health checks", "a hospital wing"],
+        "extras": ["across the district", "for older patients", "this winter", "after a funding boost"],
+        "headlines": ["Hospital Opens New Wing", "Vaccine Drive Reaches Villages", "Doctors Warn Of Flu Season",
+                      "Health Checks Offered Free", "Disease Cases Fall Sharply"],
+    },
+}
+
+FIRST_NAMES = ["Asha", "Ravi", "Maria", "John", "Fatima", "Chen", "Olu", "Sara", "Vikram", "Elena"]
+LAST_NAMES = ["Sharma", "Okafor", "Silva", "Khan", "Novak", "Mensah", "Patel", "Garcia", "Ito", "Brown"]
+CITIES = ["CHENNAI", "LAGOS", "LIMA", "DELHI", "NAIROBI", "MUMBAI", "ACCRA", "PUNE"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September",
+          "October", "November", "December"]
+
+
+def _sentence(rng: random.Random, topic: Dict) -> str:
+    return "%s %s %s %s." % (
+        rng.choice(topic["subjects"]),
+        rng.choice(topic["verbs"]),
+        rng.choice(topic["objects"]),
+        rng.choice(topic["extras"]),
+    )
+
+
+def _wrap(text: str, size: float, width: float, char_width: float = CHAR_WIDTH) -> List[str]:
+    max_chars = max(8, int(width / (size * char_width)))
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > max_chars:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_article(rng: random.Random, body_lines: int, column_width: float) -> Dict:
+    """One article: category, headline, byline, date and enough body text for body_lines lines."""
+    category = rng.choice(sorted(TOPICS))
+    topic = TOPICS[category]
+    date = f"{rng.randint(1, 28)} {rng.choice(MONTHS)} {rng.randint(2019, 2025)}"
+    byline = f"By {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    body = f"{rng.choice(CITIES)}, {date}: "
+    while len(_wrap(body, BODY_SIZE, column_width)) < body_lines:
+        body += _sentence(rng, topic) + " "
+    return {
+        "category": category,
+        "title": rng.choice(topic["headlines"]),
+        "byline": byline,
+        "date": date,
+        "body": body.strip(),
+    }
+
+
+def _layout_page(articles: List[Dict], columns: int) -> Tuple[bytes, List[Dict]]:
+    """Content stream for one page: articles flow down the columns, left to right."""
+    column_width = (PAGE_WIDTH - 2 * MARGIN - (columns - 1) * GUTTER) / columns
+    top = PAGE_HEIGHT - MARGIN
+    ops = []
+    col, y = 0, top
+    placed = []
+
+    def place(text: str, font: str, size: float):
+        nonlocal col, y
+        step = size * LEADING
+        if y - step < MARGIN:
+            col, y = col + 1, top
+            if col >= columns:
+                return False
+        y -= step
+        x = MARGIN + col * (column_width + GUTTER)
+        ops.append(f"BT /{font} {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET")
+        return True
+
+    for article in articles:
+        if col >= columns:
+            break
+        lines = [(line, "F2", HEADLINE_SIZE)
+                 for line in _wrap(article["title"], HEADLINE_SIZE, column_width, BOLD_CHAR_WIDTH)]
+        lines.append((article["byline"], "F1", BYLINE_SIZE))
+        lines += [(line, "F1", BODY_SIZE) for line in _wrap(article["body"], BODY_SIZE, column_width)]
+        complete = all(place(text, font, size) for text, font, size in lines)
+        placed.append({**article, "complete": complete})
+        y -= BODY_SIZE  # space between articles
+
+    return "\n".join(ops).encode("latin-1"), placed
+
+
+def write_newspaper_pdf(
+    path: str,
+    pages: int = 4,
+    articles_per_page: int = 6,
+    columns: int = 4,
+    seed: int = 0,
+) -> List[Dict]:
+    """
+    Write a synthetic edition to path. Returns the articles placed on each
+    page (category, title, byline, date, body, page, and complete: False
+    when the page ran out before the end of the body), the ground truth for
+    segmentation checks.
+    """
+    rng = random.Random(seed)
+    column_width = (PAGE_WIDTH - 2 * MARGIN - (columns - 1) * GUTTER) / columns
+    lines_per_column = int((PAGE_HEIGHT - 2 * MARGIN) / (BODY_SIZE * LEADING))
+    # Body lines per article so that the articles of a page roughly fill it
+    body_lines = max(4, columns * lines_per_column // articles_per_page - 5)
+
+    streams, manifest = [], []
+    for page in range(pages):
+        articles = [make_article(rng, body_lines, column_width) for _ in range(articles_per_page)]
+        stream, placed = _layout_page(articles, columns)
+        streams.append(stream)
+        manifest += [{**a, "page": page + 1} for a in placed]
+
+    # Objects: 1 catalog, 2 pages, 3-4 fonts, then (page, contents) pairs
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for stream in streams:
+        page_num = len(objects) + 1
+        kids.append(f"{page_num} 0 R")
+        objects.append(
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_num + 1} 0 R >>"
+            ).encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic newspaper PDF")
+    parser.add_argument("path")
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--articles-per-page", type=int, default=6)
+    parser.add_argument("--columns", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    placed = write_newspaper_pdf(args.path, args.pages, args.articles_per_page, args.columns, args.seed)
+    print(f"Wrote {args.path}: {args.pages} pages, {len(placed)} articles")
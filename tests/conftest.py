@@ -0,0 +1,51 @@
+# tests/conftest.py
+"""
+The API under test runs against a fresh SQLite database in a temporary
+directory, which is also the working directory (uploads/ is relative).
+DATABASE_URL has to be set before database.py is first imported.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix="news-tests-")
+os.chdir(_workdir)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'news.db')}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ["APP_ROLE"] = "all"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    from database import init_db
+
+    init_db()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # No lifespan: the tests do not need ingest workers
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def post_article(client):
+    """POST /news/ and return the created article."""
+    def post(title, category, content=None):
+        response = client.post("/news/", json={
+            "title": title,
+            "category": category,
+            "content": content or f"{title}. " * 20,
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return post
@@ -0,0 +1,124 @@
+# tests/test_api.py
+"""API behaviour that clients rely on: cursor pages, cache revalidation, /sync."""
+
+
+def test_cursor_pages_cover_category_once_in_feed_order(client, post_article):
+    ids = [post_article(f"Pagination article {i}", "pagination")["id"] for i in range(5)]
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/categories/pagination", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        seen += [a["id"] for a in page]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    # Newest first; created_at ties are broken by id
+    assert seen == sorted(ids, reverse=True)
+
+
+def test_cursor_page_is_stable_when_articles_are_added(client, post_article):
+    for i in range(3):
+        post_article(f"Stable page article {i}", "stable")
+    first = client.get("/news/", params={"category": "stable", "limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+
+    post_article("Stable page newcomer", "stable")
+    second = client.get("/news/", params={"category": "stable", "limit": 2, "cursor": cursor})
+
+    first_ids = [a["id"] for a in first.json()]
+    second_ids = [a["id"] for a in second.json()]
+    assert len(second_ids) == 1
+    assert not set(first_ids) & set(second_ids)
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/news/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_write_invalidates_cached_responses(client, post_article):
+    post_article("Cached article", "cached")
+    first = client.get("/news/", params={"category": "cached"})
+    etag = first.headers["ETag"]
+    assert client.get("/news/", params={"category": "cached"}, headers={"If-None-Match": etag}).status_code == 304
+    generation = client.get("/cache/response/").json()["generation"]
+
+    created = post_article("Cached article, later", "cached")
+
+    response = client.get("/news/", params={"category": "cached"}, headers={"If-None-Match": etag})
+    assert client.get("/cache/response/").json()["generation"] > generation
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert created["id"] in [a["id"] for a in response.json()]
+
+
+def test_sync_reports_inserts_and_deletes(client, post_article):
+    kept = post_article("Sync article kept", "sync")
+    removed = post_article("Sync article removed", "sync")
+    token = client.get("/sync").json()["token"]
+
+    added = post_article("Sync article added", "sync")
+    assert client.delete(f"/news/{removed['id']}").status_code == 200
+
+    changes = client.get("/sync", params={"since": token}).json()
+    assert [a["id"] for a in changes["articles"]] == [added["id"]]
+    assert changes["deleted"] == [removed["id"]]
+    assert changes["token"] > token
+    assert not changes["has_more"]
+    assert kept["id"] not in changes["deleted"]
+
+    # Nothing new after the returned token
+    again = client.get("/sync", params={"since": changes["token"]}).json()
+    assert again["articles"] == [] and again["deleted"] == []
+
+
+def test_sync_token_from_another_database_is_gone(client):
+    token = client.get("/sync").json()["token"]
+    assert client.get("/sync", params={"since": token + 1000}).status_code == 410
+
+
+def test_cache_reads_the_generation_off_the_event_loop(client, monkeypatch):
+    import asyncio
+    import crud, response_cache
+
+    on_loop = []
+    real = crud.get_generation
+
+    def observed(db):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return real(db)
+
+    monkeypatch.setattr(crud, "get_generation", observed)
+    response_cache.expire_generation()
+    assert client.get("/news/").status_code == 200
+    assert on_loop == [False]
+
+
+def test_search_pages_carry_their_own_highlights(client, post_article):
+    for i in range(3):
+        post_article(f"Aurora report {i}", "search", content=f"Skywatchers saw the aurora borealis, night {i}. " * 5)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"q": "aurora", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/search/", params=params)
+        assert response.status_code == 200
+        for hit in response.json():
+            assert "<mark>" in hit["title_highlight"] and "<mark>" in hit["snippet"]
+            seen.append(hit["id"])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 3
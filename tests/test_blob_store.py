@@ -0,0 +1,140 @@
+# tests/test_blob_store.py
+"""Uploaded PDF store: deduplicated blobs, reference counts, garbage collection, the upload cap."""
+import io
+import os
+import uuid
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import blob_store, crud, models
+from database import SessionLocal
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+class Upload:
+    """The part of UploadFile that save_upload reads."""
+
+    def __init__(self, data: bytes):
+        self.file = io.BytesIO(data)
+
+
+def stored_blob(db, data: bytes = None):
+    content_hash, path, size = blob_store.save_upload(Upload(data or uuid.uuid4().bytes * 100))
+    blob_store.register(db, content_hash, path, size)
+    return content_hash, path
+
+
+def articles(n: int):
+    return [
+        {"title": f"Blob story {i}", "content": f"Story {uuid.uuid4().hex} number {i}. " * 10,
+         "category": "blobs", "source_file": "edition.pdf"}
+        for i in range(n)
+    ]
+
+
+def ref_count(db, content_hash):
+    db.expire_all()
+    return db.get(models.Blob, content_hash).ref_count
+
+
+def test_same_upload_is_stored_once(db):
+    data = uuid.uuid4().bytes * 100
+    first_hash, first_path = stored_blob(db, data)
+    second_hash, second_path = stored_blob(db, data)
+
+    assert (first_hash, first_path) == (second_hash, second_path)
+    assert os.path.exists(first_path)
+    assert db.query(models.Blob).filter(models.Blob.content_hash == first_hash).count() == 1
+
+
+def test_oversized_upload_leaves_nothing_behind():
+    with pytest.raises(blob_store.UploadTooLargeError):
+        blob_store.save_upload(Upload(b"x" * 100), max_bytes=10)
+    assert not os.listdir(os.path.join(blob_store.BLOB_DIR, "tmp"))
+
+
+def test_articles_count_as_references(db):
+    content_hash, _ = stored_blob(db)
+    ids = crud.create_articles_bulk(db, articles(3), source_hash=content_hash)["ids"]
+    assert ref_count(db, content_hash) == 3
+
+    crud.delete_article(db, ids[0])
+    assert ref_count(db, content_hash) == 2
+
+    crud.delete_articles_by_ids(db, ids[1:])
+    assert ref_count(db, content_hash) == 0
+
+
+def test_repair_recounts_from_the_articles(db):
+    content_hash, _ = stored_blob(db)
+    crud.create_articles_bulk(db, articles(2), source_hash=content_hash)
+    db.get(models.Blob, content_hash).ref_count = 7
+    db.commit()
+
+    blob_store.repair(db)
+    assert ref_count(db, content_hash) == 2
+
+
+def test_garbage_collection_keeps_referenced_and_pending_blobs(db):
+    referenced, referenced_path = stored_blob(db)
+    crud.create_articles_bulk(db, articles(1), source_hash=referenced)
+    pending, pending_path = stored_blob(db)
+    job = models.IngestJob(id=uuid.uuid4().hex, filename="pending.pdf", file_path=pending_path,
+                           content_hash=pending, state="queued", progress={})
+    db.add(job)
+    db.commit()
+    orphan, orphan_path = stored_blob(db)
+
+    # Within the grace period even an orphan stays
+    blob_store.collect_garbage(db)
+    assert os.path.exists(orphan_path)
+
+    result = blob_store.collect_garbage(db, grace_seconds=0)
+
+    assert result["blobs_deleted"] >= 1
+    assert not os.path.exists(orphan_path)
+    assert db.get(models.Blob, orphan) is None
+    for content_hash, path in ((referenced, referenced_path), (pending, pending_path)):
+        assert os.path.exists(path)
+        assert db.get(models.Blob, content_hash) is not None
+
+    job.state = "done"
+    db.commit()
+
+
+@pytest.fixture
+def capped_client():
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"bytes": len(await request.body())}
+
+    return TestClient(blob_store.UploadLimitMiddleware(app, max_bytes=1000))
+
+
+def test_body_within_the_cap_passes(capped_client):
+    response = capped_client.post("/echo", content=b"x" * 1000)
+    assert response.status_code == 200
+    assert response.json() == {"bytes": 1000}
+
+
+def test_declared_oversized_body_is_rejected(capped_client):
+    assert capped_client.post("/echo", content=b"x" * 1001).status_code == 413
+
+
+def test_chunked_oversized_body_is_rejected(capped_client):
+    def chunks():
+        for _ in range(5):
+            yield b"x" * 300
+
+    # No Content-Length: the middleware has to count
+    assert capped_client.post("/echo", content=chunks()).status_code == 413
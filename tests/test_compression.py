@@ -0,0 +1,76 @@
+# tests/test_compression.py
+"""Compressed article storage: codecs, and migrating rows both ways."""
+import pytest
+from sqlalchemy import text
+
+import compression, crud, fts, models, schemas
+from database import SessionLocal, engine
+
+LONG = "The harbour board approved the dredging plan after a long debate. " * 20
+
+
+@pytest.fixture
+def no_dictionaries(monkeypatch):
+    monkeypatch.setattr(compression, "_dicts", {})
+    monkeypatch.setattr(compression, "_active_dict_id", None)
+
+
+def test_codecs_round_trip(no_dictionaries):
+    plain = compression.compress_text(LONG)
+    assert plain[0] == compression.CODEC_ZLIB
+    assert compression.decode_text(plain) == LONG
+
+    compression.set_dictionaries({7: compression.train_dictionary([LONG, LONG.upper()])})
+    with_dict = compression.compress_text(LONG)
+    assert with_dict[0] == compression.CODEC_ZLIB_DICT
+    assert len(with_dict) < len(plain)
+    assert compression.decode_text(with_dict) == LONG
+
+
+def test_short_and_plain_values_stay_text(no_dictionaries):
+    assert compression.encode_text("short summary", "zlib") == "short summary"
+    assert compression.encode_text(LONG, "none") == LONG
+    assert compression.decode_text(LONG) == LONG
+    assert compression.decode_text(None) is None
+    with pytest.raises(ValueError):
+        compression.decode_text(b"\x7fnot a codec")
+
+
+def stored_type(article_id: int) -> str:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT typeof(content) FROM articles WHERE id = :id"), {"id": article_id}).scalar()
+
+
+def view_decodes() -> bool:
+    with engine.connect() as conn:
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": fts.TEXT_VIEW}).scalar()
+    return "article_text(" in sql
+
+
+def test_migrate_compresses_and_restores_searchable_rows(no_dictionaries):
+    db = SessionLocal()
+    try:
+        article = crud.create_article(db, schemas.ArticleCreate(
+            title="Harbour dredging", content=LONG + "Keyword: quayside.", category="compression"))
+        article_id = article.id
+    finally:
+        db.close()
+
+    def check(blob: bool):
+        assert stored_type(article_id) == ("blob" if blob else "text")
+        assert view_decodes() == blob
+        db = SessionLocal()
+        try:
+            assert db.get(models.Article, article_id).content.endswith("Keyword: quayside.")
+            hits = fts.search_ids(db, "quayside")
+            assert [hit[0] for hit in hits] == [article_id]
+            assert "<mark>quayside</mark>" in hits[0][3]
+        finally:
+            db.close()
+
+    try:
+        assert compression.migrate(engine, "zlib") >= 1
+        check(blob=True)
+    finally:
+        compression.migrate(engine, "none")
+    check(blob=False)
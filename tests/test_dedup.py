@@ -0,0 +1,95 @@
+# tests/test_dedup.py
+"""Near-duplicate detection at ingest (dedup.py through crud.create_articles_bulk)."""
+import random
+
+import pytest
+
+import crud, dedup, models, schemas
+from database import SessionLocal
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def story(seed: int, words: int = 120) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"w{seed}x{rng.randrange(400)}" for _ in range(words))
+
+
+def edited(text: str) -> str:
+    """The same story with one word changed, as in another edition."""
+    words = text.split()
+    words[len(words) // 2] = "changed"
+    return " ".join(words)
+
+
+def row(content: str, title: str = "Wire story", source_file: str = "edition.pdf"):
+    return {"title": title, "content": content, "category": "dedup", "source_file": source_file}
+
+
+def ingest(db, rows, source_hash):
+    return crud.create_articles_bulk(db, rows, source_hash=source_hash, deduplicate=True)
+
+
+def test_near_duplicate_from_another_edition_is_linked(db):
+    text = story(1)
+    original = ingest(db, [row(text, source_file="monday.pdf")], "a" * 64)["ids"][0]
+
+    result = ingest(db, [row(edited(text), source_file="tuesday.pdf")], "b" * 64)
+
+    assert result["ids"] == [None]
+    assert result["duplicates"][0]["original_id"] == original
+    assert result["duplicates"][0]["similarity"] >= dedup.DEDUP_THRESHOLD
+    assert [link.source_file for link in dedup.get_links(db, original)] == ["tuesday.pdf"]
+
+
+def test_different_stories_are_kept(db):
+    first = ingest(db, [row(story(2))], "c" * 64)
+    second = ingest(db, [row(story(3))], "d" * 64)
+    assert first["ids"][0] is not None and second["ids"][0] is not None
+    assert second["duplicates"] == []
+
+
+def test_duplicate_within_one_batch_is_linked_to_the_kept_row(db):
+    text = story(4)
+    result = ingest(db, [row(text), row(edited(text))], "e" * 64)
+    kept, dropped = result["ids"]
+    assert kept is not None and dropped is None
+    assert result["duplicates"] == [{"index": 1, "original_id": kept, "similarity": pytest.approx(1.0, abs=0.2)}]
+
+
+def test_forced_reingest_of_the_same_pdf_is_not_a_duplicate_of_itself(db):
+    text = story(5)
+    first = ingest(db, [row(text)], "f" * 64)["ids"][0]
+    again = ingest(db, [row(text)], "f" * 64)
+    assert again["ids"][0] not in (None, first)
+    assert again["duplicates"] == []
+
+
+def test_posted_articles_are_matched_by_later_ingests(db):
+    text = story(6)
+    posted = crud.create_article(db, schemas.ArticleCreate(title="Posted", content=text, category="dedup"))
+    result = ingest(db, [row(edited(text))], "0" * 64)
+    assert result["duplicates"][0]["original_id"] == posted.id
+
+
+def test_skip_mode_drops_without_a_link(db, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "skip")
+    text = story(7)
+    original = ingest(db, [row(text)], "1" * 64)["ids"][0]
+    result = ingest(db, [row(edited(text))], "2" * 64)
+    assert result["ids"] == [None]
+    assert dedup.get_links(db, original) == []
+
+
+def test_off_mode_inserts_everything(db, monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MODE", "off")
+    text = story(8)
+    ingest(db, [row(text)], "3" * 64)
+    result = ingest(db, [row(text)], "4" * 64)
+    assert result["ids"][0] is not None
+    assert db.query(models.MinHashSignature).filter(models.MinHashSignature.article_id == result["ids"][0]).count() == 0
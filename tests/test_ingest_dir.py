@@ -0,0 +1,101 @@
+# tests/test_ingest_dir.py
+"""Directory backfill: outcomes recorded in the checkpoint, and resuming from it."""
+import itertools
+import json
+import os
+
+import pytest
+
+import ingest_dir, models, parse_cache
+from database import SessionLocal
+from synthetic_pdf import write_newspaper_pdf
+
+# Fresh content for every archive: content that is already ingested is skipped
+_seeds = itertools.count(100)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    directory = tmp_path / "archive"
+    (directory / "2024").mkdir(parents=True)
+    write_newspaper_pdf(str(directory / "monday.pdf"), pages=1, articles_per_page=3, columns=2, seed=next(_seeds))
+    write_newspaper_pdf(str(directory / "2024" / "tuesday.pdf"), pages=1, articles_per_page=3, columns=2, seed=next(_seeds))
+    (directory / "broken.pdf").write_bytes(b"not a pdf")
+    return str(directory)
+
+
+def run(db, archive, checkpoint, **options):
+    return ingest_dir.ingest_directory(db, archive, checkpoint, workers=1, progress=False, **options)
+
+
+def articles_of(db, archive):
+    hashes = [parse_cache.hash_file(path) for path in ingest_dir.find_pdfs(archive)]
+    return db.query(models.Article).filter(models.Article.source_hash.in_(hashes)).count()
+
+
+def test_outcomes_are_checkpointed(db, archive, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    totals = run(db, archive, checkpoint)
+
+    assert (totals["done"], totals["skipped"], totals["failed"]) == (2, 0, 1)
+    assert totals["articles"] == articles_of(db, archive) > 0
+    entries = ingest_dir.load_checkpoint(checkpoint)
+    assert {os.path.basename(path): entry["status"] for path, entry in entries.items()} == {
+        "monday.pdf": "done", "tuesday.pdf": "done", "broken.pdf": "failed",
+    }
+    # Each PDF's articles are deduplicated against by its finished job
+    tuesday = parse_cache.hash_file(os.path.join(archive, "2024", "tuesday.pdf"))
+    job = db.query(models.IngestJob).filter(models.IngestJob.content_hash == tuesday).one()
+    assert (job.filename, job.state) == ("2024/tuesday.pdf", "done")
+
+
+def test_rerun_skips_checkpointed_files(db, archive, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    run(db, archive, checkpoint)
+    saved = articles_of(db, archive)
+    with open(checkpoint) as f:
+        lines = f.readlines()
+
+    totals = run(db, archive, checkpoint)
+
+    assert totals == {"done": 0, "skipped": 0, "failed": 0, "articles": 0}
+    with open(checkpoint) as f:
+        assert f.readlines() == lines
+    assert articles_of(db, archive) == saved
+
+
+def test_interrupted_run_resumes(db, archive, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    run(db, archive, checkpoint)
+    saved = articles_of(db, archive)
+    with open(checkpoint) as f:
+        first = f.readline()
+    # Killed while writing the second entry
+    with open(checkpoint, "w") as f:
+        f.write(first + first[:20])
+
+    totals = run(db, archive, checkpoint)
+
+    # The files after the first are looked at again; their content is already in
+    assert totals["done"] == 0
+    assert totals["skipped"] + totals["failed"] == 2
+    assert articles_of(db, archive) == saved
+
+
+def test_retry_failed(db, archive, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    run(db, archive, checkpoint)
+
+    assert run(db, archive, checkpoint)["failed"] == 0
+    totals = run(db, archive, checkpoint, retry_failed=True)
+
+    assert (totals["done"], totals["failed"]) == (0, 1)
+    last = [json.loads(line) for line in open(checkpoint)][-1]
+    assert (os.path.basename(last["path"]), last["status"]) == ("broken.pdf", "failed")
@@ -0,0 +1,136 @@
+# tests/test_jobs.py
+"""Ingest jobs run in-process: leases, and locking while a job parses."""
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import database, jobs, models, parse_cache
+from database import SessionLocal
+from synthetic_pdf import write_newspaper_pdf
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = str(tmp_path / "edition.pdf")
+    write_newspaper_pdf(path, pages=1, articles_per_page=4, columns=2, seed=7)
+    return path
+
+
+def queued_job(path: str, content_hash: str = None) -> str:
+    db = SessionLocal()
+    try:
+        job = models.IngestJob(id=uuid.uuid4().hex, filename="edition.pdf", file_path=path,
+                               content_hash=content_hash, state="queued", progress={})
+        db.add(job)
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+
+def other_writer_gets_lock() -> bool:
+    """Whether a writer on its own connection (another process, say) gets the write lock at once."""
+    conn = sqlite3.connect(database.engine.url.database, timeout=0.2, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ROLLBACK")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def test_parsing_job_does_not_hold_the_write_lock(pdf, monkeypatch):
+    import enhanced_pdf_parser
+
+    real = enhanced_pdf_parser.iter_page_layouts
+    lock_free = []
+    pool_sizes = []
+
+    def observed(path, workers=None, min_pages=None):
+        pool_sizes.append(workers)
+        for layout in real(path, workers=1):
+            lock_free.append(other_writer_gets_lock())
+            yield layout
+
+    monkeypatch.setattr(enhanced_pdf_parser, "iter_page_layouts", observed)
+    job_id = queued_job(pdf)
+    jobs._run_job(job_id)
+
+    db = SessionLocal()
+    try:
+        job = jobs.get_job(db, job_id)
+        assert job.state == "done", job.error
+        assert job.articles_saved > 0
+    finally:
+        db.close()
+    assert lock_free == [True]
+    # Its share of the CPUs, not a pool of cpu_count processes per job
+    assert pool_sizes == [jobs.JOB_EXTRACT_WORKERS]
+
+
+def test_a_job_is_claimed_once():
+    job_id = queued_job("unused.pdf")
+    db = SessionLocal()
+    try:
+        worker = jobs.claim_job(db, job_id)
+        assert worker is not None
+        assert jobs.claim_job(db, job_id) is None
+
+        job = jobs.get_job(db, job_id)
+        assert (job.state, job.worker) == ("running", worker)
+    finally:
+        db.close()
+
+
+def test_expired_lease_is_taken_over():
+    job_id = queued_job("unused.pdf")
+    db = SessionLocal()
+    try:
+        first = jobs.claim_job(db, job_id)
+        job = jobs.get_job(db, job_id)
+        job.heartbeat_at = datetime.now() - timedelta(seconds=jobs.JOB_LEASE_SECONDS + 1)
+        db.commit()
+
+        second = jobs.claim_job(db, job_id)
+        assert second not in (None, first)
+
+        # The first worker finds out at its next save
+        with pytest.raises(jobs.LeaseLostError):
+            jobs._renew_lease(db, job, first)
+        db.rollback()
+        assert jobs.get_job(db, job_id).worker == second
+    finally:
+        db.close()
+
+
+def test_worker_that_lost_its_lease_saves_nothing(tmp_path, monkeypatch):
+    import enhanced_pdf_parser
+
+    path = str(tmp_path / "taken-over.pdf")
+    write_newspaper_pdf(path, pages=1, articles_per_page=4, columns=2, seed=13)
+    content_hash = parse_cache.hash_file(path)
+    job_id = queued_job(path, content_hash)
+    real = enhanced_pdf_parser.iter_page_layouts
+
+    def taken_over(path, workers=None, min_pages=None):
+        # Another worker claims the job while this one is parsing
+        conn = sqlite3.connect(database.engine.url.database, timeout=5)
+        with conn:
+            conn.execute("UPDATE ingest_jobs SET worker = 'other' WHERE id = ?", (job_id,))
+        conn.close()
+        yield from real(path, workers=1)
+
+    monkeypatch.setattr(enhanced_pdf_parser, "iter_page_layouts", taken_over)
+    jobs._run_job(job_id)
+
+    db = SessionLocal()
+    try:
+        job = jobs.get_job(db, job_id)
+        assert (job.state, job.worker, job.articles_saved) == ("running", "other", 0)
+        assert db.query(models.Article).filter(models.Article.source_hash == content_hash).count() == 0
+    finally:
+        db.close()
@@ -0,0 +1,74 @@
+# tests/test_related.py
+"""The related-articles index: neighbours, document frequencies, backfill."""
+import models
+import crud, migrations, related, schemas
+from database import SessionLocal, engine
+
+
+def article(title, words):
+    return schemas.ArticleCreate(title=title, content=" ".join(words * 5), category="related")
+
+
+def df(db, term):
+    row = db.get(models.TermFrequency, term)
+    db.expire_all()
+    return row.df if row else 0
+
+
+def test_similar_articles_are_neighbours():
+    db = SessionLocal()
+    try:
+        first = crud.create_article(db, article("Glacier survey", ["glacier", "meltwater", "moraine", "icefield"]))
+        second = crud.create_article(db, article("Glacier retreat", ["glacier", "meltwater", "moraine", "crevasse"]))
+        other = crud.create_article(db, article("Chess final", ["gambit", "checkmate", "endgame", "rook"]))
+
+        neighbours = [a.id for a, _ in related.get_related(db, second.id)]
+        assert first.id in neighbours
+        assert other.id not in neighbours
+    finally:
+        db.close()
+
+
+def test_document_frequencies_follow_deletes_and_rewrites():
+    db = SessionLocal()
+    try:
+        a = crud.create_article(db, article("Quokka one", ["quokkapouch", "zorblax"]))
+        b = crud.create_article(db, article("Quokka two", ["quokkapouch"]))
+        assert df(db, "quokkapouch") == 2
+        assert df(db, "zorblax") == 1
+
+        crud.update_articles_bulk(db, {a.id: {"title": "Quokka one", "content": "quokkapouch wombatine " * 5}})
+        assert df(db, "quokkapouch") == 2
+        assert df(db, "zorblax") == 0
+        assert df(db, "wombatine") == 1
+
+        assert crud.delete_article(db, b.id)
+        crud.delete_articles_by_ids(db, [a.id])
+        assert df(db, "quokkapouch") == 0
+        assert df(db, "wombatine") == 0
+    finally:
+        db.close()
+
+
+def test_migration_indexes_articles_stored_before_the_index():
+    db = SessionLocal()
+    try:
+        # As in a database from before the index: rows but no postings
+        legacy = models.Article(title="Legacy basalt", content="basalt obsidian pumice " * 5, category="related")
+        db.add(legacy)
+        db.commit()
+        assert db.get(models.RelatedArticles, legacy.id) is None
+    finally:
+        db.close()
+
+    with engine.begin() as conn:
+        conn.execute(migrations.schema_migrations.delete()
+                     .where(migrations.schema_migrations.c.name == "0008_related_index_backfill"))
+    assert "0008_related_index_backfill" in migrations.run_migrations(engine)
+
+    db = SessionLocal()
+    try:
+        assert db.get(models.RelatedArticles, legacy.id) is not None
+        assert df(db, "obsidian") == 1
+    finally:
+        db.close()
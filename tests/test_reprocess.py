@@ -0,0 +1,78 @@
+# tests/test_reprocess.py
+"""Reprocessing cached PDFs: pairing new articles with old ones, ids kept."""
+import uuid
+
+import jobs, models, parse_cache, reprocess
+from database import SessionLocal
+from synthetic_pdf import write_newspaper_pdf
+
+
+def rows(*titles):
+    return [{"title": title} for title in titles]
+
+
+def test_equal_titles_pair_first():
+    old = [(1, "A"), (2, "B"), (3, "C")]
+    assert reprocess.match_articles(old, rows("C", "A", "B")) == {0: 3, 1: 1, 2: 2}
+
+
+def test_repeated_titles_pair_in_order():
+    old = [(1, "Notice"), (2, "Notice"), (3, "Weather")]
+    assert reprocess.match_articles(old, rows("Notice", "Weather", "Notice")) == {0: 1, 1: 3, 2: 2}
+
+
+def test_renamed_rows_take_the_old_article_at_their_position():
+    old = [(1, "A"), (2, "B"), (3, "C")]
+    assert reprocess.match_articles(old, rows("A", "B renamed", "C")) == {0: 1, 1: 2, 2: 3}
+
+
+def test_position_already_paired_by_title_is_not_reused():
+    old = [(1, "A"), (2, "B")]
+    # row 0 is new; its position holds A, which row 1 already took by title
+    assert reprocess.match_articles(old, rows("New", "A")) == {1: 1}
+
+
+def test_more_or_fewer_rows_than_old_articles():
+    old = [(1, "A"), (2, "B")]
+    assert reprocess.match_articles(old, rows("A", "X", "Y")) == {0: 1, 1: 2}
+    assert reprocess.match_articles(old, rows("Z")) == {0: 1}
+    assert reprocess.match_articles([], rows("A")) == {}
+
+
+def test_reprocess_keeps_ids_and_dates(tmp_path):
+    path = str(tmp_path / "reprocessed.pdf")
+    write_newspaper_pdf(path, pages=1, articles_per_page=4, columns=2, seed=11)
+    db = SessionLocal()
+    try:
+        content_hash = parse_cache.hash_file(path)
+        job = models.IngestJob(id=uuid.uuid4().hex, filename="reprocessed.pdf", file_path=path,
+                               content_hash=content_hash, state="queued", progress={})
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+    jobs._run_job(job_id)
+
+    db = SessionLocal()
+    try:
+        before = {
+            a.id: (a.title, a.created_at)
+            for a in db.query(models.Article).filter(models.Article.source_hash == content_hash)
+        }
+        assert before
+
+        (result,), next_hash = reprocess.reprocess(db, content_hash=content_hash)
+        assert next_hash is None
+        assert result["pages"] == 1
+        assert result["articles_updated"] == len(before)
+        assert result["articles_deleted"] == result["articles_saved"] == 0
+
+        db.expire_all()
+        after = {
+            a.id: (a.title, a.created_at)
+            for a in db.query(models.Article).filter(models.Article.source_hash == content_hash)
+        }
+        assert after == before
+    finally:
+        db.close()
@@ -0,0 +1,31 @@
+# tests/test_utils.py
+"""Enrichment must keep the labels and dates of the original implementation."""
+import pytest
+
+from utils import categorize_text, extract_date
+
+
+@pytest.mark.parametrize("text, date", [
+    ("Filed 2024-01-05 by our reporter", "2024-01-05"),
+    ("On 12/3/2024 the council met", "2024-12-03"),
+    ("March 5, 2024: results are in", "2024-03-05"),
+    ("Sept 12 2023 was a Tuesday", "2023-09-12"),
+    ("Published on 5 March 2024", "2024-03-05"),
+    ("ISO beats prose: March 5, 2024 and 2023-02-01", "2023-02-01"),
+    ("Inside words are not dates: xMarch 5, 2024 or id2024-01-05", None),
+    ("jar 5 2020 is not a month", None),
+    ("No date here", None),
+])
+def test_extract_date(text, date):
+    assert extract_date(text) == date
+
+
+def test_categorize_counts_keywords_inside_words():
+    # "said" holds "ai" and "window" holds "win": substring counts, as always
+    assert categorize_text("He said so by the window, said it twice") == "technology"
+    assert categorize_text("The technology startup shipped an app") == "technology"
+    assert categorize_text("Nothing to see") == "general"
+
+
+def test_categorize_ties_go_to_the_first_category():
+    assert categorize_text("football election") == "sports"